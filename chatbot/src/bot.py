@@ -3,7 +3,7 @@
 
 import io
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 import matplotlib
 from aiogram import Bot, types
@@ -26,6 +26,8 @@ import matplotlib.pyplot as plt
 from matplotlib import ticker as mticker
 
 PASSWORD_LENGTH = 16
+# balance points per jar chart, the api downsamples longer histories
+JAR_CHART_POINTS = 200
 
 kbm = KeyboardManager()
 
@@ -541,9 +543,7 @@ async def jar_chart_fetch_handler(callback_query: types.CallbackQuery):
     await bot.answer_callback_query(callback_query.id)
 
     time_from = _compute_time_from(period_code)
-    endpoint = (
-        f"/monobank/monojartransactions/?jars={jar_id}&fields=balance,formatted_time"
-    )
+    endpoint = f"/monobank/monojars/{jar_id}/balance-series/?points={JAR_CHART_POINTS}"
     if time_from:
         endpoint += f"&time_from={time_from}"
 
@@ -556,7 +556,7 @@ async def jar_chart_fetch_handler(callback_query: types.CallbackQuery):
         )
         return
 
-    data = resp.json()  # list of {balance, formatted_time}
+    data = resp.json()  # list of {time, balance}
     if not isinstance(data, list) or len(data) == 0:
         await bot.send_message(
             callback_query.message.chat.id, "No transactions to display"
@@ -579,7 +579,10 @@ async def jar_chart_fetch_handler(callback_query: types.CallbackQuery):
 
     # Prepare data for plotting
     try:
-        time_strings = [item.get("formatted_time", "") for item in data]
+        # UTC like months and times of the api, wherever the bot runs
+        times = [
+            datetime.fromtimestamp(int(item["time"]), tz=timezone.utc) for item in data
+        ]
         y_values = [int(item.get("balance", 0)) / 100 for item in data]
     except Exception:
         await bot.send_message(
@@ -587,17 +590,6 @@ async def jar_chart_fetch_handler(callback_query: types.CallbackQuery):
         )
         return
 
-    # Parse times and compute month markers
-    try:
-        times = [datetime.strptime(ts, "%Y-%m-%d %H:%M:%S") for ts in time_strings]
-    except Exception:
-        times = []
-        for ts in time_strings:
-            try:
-                times.append(datetime.fromisoformat(ts))
-            except Exception:
-                times.append(datetime.now())
-
     x_positions = list(range(len(times)))
     month_indices: list[int] = []
     month_labels: list[str] = []
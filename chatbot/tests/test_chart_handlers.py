@@ -1,4 +1,5 @@
 import asyncio
+import time
 import types
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -50,11 +51,11 @@ async def test_jar_chart_fetch_generates_chart_1_month(
     mock_config, api_mock, bot_stub, dp_module
 ):
     """Test jar chart generation for 1 month period"""
-    # Mock transaction data
+    # Mock balance series data
     transaction_data = [
-        {"balance": 10000, "formatted_time": "2023-11-01 10:00:00"},
-        {"balance": 15000, "formatted_time": "2023-11-15 14:30:00"},
-        {"balance": 12000, "formatted_time": "2023-11-30 16:45:00"},
+        {"time": 1698832800, "balance": 10000},
+        {"time": 1700058600, "balance": 15000},
+        {"time": 1701362700, "balance": 12000},
     ]
 
     # Mock jar details
@@ -67,7 +68,7 @@ async def test_jar_chart_fetch_generates_chart_1_month(
     # Mock the time calculation to return a fixed date
     api_mock.when(
         "GET",
-        "/monobank/monojartransactions/?jars=jar123&fields=balance,formatted_time&time_from=2023-10-01",
+        "/monobank/monojars/jar123/balance-series/?points=200&time_from=2023-10-01",
         DummyResponse(200, transaction_data),
     )
     api_mock.when("GET", "/monobank/monojars/jar123/", DummyResponse(200, jar_data))
@@ -101,6 +102,45 @@ async def test_jar_chart_fetch_generates_chart_1_month(
     assert "1 month" in sent_msg.caption
 
 
+@pytest.mark.asyncio
+async def test_jar_chart_fetch_month_markers_are_utc(
+    monkeypatch, mock_config, api_mock, bot_stub, dp_module
+):
+    """Month markers don't depend on the timezone of the bot"""
+    # 2023-10-31 23:30 UTC is already November in Kyiv
+    transaction_data = [
+        {"time": 1698795000, "balance": 10000},
+        {"time": 1698800400, "balance": 15000},
+    ]
+    api_mock.when(
+        "GET",
+        "/monobank/monojars/jar123/balance-series/?points=200&time_from=2023-10-01",
+        DummyResponse(200, transaction_data),
+    )
+    api_mock.when("GET", "/monobank/monojars/jar123/", DummyResponse(200, {}))
+    callback_query = types.SimpleNamespace(
+        id="cb1",
+        data="jar_chart_period_jar123*1m",
+        message=types.SimpleNamespace(chat=types.SimpleNamespace(id=123)),
+    )
+    monkeypatch.setenv("TZ", "Europe/Kyiv")
+    time.tzset()
+
+    try:
+        with patch("src.bot._compute_time_from", return_value="2023-10-01"), patch(
+            "src.bot.plt"
+        ) as mock_plt, patch("src.bot.io.BytesIO"), patch("src.bot.InputFile"):
+            mock_ax = MagicMock()
+            mock_plt.subplots.return_value = (MagicMock(), mock_ax)
+            await dp_module.jar_chart_fetch_handler(callback_query)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    mock_ax.set_xticks.assert_called_once_with([0, 1])
+    assert mock_ax.set_xticklabels.call_args.args[0] == ["Oct 2023", "Nov 2023"]
+
+
 @pytest.mark.asyncio
 async def test_jar_chart_fetch_handles_no_data(
     mock_config, api_mock, bot_stub, dp_module
@@ -109,7 +149,7 @@ async def test_jar_chart_fetch_handles_no_data(
     # Mock empty transaction data - return 200 with empty list for proper handling
     api_mock.when(
         "GET",
-        "/monobank/monojartransactions/?jars=jar123&fields=balance,formatted_time&time_from=2023-10-01",
+        "/monobank/monojars/jar123/balance-series/?points=200&time_from=2023-10-01",
         DummyResponse(200, []),
     )
 
@@ -135,7 +175,7 @@ async def test_jar_chart_fetch_handles_api_error(
     # Mock API error
     api_mock.when(
         "GET",
-        "/monobank/monojartransactions/?jars=jar123&fields=balance,formatted_time&time_from=2023-10-01",
+        "/monobank/monojars/jar123/balance-series/?points=200&time_from=2023-10-01",
         DummyResponse(500, None, "Server error"),
     )
 
@@ -159,11 +199,11 @@ async def test_jar_chart_fetch_all_time_period(
     mock_config, api_mock, bot_stub, dp_module
 ):
     """Test jar chart generation for all time period (no time filter)"""
-    # Mock transaction data
+    # Mock balance series data
     transaction_data = [
-        {"balance": 5000, "formatted_time": "2022-01-01 10:00:00"},
-        {"balance": 25000, "formatted_time": "2023-06-15 14:30:00"},
-        {"balance": 30000, "formatted_time": "2023-11-30 16:45:00"},
+        {"time": 1641031200, "balance": 5000},
+        {"time": 1686839400, "balance": 25000},
+        {"time": 1701362700, "balance": 30000},
     ]
 
     jar_data = {
@@ -175,7 +215,7 @@ async def test_jar_chart_fetch_all_time_period(
     # For "all" period, no time_from parameter should be added
     api_mock.when(
         "GET",
-        "/monobank/monojartransactions/?jars=jar123&fields=balance,formatted_time",
+        "/monobank/monojars/jar123/balance-series/?points=200",
         DummyResponse(200, transaction_data),
     )
     api_mock.when("GET", "/monobank/monojars/jar123/", DummyResponse(200, jar_data))
@@ -210,11 +250,11 @@ async def test_jar_chart_fetch_3_months_period(
     mock_config, api_mock, bot_stub, dp_module
 ):
     """Test jar chart generation for 3 months period"""
-    # Mock transaction data
+    # Mock balance series data
     transaction_data = [
-        {"balance": 8000, "formatted_time": "2023-09-01 10:00:00"},
-        {"balance": 18000, "formatted_time": "2023-10-15 14:30:00"},
-        {"balance": 22000, "formatted_time": "2023-11-30 16:45:00"},
+        {"time": 1693562400, "balance": 8000},
+        {"time": 1697380200, "balance": 18000},
+        {"time": 1701362700, "balance": 22000},
     ]
 
     jar_data = {
@@ -225,7 +265,7 @@ async def test_jar_chart_fetch_3_months_period(
 
     api_mock.when(
         "GET",
-        "/monobank/monojartransactions/?jars=jar123&fields=balance,formatted_time&time_from=2023-08-01",
+        "/monobank/monojars/jar123/balance-series/?points=200&time_from=2023-08-01",
         DummyResponse(200, transaction_data),
     )
     api_mock.when("GET", "/monobank/monojars/jar123/", DummyResponse(200, jar_data))
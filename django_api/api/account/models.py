@@ -5,7 +5,18 @@
 from typing import Iterable, Set
 
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager
-from django.db import models
+from django.core.cache import cache
+from django.db import connection, models
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+from utils.cache import bump_cache_version, get_cache_version
+
+FAMILY_VERSION_CACHE_KEY = "account:family_version"
+FAMILY_CACHE_TIMEOUT = 60 * 60
+
+
+def get_family_version() -> int:
+    return get_cache_version(FAMILY_VERSION_CACHE_KEY)
 
 
 class UserManager(BaseUserManager):
@@ -96,44 +107,43 @@ class User(AbstractBaseUser):
 
         - If recursive=True, includes the full connected family component.
         - If recursive=False, includes only direct family members.
-        Returns unique tg_ids as strings.
+        Returns unique tg_ids as strings, in a single query for both modes.
         """
         initial_ids: Set[str] = {str(tid) for tid in tg_ids if tid is not None}
         if not initial_ids:
             return []
 
-        collected_ids: Set[str] = set()
+        through = cls.family_members.through._meta
+        quote_name = connection.ops.quote_name
+        user_table = quote_name(cls._meta.db_table)
+        through_table = quote_name(through.db_table)
+        from_column = quote_name(through.get_field("from_user").column)
+        to_column = quote_name(through.get_field("to_user").column)
 
-        if not recursive:
-            users = cls.objects.filter(tg_id__in=initial_ids).prefetch_related(
-                "family_members"
-            )
-            for user in users:
-                collected_ids.add(str(user.tg_id))
-                for member in user.family_members.all():
-                    collected_ids.add(str(member.tg_id))
-            return list(collected_ids)
-
-        # recursive traversal over the undirected family graph
-        to_visit: list[str] = list(initial_ids)
-        while to_visit:
-            batch = to_visit[:50]
-            to_visit = to_visit[50:]
-
-            users = cls.objects.filter(tg_id__in=batch).prefetch_related(
-                "family_members"
-            )
-            for user in users:
-                user_id = str(user.tg_id)
-                if user_id in collected_ids:
-                    continue
-                collected_ids.add(user_id)
-                for member in user.family_members.all():
-                    member_id = str(member.tg_id)
-                    if member_id not in collected_ids:
-                        to_visit.append(member_id)
-
-        return list(collected_ids)
+        # links are stored in both directions (symmetrical), following
+        # from -> to is enough; UNION drops visited ids and stops on cycles
+        if recursive:
+            query = f"""
+                WITH RECURSIVE family(tg_id) AS (
+                    SELECT tg_id FROM {user_table} WHERE tg_id = ANY(%s)
+                    UNION
+                    SELECT link.{to_column} FROM family
+                    JOIN {through_table} link ON link.{from_column} = family.tg_id
+                )
+                SELECT tg_id FROM family
+            """
+            params = [list(initial_ids)]
+        else:
+            query = f"""
+                SELECT tg_id FROM {user_table} WHERE tg_id = ANY(%s)
+                UNION
+                SELECT {to_column} FROM {through_table} WHERE {from_column} = ANY(%s)
+            """
+            params = [list(initial_ids), list(initial_ids)]
+
+        with connection.cursor() as cursor:
+            cursor.execute(query, params)
+            return [str(row[0]) for row in cursor.fetchall()]
 
     def get_related_tg_ids(
         self, include_self: bool = True, recursive: bool = False
@@ -142,13 +152,38 @@ class User(AbstractBaseUser):
         Return this user's tg_id plus family members' tg_ids.
         - recursive=False: direct family only
         - recursive=True: full connected family component
+        Cached until any family membership changes.
         """
-        base_ids: list[str] = [str(self.tg_id)] if include_self else []
+        user_id = str(self.tg_id)
+        cache_key = f"account:family:{get_family_version()}:{int(recursive)}:{user_id}"
+        ids: list[str] | None = cache.get(cache_key)
+        if ids is None:
+            ids = self._get_related_tg_ids(recursive)
+            cache.set(cache_key, ids, FAMILY_CACHE_TIMEOUT)
+        if include_self:
+            return ids
+        return [tg_id for tg_id in ids if tg_id != user_id]
+
+    def _get_related_tg_ids(self, recursive: bool) -> list[str]:
         if recursive:
-            return self.__class__.expand_tg_ids_with_family(base_ids, recursive=True)
+            return self.__class__.expand_tg_ids_with_family(
+                [self.tg_id], recursive=True
+            )
 
         # Optimize direct family lookup with values_list
-        ids: Set[str] = set(base_ids)
+        ids: Set[str] = {str(self.tg_id)}
         family_tg_ids = self.family_members.values_list("tg_id", flat=True)
         ids.update(str(tg_id) for tg_id in family_tg_ids)
         return list(ids)
+
+
+@receiver(m2m_changed, sender=User.family_members.through)
+def invalidate_family_cache(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_cache_version(FAMILY_VERSION_CACHE_KEY)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_family_cache_on_delete(sender, instance, **kwargs):
+    # family links of a deleted user are removed without m2m_changed
+    bump_cache_version(FAMILY_VERSION_CACHE_KEY)
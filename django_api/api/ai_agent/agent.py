@@ -10,8 +10,10 @@ from ai_agent.tools.monotransations import (
 )
 from langchain.agents import AgentType, initialize_agent
 from langchain_google_genai import ChatGoogleGenerativeAI
+from utils.db_router import read_from_replica
 
 
+@read_from_replica()
 def get_jar_monthly_report(date: str) -> Dict[str, Any]:
     """
     Agent 1: Analysis Agent - Processes raw data into structured analysis
@@ -149,6 +151,7 @@ Requirements:
     return result  # pyright: ignore[reportReturnType]
 
 
+@read_from_replica()
 def get_jar_monthly_report_html(date: str) -> Dict[str, Any]:
     """
     Complete workflow: Data → Analysis → HTML Report
@@ -164,6 +167,7 @@ def get_jar_monthly_report_html(date: str) -> Dict[str, Any]:
     return html_report
 
 
+@read_from_replica()
 def get_daily_mono_transactions_report(
     date: str | None = None, tg_id: str | int | None = None
 ) -> str:
@@ -5,10 +5,12 @@ from django.contrib.auth import get_user_model
 from django.utils.timezone import make_aware
 from langchain.tools import StructuredTool
 from monobank.models import JarTransaction, MonoTransaction
+from utils.db_router import read_from_replica
 
 User = get_user_model()
 
 
+@read_from_replica()
 def get_monthly_mono_transactions(today: str) -> list:
     """
     Return all Mono transactions for the current month.
@@ -45,6 +47,7 @@ get_monthly_mono_transactions_tool = StructuredTool.from_function(
 )
 
 
+@read_from_replica()
 def get_monthly_jar_transactions(today: str) -> list:
     """
     Return all Jar transactions for the current month.
@@ -80,6 +83,7 @@ get_monthly_jar_transactions_tool = StructuredTool.from_function(
 )
 
 
+@read_from_replica()
 def get_daily_mono_transactions(
     day: str | None = None,
     tg_id: str | int | None = None,
@@ -135,6 +139,7 @@ get_daily_mono_transactions_tool = StructuredTool.from_function(
 )
 
 
+@read_from_replica()
 def get_daily_jar_transactions(day: str | None = None) -> list:
     """
     Return all Jar transactions for a specific day.
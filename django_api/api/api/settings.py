@@ -108,6 +108,20 @@ DATABASES = {
     #     "NAME": "db",
     # }
 }
+# read-only requests, ai agent tools and reports query the replica when it is
+# set (see utils.db_router), tests use it as a mirror of the default database
+DB_REPLICA_ALIAS = None
+if os.getenv("DB_REPLICA_HOST"):
+    DB_REPLICA_ALIAS = "replica"
+    DATABASES[DB_REPLICA_ALIAS] = {
+        **DATABASES["default"],
+        "HOST": os.getenv("DB_REPLICA_HOST"),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["utils.db_router.ReplicaRouter"]
+# seconds the replica may lag behind, data changed more recently is read
+# from the primary
+DB_REPLICA_LAG_SECONDS = int(os.getenv("DB_REPLICA_LAG_SECONDS") or "5")
 print(DATABASES)
 
 # Password validation
@@ -295,10 +309,12 @@ CORS_ALLOW_ALL_ORIGINS = True  # For development only, restrict in production
 ADMIN_TG_ID = os.getenv("API_ADMIN_USERNAME")
 ADMIN_PASSWORD = os.getenv("API_ADMIN_PASSWORD")
 
-AUTOMATIC_ACCOUNT_REFRESH_MINUTES = (
-    os.getenv("AUTOMATIC_ACCOUNT_REFRESH_MINUTES") or "45"
-)
+# every account is refreshed once per this many minutes, one cohort each minute
+ACCOUNT_REFRESH_SLOTS = int(os.getenv("ACCOUNT_REFRESH_SLOTS") or "60")
 IS_CI_TEST = strtobool(os.getenv("IS_CI_TEST", "false"))
+if IS_CI_TEST:
+    # tests run without redis
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
 APPLY_MONOBANK_WEBHOOKS = strtobool(os.getenv("APPLY_MONOBANK_WEBHOOKS", "false"))
 SHOULD_AUTO_FETCH_TRANSACTIONS = strtobool(
     os.getenv("SHOULD_AUTO_FETCH_TRANSACTIONS", "false")
@@ -307,5 +323,34 @@ IS_WORKER = strtobool(
     os.getenv("IS_WORKER", "false")
 )  # should be ON in celery workers. Turned on in docker-compose
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+# webhook only queues payloads, `process_webhook_queue` command writes them
+WEBHOOK_ASYNC_INGESTION = strtobool(os.getenv("WEBHOOK_ASYNC_INGESTION", "false"))
+WEBHOOK_WRITER_BATCH_SIZE = int(os.getenv("WEBHOOK_WRITER_BATCH_SIZE") or "100")
+WEBHOOK_WRITER_MAX_WAIT_MS = int(os.getenv("WEBHOOK_WRITER_MAX_WAIT_MS") or "200")
+# failed writes of a batch before its payloads are written one by one,
+# payloads failing on their own go to the dead letter queue
+WEBHOOK_WRITER_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_WRITER_MAX_ATTEMPTS") or "3")
+# transaction lists are always paginated by cursor, `page_size` is capped by the max
+TRANSACTIONS_PAGE_SIZE = int(os.getenv("TRANSACTIONS_PAGE_SIZE") or "100")
+TRANSACTIONS_MAX_PAGE_SIZE = int(os.getenv("TRANSACTIONS_MAX_PAGE_SIZE") or "1000")
+# rows fetched per server-side cursor round trip by transaction exports
+TRANSACTIONS_EXPORT_CHUNK_SIZE = int(
+    os.getenv("TRANSACTIONS_EXPORT_CHUNK_SIZE") or "2000"
+)
+# seconds read responses of jars and categories are cached, writes invalidate them
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT") or "600")
+# points of jar balance series for charts, requested with `points`
+BALANCE_SERIES_POINTS = int(os.getenv("BALANCE_SERIES_POINTS") or "200")
+BALANCE_SERIES_MAX_POINTS = int(os.getenv("BALANCE_SERIES_MAX_POINTS") or "2000")
+MONOBANK_CONNECT_TIMEOUT = float(os.getenv("MONOBANK_CONNECT_TIMEOUT") or "5")
+MONOBANK_READ_TIMEOUT = float(os.getenv("MONOBANK_READ_TIMEOUT") or "30")
+MONOBANK_HTTP_POOL_SIZE = int(os.getenv("MONOBANK_HTTP_POOL_SIZE") or "10")
+# accounts refreshed in parallel, keep it within the http pool size
+MONOBANK_REFRESH_CONCURRENCY = int(os.getenv("MONOBANK_REFRESH_CONCURRENCY") or "8")
+# max seconds monobank api call waits for its rate limit slot, retried later otherwise
+MONOBANK_RATE_LIMIT_MAX_WAIT = int(os.getenv("MONOBANK_RATE_LIMIT_MAX_WAIT") or "65")
+MONOBANK_RATE_LIMIT_MAX_RETRIES = int(
+    os.getenv("MONOBANK_RATE_LIMIT_MAX_RETRIES") or "20"
+)
 CONSUMER_TG_BOT_TOKEN = os.getenv("BOT_TOKEN", "NOT_SET")
 LOGGING_TG_BOT_TOKEN = os.getenv("BOT_TOKEN", "LOGS_BOT_TOKEN")
@@ -0,0 +1,83 @@
+"""
+Spend totals of card and jar transactions aggregated in SQL.
+
+Each source is grouped by one query and only group rows leave the database,
+so response size and latency don't depend on the transactions count.
+Amounts are in the currency of the card or jar, so totals are always grouped
+by it and different currencies are never summed up.
+"""
+
+from django.db.models import Count, Q, QuerySet, Sum
+
+from .models import get_transaction_period
+
+SPEND_SOURCES = ("cards", "jars")
+SPEND_PERIODS = ("day", "week", "month")
+# currency of `amount`, the operation currency may differ
+CURRENCY_LOOKUP = "account__currency__name"
+# dimension -> output column -> queryset lookup, `source` is not a column
+SPEND_DIMENSIONS = {
+    "source": {},
+    "category": {"category": "mcc__category__name"},
+    "owner": {
+        "owner": "account__monoaccount__user__tg_id",
+        "owner_name": "account__monoaccount__user__name",
+    },
+    "currency": {"currency": CURRENCY_LOOKUP},
+}
+
+
+def get_spend_summary(
+    querysets: dict[str, QuerySet],
+    group_by: list[str],
+    period: str | None = None,
+) -> list[dict]:
+    """
+    Spent (sum of negative amounts, positive number), income and count of
+    transactions of querysets by source, grouped by `group_by` dimensions and
+    `period` (first day of UTC day/week/month) and always by currency of the
+    card or jar. Sources are summed up unless grouped by `source`. Amounts are
+    in minor units of the currency.
+    """
+    columns = {
+        column: lookup
+        for dimension in [*group_by, "currency"]
+        for column, lookup in SPEND_DIMENSIONS[dimension].items()
+    }
+    totals: dict[tuple, dict] = {}
+    for source, queryset in querysets.items():
+        if period:
+            queryset = queryset.annotate(period=get_transaction_period(period))
+        rows = (
+            queryset.order_by()
+            .values(*columns.values(), *(["period"] if period else []))
+            .annotate(
+                spent=Sum("amount", filter=Q(amount__lt=0)),
+                income=Sum("amount", filter=Q(amount__gt=0)),
+                count=Count("pk"),
+            )
+        )
+        for row in rows:
+            group = {column: row[lookup] for column, lookup in columns.items()}
+            if period:
+                group["period"] = row["period"].isoformat()
+            if "source" in group_by:
+                group["source"] = source
+            key = tuple(group.values())
+            if key not in totals:
+                totals[key] = {**group, "spent": 0, "income": 0, "count": 0}
+            totals[key]["spent"] -= row["spent"] or 0
+            totals[key]["income"] += row["income"] or 0
+            totals[key]["count"] += row["count"]
+
+    order = (
+        (["period"] if period else [])
+        + (["source"] if "source" in group_by else [])
+        + list(columns)
+    )
+    return sorted(
+        totals.values(),
+        key=lambda item: [
+            (item[column] is None, item[column] or "") for column in order
+        ],
+    )
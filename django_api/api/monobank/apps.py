@@ -19,11 +19,12 @@ class MonobankConfig(AppConfig):
             CrontabSchedule,
             MultipleObjectsReturned,
             PeriodicTask,
+            PeriodicTasks,
         )
 
         try:
             schedule_accounts_refresh, created = CrontabSchedule.objects.get_or_create(
-                minute=settings.AUTOMATIC_ACCOUNT_REFRESH_MINUTES,  # Run at the 45th minute
+                minute="*",  # Every minute, each run refreshes a small cohort
                 hour="*",  # Every hour
                 day_of_week="*",  # Every day of the week
                 day_of_month="*",  # Every day of the month
@@ -31,16 +32,22 @@ class MonobankConfig(AppConfig):
             )
         except MultipleObjectsReturned:
             schedule_accounts_refresh = CrontabSchedule.objects.filter(
-                minute=settings.AUTOMATIC_ACCOUNT_REFRESH_MINUTES,  # Run at the 45th minute
+                minute="*",  # Every minute, each run refreshes a small cohort
                 hour="*",  # Every hour
                 day_of_week="*",  # Every day of the week
                 day_of_month="*",  # Every day of the month
                 month_of_year="*",  # Every month
             ).first()
         try:
+            # Refreshing all accounts at once is replaced by per minute cohorts
+            PeriodicTask.objects.filter(
+                name="Update Every Mono Account Periodic Task"
+            ).update(enabled=False)
+            PeriodicTasks.update_changed()
+
             # Create or update the periodic task
-            task_name = "Update Every Mono Account Periodic Task"
-            task_path = "monobank.tasks.update_every_mono_account"
+            task_name = "Refresh Mono Accounts Cohort Periodic Task"
+            task_path = "monobank.tasks.refresh_mono_accounts_cohort"
             periodic_task, created = PeriodicTask.objects.get_or_create(
                 name=task_name,
                 defaults={
@@ -57,3 +64,22 @@ class MonobankConfig(AppConfig):
         except (OperationalError, ProgrammingError) as err:
             # Exception handling if the database isn't ready yet
             print(err)
+
+        try:
+            schedule_partitions, _ = CrontabSchedule.objects.get_or_create(
+                minute="0",
+                hour="3",  # Every day at 03:00
+                day_of_week="*",
+                day_of_month="*",
+                month_of_year="*",
+            )
+            PeriodicTask.objects.update_or_create(
+                name="Create Transaction Partitions Periodic Task",
+                defaults={
+                    "task": "monobank.tasks.create_transaction_partitions",
+                    "crontab": schedule_partitions,
+                    "interval": None,
+                },
+            )
+        except (MultipleObjectsReturned, OperationalError, ProgrammingError) as err:
+            print(err)
@@ -0,0 +1,161 @@
+import time
+from typing import Any, Callable
+
+import requests
+from django.conf import settings
+from loguru import logger
+from requests.adapters import HTTPAdapter
+from utils.errors import (
+    MonoBankError,
+    MonoBankForbidden,
+    MonoBankRequestError,
+    MonoBankTooManyRequests,
+    MonoBankUnavailable,
+)
+
+from .rate_limit import mono_rate_limiter
+
+MONO_API_URL = "https://api.monobank.ua"
+PERSONAL_INFO_PATH = "/personal/client-info"
+TRANSACTIONS_PATH = "/personal/statement"
+WEBHOOK_PATH = "/personal/webhook"
+
+# hook(endpoint, status_code, duration_seconds, response_bytes); status_code is
+# None when no response was received
+MetricsHook = Callable[[str, int | None, float, int], None]
+
+
+def log_request_metrics(
+    endpoint: str, status_code: int | None, duration: float, response_bytes: int
+):
+    logger.debug(
+        f"monobank {endpoint}: status {status_code}, {duration * 1000:.0f}ms, "
+        f"{response_bytes} bytes"
+    )
+
+
+class MonoBankClient:
+    """
+    Monobank personal api client.
+
+    Keeps a pooled keep-alive session, applies per token rate limits and
+    timeouts, and raises typed MonoBankError subclasses on failures.
+    """
+
+    def __init__(
+        self,
+        base_url: str = MONO_API_URL,
+        connect_timeout: float | None = None,
+        read_timeout: float | None = None,
+        pool_size: int | None = None,
+    ):
+        self.base_url = base_url
+        self.timeout = (
+            connect_timeout or settings.MONOBANK_CONNECT_TIMEOUT,
+            read_timeout or settings.MONOBANK_READ_TIMEOUT,
+        )
+        pool_size = pool_size or settings.MONOBANK_HTTP_POOL_SIZE
+        self.session = requests.Session()
+        self.session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0),
+        )
+        self.session.headers.update(
+            {"Accept": "application/json", "Accept-Encoding": "gzip"}
+        )
+        self.metrics_hooks: list[MetricsHook] = [log_request_metrics]
+
+    def add_metrics_hook(self, hook: MetricsHook):
+        self.metrics_hooks.append(hook)
+
+    def get_client_info(self, token: str, max_wait: float | None = None) -> dict:
+        return self.request(
+            "GET",
+            PERSONAL_INFO_PATH,
+            token,
+            endpoint="client-info",
+            max_wait=max_wait,
+        )
+
+    def get_statement(
+        self, token: str, account_id: str, from_unix: int, to_unix: int
+    ) -> list:
+        path = f"{TRANSACTIONS_PATH}/{account_id}/{from_unix}/{to_unix}"
+        return self.request("GET", path, token, endpoint="statement")
+
+    def set_webhook(self, token: str, webhook_url: str):
+        return self.request(
+            "POST",
+            WEBHOOK_PATH,
+            token,
+            endpoint="webhook",
+            json={"webHookUrl": webhook_url},
+        )
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        token: str,
+        endpoint: str,
+        max_wait: float | None = None,
+        **kwargs,
+    ) -> Any:
+        mono_rate_limiter.acquire(token, endpoint, max_wait)
+        started_at = time.perf_counter()
+        try:
+            response = self.session.request(
+                method,
+                f"{self.base_url}{path}",
+                headers={"X-Token": token},
+                timeout=self.timeout,
+                **kwargs,
+            )
+        except requests.RequestException as err:
+            self._notify(endpoint, None, time.perf_counter() - started_at, 0)
+            raise MonoBankUnavailable(f"{endpoint} request failed: {err}") from err
+        self._notify(
+            endpoint,
+            response.status_code,
+            time.perf_counter() - started_at,
+            len(response.content),
+        )
+        return self._parse_response(response)
+
+    def _notify(
+        self, endpoint: str, status_code: int | None, duration: float, size: int
+    ):
+        for hook in self.metrics_hooks:
+            try:
+                hook(endpoint, status_code, duration, size)
+            except Exception as err:
+                logger.error(f"monobank metrics hook failed: {err}")
+
+    @staticmethod
+    def _parse_response(response: requests.Response) -> Any:
+        try:
+            data = response.json() if response.content else None
+        except ValueError:
+            data = None
+        status_code = response.status_code
+        description = (
+            (data.get("errorDescription") if isinstance(data, dict) else None)
+            or response.reason
+            or str(status_code)
+        )
+        if status_code == 429:
+            raise MonoBankTooManyRequests(description, status_code)
+        if status_code in (401, 403):
+            raise MonoBankForbidden(description, status_code)
+        if status_code >= 500:
+            raise MonoBankUnavailable(description, status_code)
+        if status_code >= 400:
+            raise MonoBankRequestError(description, status_code)
+        if isinstance(data, dict) and data.get("errorDescription"):
+            raise MonoBankRequestError(data["errorDescription"], status_code)
+        if data is None and response.content:
+            raise MonoBankError("monobank api returned invalid json")
+        return data
+
+
+mono_client = MonoBankClient()
@@ -0,0 +1,82 @@
+"""
+Streaming export of transactions as NDJSON or CSV.
+
+Rows are read with a server-side cursor in chunks and written one by one, so
+memory use doesn't depend on the export size.
+"""
+
+import csv
+import json
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# output column -> queryset lookup
+TRANSACTION_EXPORT_FIELDS = {
+    "id": "id",
+    "time": "time",
+    "account_id": "account_id",
+    "amount": "amount",
+    "operation_amount": "operation_amount",
+    "balance": "balance",
+    "currency": "currency__code",
+    "mcc": "mcc__mso",
+    "category": "mcc__category__name",
+    "description": "description",
+    "comment": "comment",
+    "hold": "hold",
+}
+CARD_TRANSACTION_EXPORT_FIELDS = {
+    **TRANSACTION_EXPORT_FIELDS,
+    "receipt_id": "receipt_id",
+}
+JAR_TRANSACTION_EXPORT_FIELDS = TRANSACTION_EXPORT_FIELDS
+
+
+class Echo:
+    """File-like object returning written value, lets csv.writer produce lines."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_export_rows(queryset, fields: dict[str, str]) -> Iterator[dict]:
+    chunk_size = settings.TRANSACTIONS_EXPORT_CHUNK_SIZE
+    rows = queryset.order_by("time", "id").values_list(*fields.values())
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(fields, row))
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def iter_csv(rows: Iterable[dict], columns: Iterable[str]) -> Iterator[str]:
+    writer = csv.DictWriter(Echo(), fieldnames=list(columns))
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_transactions(
+    queryset, fields: dict[str, str], export_format: str, filename: str
+) -> StreamingHttpResponse:
+    rows = iter_export_rows(queryset, fields)
+    if export_format == "csv":
+        content = iter_csv(rows, fields)
+    else:
+        content = iter_ndjson(rows)
+    response = StreamingHttpResponse(
+        content, content_type=EXPORT_FORMATS[export_format]
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{filename}.{export_format}"'
+    )
+    return response
@@ -0,0 +1,128 @@
+import time
+
+from account.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from monobank.models import (
+    Category,
+    CategoryMSO,
+    Currency,
+    MonoAccount,
+    MonoCard,
+    MonoTransaction,
+)
+from monobank.serializers import (
+    MonoTransactionSerializer,
+    MonoTransactionValuesListSerializer,
+)
+
+BENCHMARK_TG_ID = "serializer_benchmark"
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows/sec of model and values() serializers of transaction lists "
+        "on generated rows, nothing is kept in the database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            action="append",
+            help="rows count, repeatable (default: 10000 and 100000)",
+        )
+
+    def handle(self, *args, **options):
+        rows_counts = options["rows"] or [10_000, 100_000]
+        try:
+            with transaction.atomic():
+                card = self.create_card()
+                created = 0
+                for rows_count in sorted(rows_counts):
+                    self.create_transactions(card, created, rows_count)
+                    created = rows_count
+                    self.benchmark(card, rows_count)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_card(self) -> MonoCard:
+        user = User.objects.create_user(BENCHMARK_TG_ID, "benchmark")
+        account = MonoAccount.objects.create(user=user, mono_token=BENCHMARK_TG_ID)
+        currency, _ = Currency.objects.get_or_create(code=980, defaults={"name": "UAH"})
+        return MonoCard.objects.create(
+            monoaccount=account,
+            id=BENCHMARK_TG_ID,
+            send_id=BENCHMARK_TG_ID,
+            currency=currency,
+            cashback_type="None",
+            balance=0,
+            credit_limit=0,
+            masked_pan=[],
+            type="black",
+            iban=BENCHMARK_TG_ID,
+        )
+
+    def create_transactions(self, card: MonoCard, start: int, end: int):
+        category, _ = Category.objects.get_or_create(name="Benchmark")
+        mcc, _ = CategoryMSO.objects.get_or_create(
+            mso=9999, defaults={"category": category}
+        )
+        now = int(time.time())
+        MonoTransaction.objects.bulk_create(
+            (
+                MonoTransaction(
+                    id=f"{BENCHMARK_TG_ID}_{index}",
+                    time=now - index,
+                    description="benchmark",
+                    mcc=mcc,
+                    amount=-100,
+                    currency=card.currency,
+                    balance=index,
+                    hold=False,
+                    account=card,
+                    cashback_amount=0,
+                )
+                for index in range(start, end)
+            ),
+            batch_size=5000,
+        )
+
+    def benchmark(self, card: MonoCard, rows_count: int):
+        queryset = (
+            MonoTransaction.objects.select_related(
+                "mcc__category", "account__monoaccount__user", "currency"
+            )
+            .filter(account=card)
+            .order_by("time", "id")
+        )
+
+        started_at = time.perf_counter()
+        data = MonoTransactionSerializer(queryset, many=True).data
+        model_duration = time.perf_counter() - started_at
+
+        values_serializer = MonoTransactionValuesListSerializer()
+        started_at = time.perf_counter()
+        values_data = values_serializer.to_representation(
+            values_serializer.get_rows(queryset)
+        )
+        values_duration = time.perf_counter() - started_at
+
+        if not len(data) == len(values_data) == rows_count:
+            raise CommandError(
+                f"expected {rows_count} rows, model serializer returned "
+                f"{len(data)}, values serializer {len(values_data)}"
+            )
+        self.stdout.write(
+            f"{rows_count} rows: "
+            f"model serializer {rows_count / model_duration:,.0f} rows/s "
+            f"({model_duration:.2f}s), "
+            f"values serializer {rows_count / values_duration:,.0f} rows/s "
+            f"({values_duration:.2f}s), "
+            f"x{model_duration / values_duration:.1f}"
+        )
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from monobank.partitions import PARTITION_MONTHS_AHEAD, create_partitions
+
+
+class Command(BaseCommand):
+    help = "Create monthly partitions of transaction tables ahead of time"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+        parser.add_argument(
+            "--from-month",
+            help="YYYY-MM, create partitions for history starting from this month",
+        )
+
+    def handle(self, *args, **options):
+        first_month = None
+        if options["from_month"]:
+            first_month = datetime.strptime(options["from_month"], "%Y-%m").date()
+        created = create_partitions(first_month, options["months_ahead"])
+        self.stdout.write(f"created {len(created)} partition(s): {', '.join(created)}")
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from monobank.models import MonoAccount
+from monobank.partitions import add_months, detach_partitions, get_month
+
+
+class Command(BaseCommand):
+    help = (
+        "Detach monthly transaction partitions older than --keep-months, "
+        "detached tables stay in the database for archiving unless --drop"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-months", type=int, required=True)
+        parser.add_argument("--drop", action="store_true")
+
+    def handle(self, *args, **options):
+        current_month = get_month(int(datetime.now(tz=timezone.utc).timestamp()))
+        before_month = add_months(current_month, -options["keep_months"])
+        detached = detach_partitions(before_month, drop=options["drop"])
+        if detached:
+            # cached responses may still hold transactions of detached months
+            MonoAccount.bump_data_version(
+                *MonoAccount.objects.values_list("pk", flat=True)
+            )
+        self.stdout.write(
+            f"detached {len(detached)} partition(s): {', '.join(detached)}"
+        )
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from monobank.webhook_queue import WebhookQueue, run_webhook_writer
+
+
+class Command(BaseCommand):
+    help = "Write queued monobank webhook transactions in micro-batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.WEBHOOK_WRITER_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--max-wait-ms", type=int, default=settings.WEBHOOK_WRITER_MAX_WAIT_MS
+        )
+        parser.add_argument(
+            "--worker",
+            default="default",
+            help="name of the processing list, unique per running writer",
+        )
+
+    def handle(self, *args, **options):
+        run_webhook_writer(
+            batch_size=options["batch_size"],
+            max_wait_ms=options["max_wait_ms"],
+            queue=WebhookQueue(worker=options["worker"]),
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from monobank.models import JarMonthSummary
+
+
+class Command(BaseCommand):
+    help = "Recalculate jar month summaries from jar transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--jar", action="append", dest="jar_ids", help="jar id, repeatable"
+        )
+
+    def handle(self, *args, **options):
+        count = JarMonthSummary.rebuild(options["jar_ids"])
+        self.stdout.write(f"rebuilt {count} jar month summary(ies)")
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monobank", "0015_monocard_is_active_monojar_is_active"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="monocard",
+            name="sync_watermark",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="monojar",
+            name="sync_watermark",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monobank", "0016_monocard_sync_watermark_monojar_sync_watermark"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="monoaccount",
+            name="last_webhook_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="monoaccount",
+            name="next_refresh_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
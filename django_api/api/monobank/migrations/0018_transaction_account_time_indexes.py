@@ -0,0 +1,40 @@
+# Generated by Django 4.2.6 on 2026-10-18 19:03
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build indexes without locking writes to large transaction tables
+    atomic = False
+
+    dependencies = [
+        ("monobank", "0017_monoaccount_next_refresh_at_last_webhook_at"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="jartransaction",
+            index=models.Index(
+                fields=["account", "time", "id"],
+                include=("amount",),
+                name="jartx_account_time_id_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="jartransaction",
+            index=models.Index(fields=["time", "id"], name="jartx_time_id_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="monotransaction",
+            index=models.Index(
+                fields=["account", "time", "id"],
+                include=("amount",),
+                name="monotx_account_time_id_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="monotransaction",
+            index=models.Index(fields=["time", "id"], name="monotx_time_id_idx"),
+        ),
+    ]
@@ -0,0 +1,125 @@
+"""
+Rebuild transaction tables as monthly range partitions.
+
+Expected downtime: the migration runs in one transaction holding ACCESS
+EXCLUSIVE locks on both transaction tables, reads and writes of transactions
+wait until it commits. Copying takes roughly as long as a full table copy plus
+rebuilding its indexes (minutes per tens of millions of rows), so stop celery
+workers and webhook writers and run it in a maintenance window. Rows are
+copied in primary key batches to keep single statements (and their memory
+and temp files) small.
+"""
+
+import time
+
+from django.db import migrations
+from monobank.partitions import (
+    PARTITION_MONTHS_AHEAD,
+    PARTITIONED_TABLES,
+    add_months,
+    create_month_partition,
+    get_default_partition_name,
+    get_month,
+)
+
+
+# rows copied by a single INSERT
+COPY_BATCH_SIZE = 50000
+
+
+def get_table_definition(cursor, table):
+    """Secondary indexes and foreign keys of the table, to be created again."""
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+        [table, f"{table}_pkey"],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [table],
+    )
+    foreign_keys = cursor.fetchall()
+    return indexes, foreign_keys
+
+
+def copy_rows(cursor, source, target):
+    """Copy all rows of source into target, batch by batch in id order."""
+    last_id = ""
+    while True:
+        cursor.execute(
+            f"WITH batch AS (SELECT * FROM {source} WHERE id > %s "
+            f"ORDER BY id LIMIT %s), "
+            f"copied AS (INSERT INTO {target} SELECT * FROM batch) "
+            f"SELECT MAX(id), COUNT(*) FROM batch",
+            [last_id, COPY_BATCH_SIZE],
+        )
+        last_id, count = cursor.fetchone()
+        if count < COPY_BATCH_SIZE:
+            return
+
+
+def rebuild_table(schema_editor, table, partitioned):
+    """
+    Replace the table with a partitioned (or back with a regular) copy.
+    Postgres requires partition key in the primary key, so (id, time) is used.
+    """
+    quote_name = schema_editor.quote_name
+    old_table = f"{table}_unpartitioned" if partitioned else f"{table}_partitioned"
+    with schema_editor.connection.cursor() as cursor:
+        indexes, foreign_keys = get_table_definition(cursor, table)
+        cursor.execute(f"ALTER TABLE {quote_name(table)} RENAME TO {old_table}")
+        cursor.execute(
+            f"CREATE TABLE {quote_name(table)} "
+            f"(LIKE {old_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            + (' PARTITION BY RANGE ("time")' if partitioned else "")
+        )
+        if partitioned:
+            cursor.execute(
+                f"CREATE TABLE {quote_name(get_default_partition_name(table))} "
+                f"PARTITION OF {quote_name(table)} DEFAULT"
+            )
+            cursor.execute(f'SELECT MIN("time"), MAX("time") FROM {old_table}')
+            min_time, max_time = cursor.fetchone()
+            current_month = get_month(int(time.time()))
+            month = current_month if min_time is None else get_month(min_time)
+            last_month = add_months(current_month, PARTITION_MONTHS_AHEAD)
+            if max_time is not None:
+                last_month = max(last_month, get_month(max_time))
+            while month <= last_month:
+                create_month_partition(table, month, cursor)
+                month = add_months(month, 1)
+        copy_rows(cursor, old_table, quote_name(table))
+        cursor.execute(f"DROP TABLE {old_table} CASCADE")
+        cursor.execute(
+            f"ALTER TABLE {quote_name(table)} ADD CONSTRAINT {table}_pkey "
+            + ('PRIMARY KEY (id, "time")' if partitioned else "PRIMARY KEY (id)")
+        )
+        for index in indexes:
+            cursor.execute(index.replace(" ON ONLY ", " ON "))
+        for name, definition in foreign_keys:
+            cursor.execute(
+                f"ALTER TABLE {quote_name(table)} "
+                f"ADD CONSTRAINT {quote_name(name)} {definition}"
+            )
+
+
+def partition_tables(apps, schema_editor):
+    for table in PARTITIONED_TABLES:
+        rebuild_table(schema_editor, table, partitioned=True)
+
+
+def unpartition_tables(apps, schema_editor):
+    for table in PARTITIONED_TABLES:
+        rebuild_table(schema_editor, table, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monobank", "0018_transaction_account_time_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
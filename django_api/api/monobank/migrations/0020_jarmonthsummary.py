@@ -0,0 +1,64 @@
+# Generated by Django 4.2.6 on 2026-10-18 19:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monobank", "0019_partition_transactions_by_month"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JarMonthSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField()),
+                ("start_balance", models.IntegerField()),
+                ("end_balance", models.IntegerField()),
+                ("budget", models.IntegerField()),
+                ("transactions_count", models.PositiveIntegerField()),
+                (
+                    "jar",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="monobank.monojar",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="jarmonthsummary",
+            constraint=models.UniqueConstraint(
+                fields=("jar", "month"), name="jar_month_summary_unique"
+            ),
+        ),
+        # backfill, same as `manage.py rebuild_jar_month_summaries`
+        migrations.RunSQL(
+            """
+            INSERT INTO monobank_jarmonthsummary
+                (jar_id, month, start_balance, end_balance, budget, transactions_count)
+            SELECT
+                account_id,
+                (date_trunc('month', to_timestamp("time") AT TIME ZONE 'UTC'))::date
+                    AS month,
+                (array_agg(balance ORDER BY "time", id))[1],
+                (array_agg(balance ORDER BY "time" DESC, id DESC))[1],
+                COALESCE(MAX(amount) FILTER (WHERE amount > 0), 0),
+                COUNT(*)
+            FROM monobank_jartransaction
+            GROUP BY account_id, month
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,23 +1,32 @@
 # pyright: reportFunctionMemberAccess = false
 # pyright: reportArgumentType = false
 # pyright: reportMissingTypeArgument = false
+import threading
 import time
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Iterable, NamedTuple
 
 from account.models import User as CustomUser
 from api.celery import app
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import IntegrityError, models
-from django.db.models.signals import pre_save
+from django.core.cache import cache
+from django.db import IntegrityError, connection, connections, models, transaction
+from django.db.models.functions import Ntile, RowNumber, Trunc
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 from humps import decamelize
 from loguru import logger
-from requests import get, post
 
 # from polymorphic.models import PolymorphicModel
-from utils.errors import MonoBankError
+from utils.cache import bump_cache_version, get_cache_version
+from utils.errors import MonoBankRateLimitExceeded
+
+from .client import mono_client
+from .partitions import get_month, get_month_bounds
+from .refresh import refresh_mono_accounts
 
 DEFAULT_RETRY_POLICY = {
     # 'max_retries': 3,
@@ -28,15 +37,55 @@ DEFAULT_RETRY_POLICY = {
 
 User: CustomUser = get_user_model()
 
-MONO_API_URL = "https://api.monobank.ua"
-PERSONAL_INFO_PATH = "/personal/client-info"
-TRANSACTIONS_PATH = "/personal/statement"
+# default statement window used for the first sync of a card/jar (30 days)
+STATEMENT_PERIOD_SECONDS = 2592000
+# already synced history re-requested on every sync to catch late items
+STATEMENT_SYNC_OVERLAP_SECONDS = 3600
+# (min transactions over the activity period, refresh interval in minutes)
+ACCOUNT_REFRESH_INTERVALS = ((50, 30), (5, 60), (1, 360))
+ACCOUNT_REFRESH_INTERVAL_IDLE = 1440
+ACCOUNT_ACTIVITY_PERIOD_DAYS = 7
+# claimed account is not picked by other workers for this long, a refresh
+# that crashed before scheduling the next one is retried after it
+ACCOUNT_REFRESH_LEASE_MINUTES = 15
+# polling is skipped while webhooks arrive at least this often
+ACCOUNT_WEBHOOK_HEALTHY_MINUTES = 1440
+WEBHOOK_ACCOUNT_CACHE_TIMEOUT = 300
+WEBHOOK_SEEN_CACHE_TIMEOUT = 60
+USER_MONOACCOUNT_CACHE_TIMEOUT = 60 * 60
+DATA_VERSION_CACHE_KEY = "monobank:data_version"
 
 
 class MonoDataNotFound(Exception):
     pass
 
 
+def get_statement_period(
+    sync_watermark: int | None,
+    from_unix: int | None = None,
+    to_unix: int | None = None,
+) -> tuple[int, int]:
+    """
+    Return (from_unix, to_unix) window for the next statement request.
+
+    Without explicit bounds the window starts at the sync watermark (minus a
+    small overlap) and is never longer than STATEMENT_PERIOD_SECONDS.
+    """
+    if not to_unix:
+        to_unix = int(time.time())
+    if not from_unix:
+        from_unix = to_unix - STATEMENT_PERIOD_SECONDS
+        if sync_watermark:
+            from_unix = max(from_unix, sync_watermark - STATEMENT_SYNC_OVERLAP_SECONDS)
+    return from_unix, to_unix
+
+
+def get_latest_statement_time(statement: list) -> int | None:
+    """Return the newest transaction time from a statement response."""
+    times = [int(item["time"]) for item in statement if item.get("time")]
+    return max(times) if times else None
+
+
 class Currency(models.Model):
     code = models.IntegerField(unique=True)
     name = models.CharField(max_length=16)
@@ -83,12 +132,124 @@ class CategoryMSO(models.Model):
         return f"{self.mso} ({self.category.name})"
 
 
+REFERENCE_DATA_VERSION_KEY = "monobank:reference_data_version"
+# how often (seconds) a process compares its maps with the shared version
+REFERENCE_DATA_VERSION_CHECK_INTERVAL = 5
+
+
+class ReferenceDataCache:
+    """
+    Process-local code -> object maps for Currency and CategoryMSO.
+
+    Both tables are tiny and almost static, so they are loaded at once and
+    kept in memory. Maps are dropped when the shared version counter (bumped
+    on every change of these tables) differs from the loaded one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self._checked_at = 0.0
+        self._currencies: dict[int, Currency] | None = None
+        self._categories_mso: dict[int, CategoryMSO] | None = None
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._checked_at = 0.0
+            self._currencies = None
+            self._categories_mso = None
+
+    def _check_version(self):
+        now = time.monotonic()
+        if now - self._checked_at < REFERENCE_DATA_VERSION_CHECK_INTERVAL:
+            return
+        version = get_cache_version(REFERENCE_DATA_VERSION_KEY)
+        with self._lock:
+            if version != self._version:
+                self._currencies = None
+                self._categories_mso = None
+                self._version = version
+            self._checked_at = now
+
+    def get_currency(self, code: int | str) -> Currency | None:
+        self._check_version()
+        currencies = self._currencies
+        if currencies is None:
+            currencies = {
+                currency.code: currency for currency in Currency.objects.all()
+            }
+            self._currencies = currencies
+        code = int(code)
+        if code not in currencies:
+            # could be added by other process after the last version check
+            currency = Currency.objects.filter(code=code).first()
+            if currency is None:
+                return None
+            currencies[code] = currency
+        return currencies[code]
+
+    def get_category_mso(self, mso: int | str) -> CategoryMSO | None:
+        self._check_version()
+        categories_mso = self._categories_mso
+        if categories_mso is None:
+            categories_mso = {
+                category_mso.mso: category_mso
+                for category_mso in CategoryMSO.objects.select_related("category")
+            }
+            self._categories_mso = categories_mso
+        mso = int(mso)
+        if mso not in categories_mso:
+            category_mso = (
+                CategoryMSO.objects.select_related("category").filter(mso=mso).first()
+            )
+            if category_mso is None:
+                return None
+            categories_mso[mso] = category_mso
+        return categories_mso[mso]
+
+
+reference_data = ReferenceDataCache()
+
+
+def invalidate_reference_data():
+    reference_data.clear()
+    bump_cache_version(REFERENCE_DATA_VERSION_KEY)
+
+
+@receiver(post_save, sender=Currency)
+@receiver(post_delete, sender=Currency)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=CategoryMSO)
+@receiver(post_delete, sender=CategoryMSO)
+def reference_data_changed_handler(sender, *args, **kwargs):
+    invalidate_reference_data()
+
+
+def get_or_create_currency(currency_code: int | str) -> Currency:
+    currency = reference_data.get_currency(currency_code)
+    if currency is None:
+        currency = Currency.create_unknown_currency(int(currency_code))
+    return currency
+
+
+def get_or_create_category_mso(mso: int | str) -> CategoryMSO:
+    category_mso = reference_data.get_category_mso(mso)
+    if category_mso is None:
+        category, _ = Category.objects.get_or_create(name="Інше")
+        category_mso = CategoryMSO.objects.create(category=category, mso=mso)
+    return category_mso
+
+
 class MonoAccount(models.Model):
     user = models.OneToOneField(
         User, on_delete=models.CASCADE
     )  # pyright: ignore[reportArgumentType]
     mono_token = models.CharField(max_length=255, unique=True)
     active = models.BooleanField(default=True)
+    next_refresh_at = models.DateTimeField(null=True, blank=True)
+    last_webhook_at = models.DateTimeField(null=True, blank=True)
 
     # TODO: add for multi-account access
     # family_members = models.ManyToManyField("self", blank=True)
@@ -101,6 +262,162 @@ class MonoAccount(models.Model):
             "-id",
         ]
 
+    @staticmethod
+    def get_refresh_slot(at: float | None = None) -> int:
+        """Slot refreshed at the given unix time, changes every minute."""
+        if at is None:
+            at = time.time()
+        return int(at // 60) % settings.ACCOUNT_REFRESH_SLOTS
+
+    @staticmethod
+    def get_refresh_cohort(slot: int):
+        """
+        Accounts refreshed in the slot. Sequential ids spread accounts evenly
+        over the slots and keep the slot of every account stable.
+        """
+        return MonoAccount.objects.annotate(
+            refresh_slot=models.F("id") % settings.ACCOUNT_REFRESH_SLOTS
+        ).filter(refresh_slot=slot)
+
+    @staticmethod
+    def get_due_for_refresh(slot: int, now: datetime | None = None):
+        """
+        Accounts never scheduled yet are picked up in their slot, the rest
+        when their next_refresh_at comes. Overlapping runs may pick the same
+        accounts, each one is refreshed only after `claim_refresh`.
+        """
+        if now is None:
+            now = timezone.now()
+        never_scheduled = MonoAccount.get_refresh_cohort(slot).filter(
+            next_refresh_at__isnull=True
+        )
+        return MonoAccount.objects.filter(
+            models.Q(next_refresh_at__lte=now) | models.Q(id__in=never_scheduled)
+        )
+
+    def claim_refresh(self, now: datetime | None = None) -> bool:
+        """
+        Move next_refresh_at of a due account to the end of the refresh lease
+        in a single conditional update. Only one of concurrent workers gets
+        True, the others see the moved time and skip the account.
+        """
+        if now is None:
+            now = timezone.now()
+        lease_until = now + timedelta(minutes=ACCOUNT_REFRESH_LEASE_MINUTES)
+        claimed = (
+            MonoAccount.objects.filter(pk=self.pk)
+            .filter(
+                models.Q(next_refresh_at__isnull=True)
+                | models.Q(next_refresh_at__lte=now)
+            )
+            .update(next_refresh_at=lease_until)
+        )
+        if claimed:
+            self.next_refresh_at = lease_until
+        return bool(claimed)
+
+    def is_webhook_healthy(self, now: datetime | None = None) -> bool:
+        """Webhook delivered a transaction recently, polling is not needed."""
+        if self.last_webhook_at is None:
+            return False
+        if now is None:
+            now = timezone.now()
+        return now - self.last_webhook_at < timedelta(
+            minutes=ACCOUNT_WEBHOOK_HEALTHY_MINUTES
+        )
+
+    def get_refresh_interval(self, now: datetime | None = None) -> int:
+        """Minutes until the next refresh, based on recent activity of the account."""
+        if now is None:
+            now = timezone.now()
+        if self.is_webhook_healthy(now):
+            # rare safety poll in case webhook silently stops
+            return ACCOUNT_REFRESH_INTERVAL_IDLE
+        since = int((now - timedelta(days=ACCOUNT_ACTIVITY_PERIOD_DAYS)).timestamp())
+        transactions_count = (
+            MonoTransaction.objects.filter(
+                account__monoaccount=self, time__gte=since
+            ).count()
+            + JarTransaction.objects.filter(
+                account__monoaccount=self, time__gte=since
+            ).count()
+        )
+        for min_transactions, interval in ACCOUNT_REFRESH_INTERVALS:
+            if transactions_count >= min_transactions:
+                return interval
+        return ACCOUNT_REFRESH_INTERVAL_IDLE
+
+    def schedule_next_refresh(self, now: datetime | None = None):
+        if now is None:
+            now = timezone.now()
+        interval = self.get_refresh_interval(now)
+        self.next_refresh_at = now.replace(second=0, microsecond=0) + timedelta(
+            minutes=interval
+        )
+        self.save(update_fields=["next_refresh_at"])
+        return interval
+
+    @staticmethod
+    def mark_webhook_received(monoaccount_id: int):
+        """Store webhook delivery time, shared cache keeps it to one write a minute."""
+        if cache.add(
+            f"monobank:webhook_seen:{monoaccount_id}",
+            1,
+            timeout=WEBHOOK_SEEN_CACHE_TIMEOUT,
+        ):
+            MonoAccount.objects.filter(pk=monoaccount_id).update(
+                last_webhook_at=timezone.now()
+            )
+
+    @staticmethod
+    def bump_data_version(*monoaccount_ids: int):
+        """Mark cards, jars or transactions of the accounts changed."""
+        now = time.time()
+        keys = [DATA_VERSION_CACHE_KEY]
+        keys.extend(f"{DATA_VERSION_CACHE_KEY}:{pk}" for pk in monoaccount_ids)
+        cache.set_many(dict.fromkeys(keys, now), timeout=None)
+
+    @staticmethod
+    def get_data_version(monoaccount_ids: Iterable[int] | None = None) -> float:
+        """
+        Time of the latest change in data of the accounts, of any account when
+        monoaccount_ids is None. Versions lost by the cache start anew.
+        """
+        if monoaccount_ids is None:
+            keys = [DATA_VERSION_CACHE_KEY]
+        else:
+            keys = [f"{DATA_VERSION_CACHE_KEY}:{pk}" for pk in monoaccount_ids]
+        if not keys:
+            return 0.0
+        versions = cache.get_many(keys)
+        missing = [key for key in keys if key not in versions]
+        if missing:
+            now = time.time()
+            for key in missing:
+                if not cache.add(key, now, timeout=None):
+                    versions[key] = cache.get(key, now)
+                else:
+                    versions[key] = now
+        return max(versions.values())
+
+    @staticmethod
+    def get_user_account_ids(tg_ids: Iterable[str]) -> list[int]:
+        """Ids of mono accounts of the users, cached."""
+        keys = {f"monobank:user_monoaccount:{tg_id}": str(tg_id) for tg_id in tg_ids}
+        account_ids = cache.get_many(keys)
+        missing = {key: tg_id for key, tg_id in keys.items() if key not in account_ids}
+        if missing:
+            found = dict(
+                MonoAccount.objects.filter(user_id__in=missing.values()).values_list(
+                    "user_id", "id"
+                )
+            )
+            # users without account are cached as 0
+            loaded = {key: found.get(tg_id, 0) for key, tg_id in missing.items()}
+            cache.set_many(loaded, USER_MONOACCOUNT_CACHE_TIMEOUT)
+            account_ids.update(loaded)
+        return sorted(pk for pk in account_ids.values() if pk)
+
     @staticmethod
     def set_monobank_webhook():
         accounts = MonoAccount.objects.filter(active=True).values("mono_token")
@@ -114,17 +431,8 @@ class MonoAccount(models.Model):
         logger.info(accounts)
         return accounts
 
-    def get_cards_jars(self) -> dict:
-        url = MONO_API_URL + PERSONAL_INFO_PATH
-        headers = {"X-Token": self.mono_token}
-        user_data = get(url, headers=headers)
-        if user_data.status_code == 403:
-            raise MonoBankError("too many requests")
-        data = user_data.json()
-        if data.get("errorDescription"):
-            # TODO: add logs / notifying
-            raise MonoBankError(data["errorDescription"])
-        return data
+    def get_cards_jars(self, max_wait: float | None = None) -> dict:
+        return mono_client.get_client_info(self.mono_token, max_wait=max_wait)
 
     def create_cards_jars(self, data: dict | None = None):
         if not data:
@@ -139,14 +447,20 @@ class MonoAccount(models.Model):
         active_jar_ids = [jar.get("id") for jar in jars if jar.get("id")]
 
         # Mark existing cards as inactive if they're not in the API response
-        MonoCard.objects.filter(monoaccount=self).exclude(
-            id__in=active_card_ids
-        ).update(is_active=False)
+        deactivated = (
+            MonoCard.objects.filter(monoaccount=self, is_active=True)
+            .exclude(id__in=active_card_ids)
+            .update(is_active=False)
+        )
 
         # Mark existing jars as inactive if they're not in the API response
-        MonoJar.objects.filter(monoaccount=self).exclude(id__in=active_jar_ids).update(
-            is_active=False
+        deactivated += (
+            MonoJar.objects.filter(monoaccount=self, is_active=True)
+            .exclude(id__in=active_jar_ids)
+            .update(is_active=False)
         )
+        if deactivated:
+            MonoAccount.bump_data_version(self.pk)
 
         # Process cards from API (create/update and mark as active)
         for card in cards:
@@ -170,10 +484,8 @@ class MonoAccount(models.Model):
         retry_kwargs={"max_retries": 5, "countdown": 60},
     )
     def update_users(self):
-        users = MonoAccount.objects.all()
-        for user in users:
-            logger.info(f"updating {user}")
-            user.create_cards_jars()
+        results = refresh_mono_accounts(MonoAccount.objects.select_related("user"))
+        return [result._asdict() for result in results]
 
 
 @app.task(
@@ -185,14 +497,15 @@ def set_account_webhook_by_token(self, token: str):
     logger.debug(
         f"webhook account: {token} start request with data {settings.WEBHOOK_URL, token}"
     )
-    data = '{"webHookUrl": "{}"}'.replace("{}", f"{settings.WEBHOOK_URL}?token={token}")
-    headers = {"X-Token": token, "Content-Type": "application/json"}
-    webhook_response = post(
-        url="https://api.monobank.ua/personal/webhook", data=data, headers=headers
-    )
-    logger.debug(
-        f"webhook account: {token}, status: {webhook_response.status_code}, text: {webhook_response.text}"
-    )
+    try:
+        mono_client.set_webhook(token, f"{settings.WEBHOOK_URL}?token={token}")
+    except MonoBankRateLimitExceeded as err:
+        raise self.retry(
+            exc=err,
+            countdown=err.retry_after,
+            max_retries=settings.MONOBANK_RATE_LIMIT_MAX_RETRIES,
+        )
+    logger.debug(f"webhook account: {token} is set")
 
 
 class MonoCard(models.Model):
@@ -209,6 +522,8 @@ class MonoCard(models.Model):
     )
     iban = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
+    # time of the newest transaction received from statement sync
+    sync_watermark = models.BigIntegerField(null=True, blank=True)
 
     @property
     def owner_name(self):
@@ -217,32 +532,35 @@ class MonoCard(models.Model):
     def get_transactions(
         self, from_unix: int | None = None, to_unix: int | None = None
     ) -> list:
-        # 30 days
-        requested_period = 2592000
-        if not to_unix:
-            to_unix = int(time.time())
-        if not from_unix:
-            from_unix = to_unix - requested_period
-
-        url = f"{MONO_API_URL}{TRANSACTIONS_PATH}/{self.id}/{from_unix}/{to_unix}"
-        headers = {"X-Token": self.monoaccount.mono_token}
-        user_data = get(url, headers=headers)
-        if user_data.status_code == 403:
-            raise MonoBankError("too many requests")
-        data = user_data.json()
-
-        if not isinstance(data, list) and data.get("errorDescription"):
-            # TODO: add logs / notifying
-            raise MonoBankError(data.get("errorDescription"))
-        for transaction in data:
-            MonoTransaction.create_transaction_from_webhook.apply_async(
-                args=(self.id, transaction),
+        from_unix, to_unix = get_statement_period(
+            self.sync_watermark, from_unix, to_unix
+        )
+
+        data = mono_client.get_statement(
+            self.monoaccount.mono_token, self.id, from_unix, to_unix
+        )
+        if data:
+            MonoTransaction.create_transactions_from_statement.apply_async(
+                args=(self.id, data),
                 retry=True,
                 retry_policy=DEFAULT_RETRY_POLICY,
             )
 
         return data
 
+    def update_sync_watermark(self, statement: list):
+        latest_time = get_latest_statement_time(statement)
+        if latest_time and latest_time > (self.sync_watermark or 0):
+            self.sync_watermark = latest_time
+            self.save(update_fields=["sync_watermark"])
+
+    def get_available_months(self) -> list[date]:
+        """
+        Return a sorted list of date objects representing the first day of each
+        month for which this card has at least one transaction.
+        """
+        return get_transaction_months(MonoTransaction.objects.filter(account=self))
+
     def __str__(self):
         return f"{self.monoaccount.user.name or self.monoaccount.user.tg_id}-card-{self.type}"
 
@@ -256,11 +574,7 @@ class MonoCard(models.Model):
     ):
         mono_account = MonoAccount.objects.select_related("user").get(user__tg_id=tg_id)
         card_data = decamelize(card_data)
-        currency_code = card_data.pop("currency_code")
-        try:
-            currency = Currency.objects.get(code=int(currency_code))
-        except Currency.DoesNotExist:
-            currency = Currency.create_unknown_currency(currency_code)
+        currency = get_or_create_currency(card_data.pop("currency_code"))
         try:
             mono_card = MonoCard.objects.get(id=card_data.get("id"))
             for key, value in card_data.items():
@@ -273,7 +587,15 @@ class MonoCard(models.Model):
                 monoaccount=mono_account, currency=currency, **card_data
             )
         if update_transactions:
-            mono_card.get_transactions()
+            try:
+                mono_card.get_transactions()
+            except MonoBankRateLimitExceeded as err:
+                # statement slot of this token is taken for a while, come back then
+                raise self.retry(
+                    exc=err,
+                    countdown=err.retry_after,
+                    max_retries=settings.MONOBANK_RATE_LIMIT_MAX_RETRIES,
+                )
 
 
 class MonoJar(models.Model):
@@ -287,6 +609,8 @@ class MonoJar(models.Model):
     goal = models.IntegerField(null=True, blank=True)
     is_budget = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    # time of the newest transaction received from statement sync
+    sync_watermark = models.BigIntegerField(null=True, blank=True)
 
     @property
     def formatted_balance(self):
@@ -316,11 +640,7 @@ class MonoJar(models.Model):
 
         jar_data = decamelize(jar_data)
         jar_data.pop("description")
-        currency_code = jar_data.pop("currency_code")
-        try:
-            currency = Currency.objects.get(code=int(currency_code))
-        except Currency.DoesNotExist:
-            currency = Currency.create_unknown_currency(currency_code)
+        currency = get_or_create_currency(jar_data.pop("currency_code"))
         try:
             mono_jar = MonoJar.objects.get(id=jar_data.get("id"))
             for key, value in jar_data.items():
@@ -333,50 +653,53 @@ class MonoJar(models.Model):
                 monoaccount=mono_account, currency=currency, **jar_data
             )
         if update_transactions:
-            mono_jar.get_transactions()
+            try:
+                mono_jar.get_transactions()
+            except MonoBankRateLimitExceeded as err:
+                # statement slot of this token is taken for a while, come back then
+                raise self.retry(
+                    exc=err,
+                    countdown=err.retry_after,
+                    max_retries=settings.MONOBANK_RATE_LIMIT_MAX_RETRIES,
+                )
 
     def get_transactions(
         self, from_unix: int | None = None, to_unix: int | None = None
     ) -> list:
-        # 30 days
-        requested_period = 2592000
-        if not to_unix:
-            to_unix = int(time.time())
-        if not from_unix:
-            from_unix = to_unix - requested_period
-
-        url = f"{MONO_API_URL}{TRANSACTIONS_PATH}/{self.id}/{from_unix}/{to_unix}"
-        headers = {"X-Token": self.monoaccount.mono_token}
-        user_data = get(url, headers=headers)
-
-        data = user_data.json()
-        if not isinstance(data, list) and data.get("errorDescription"):
-            # TODO: add logs / notifying
-            raise MonoBankError(data.get("errorDescription"))
-        for transaction in data:
-            JarTransaction.create_jar_transaction_from_webhook.apply_async(
-                args=(self.id, transaction),
+        from_unix, to_unix = get_statement_period(
+            self.sync_watermark, from_unix, to_unix
+        )
+
+        data = mono_client.get_statement(
+            self.monoaccount.mono_token, self.id, from_unix, to_unix
+        )
+        if data:
+            JarTransaction.create_jar_transactions_from_statement.apply_async(
+                args=(self.id, data),
                 retry=True,
                 retry_policy=DEFAULT_RETRY_POLICY,
             )
-            # JarTransaction.create_jar_transaction_from_webhook(self.id, transaction)
 
         return data
 
+    def update_sync_watermark(self, statement: list):
+        latest_time = get_latest_statement_time(statement)
+        if latest_time and latest_time > (self.sync_watermark or 0):
+            self.sync_watermark = latest_time
+            self.save(update_fields=["sync_watermark"])
+
     def get_available_months(self) -> list[date]:
         """
         Return a sorted list of date objects representing the first day of each
         month for which this jar has at least one transaction. Consumers can use
         returned items' .year and .month for further manipulations.
+        Served from JarMonthSummary rollup.
         """
-        timestamps = JarTransaction.objects.filter(account=self).values_list(
-            "time", flat=True
+        return list(
+            JarMonthSummary.objects.filter(jar=self)
+            .order_by("month")
+            .values_list("month", flat=True)
         )
-        unique_year_month: set[tuple[int, int]] = set()
-        for ts in timestamps:
-            dt = datetime.fromtimestamp(int(ts))
-            unique_year_month.add((dt.year, dt.month))
-        return sorted(date(y, m, 1) for y, m in unique_year_month)
 
     def get_month_summary(self, month: str | date) -> dict:
         """
@@ -388,61 +711,144 @@ class MonoJar(models.Model):
         - budget: largest positive single transaction amount in the month
         - end_balance: balance from the latest transaction in the month
         - spent: calculated as start_balance - end_balance - budget
+
+        Read from JarMonthSummary rollup maintained on transaction writes.
         """
         if isinstance(month, str):
             month_date = datetime.strptime(month, "%Y-%m-%d").date()
         else:
             month_date = month
 
-        month_start = date(month_date.year, month_date.month, 1)
-        if month_start.month == 12:
-            next_month_start = date(month_start.year + 1, 1, 1)
-        else:
-            next_month_start = date(month_start.year, month_start.month + 1, 1)
-
-        start_ts = int(datetime.combine(month_start, datetime.min.time()).timestamp())
-        end_ts = int(
-            datetime.combine(next_month_start, datetime.min.time()).timestamp()
-        )
-
-        qs = JarTransaction.objects.filter(
-            account=self, time__gte=start_ts, time__lt=end_ts
-        ).order_by("time", "id")
-
-        if not qs.exists():
+        try:
+            summary = JarMonthSummary.objects.get(
+                jar=self, month=date(month_date.year, month_date.month, 1)
+            )
+        except JarMonthSummary.DoesNotExist:
             return {
                 "start_balance": 0,
                 "budget": 0,
                 "end_balance": 0,
                 "spent": 0,
             }
+        return summary.as_dict()
+
+
+def get_transaction_period(kind: str = "month") -> Trunc:
+    """First day of UTC day/week/month of transaction unix `time`, as SQL expression."""
+    return Trunc(
+        models.Func(
+            models.F("time"),
+            function="to_timestamp",
+            output_field=models.DateTimeField(),
+        ),
+        kind,
+        output_field=models.DateField(),
+        tzinfo=dt_timezone.utc,
+    )
 
-        first_tx = qs.first()
-        last_tx = qs.last()
-        positive_budget = (
-            qs.filter(amount__gt=0)
-            .order_by("-amount")
-            .values_list("amount", flat=True)
-            .first()
-        )
-        budget = int(positive_budget) if positive_budget is not None else 0
 
-        start_balance = int(first_tx.balance)
-        end_balance = int(last_tx.balance)
-        spent = start_balance - end_balance - budget
+def get_transaction_months(queryset: models.QuerySet) -> list[date]:
+    """First days of UTC months having transactions in queryset, grouped in SQL."""
+    return list(
+        queryset.annotate(month=get_transaction_period("month"))
+        .order_by("month")
+        .values_list("month", flat=True)
+        .distinct()
+    )
 
-        return {
-            "start_balance": start_balance,
-            "budget": budget,
-            "end_balance": end_balance,
-            "spent": spent,
-        }
+
+def get_balance_series(queryset: models.QuerySet, points: int) -> list[dict]:
+    """
+    Time and balance of transactions in queryset ordered by time, at most
+    `points` (4 or more) of them. Longer series are downsampled in SQL: rows
+    are split into equal buckets in time order and only the lowest and the
+    highest balance of each bucket is kept, along with the first and the last
+    row, so the payload size doesn't depend on the history length.
+    """
+    buckets = max((points - 2) // 2, 1)
+    order_by = [models.F("time").asc(), models.F("id").asc()]
+    numbered = (
+        queryset.order_by()
+        .annotate(
+            bucket=models.Window(Ntile(buckets), order_by=order_by),
+            position=models.Window(RowNumber(), order_by=order_by),
+            total=models.Window(models.Count("*")),
+        )
+        .values("time", "balance", "bucket", "position", "total")
+    )
+    sql, params = numbered.query.sql_with_params()
+    query = f"""
+        SELECT "time", balance FROM (
+            SELECT "time", balance, position, total,
+                row_number() OVER (
+                    PARTITION BY bucket ORDER BY balance, position
+                ) AS lowest,
+                row_number() OVER (
+                    PARTITION BY bucket ORDER BY balance DESC, position
+                ) AS highest
+            FROM ({sql}) numbered
+        ) ranked
+        WHERE total <= %s OR lowest = 1 OR highest = 1 OR position IN (1, total)
+        ORDER BY position
+    """
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(query, [*params, points])
+        return [{"time": row[0], "balance": row[1]} for row in cursor.fetchall()]
 
 
 def formatted_sum(sum: int, currency_name: str):
     return f"{sum / 100:.2f} {currency_name}"
 
 
+def resolve_statement_references(
+    statement: list[dict],
+) -> tuple[dict[int, CategoryMSO], dict[int, Currency]]:
+    """
+    Resolve categories (by mso) and currencies used by statement items.
+
+    Lookups are served from reference data cache. Unknown mso codes are created
+    under "Інше" category and unknown currencies via
+    Currency.create_unknown_currency, same as single transaction tasks do.
+    """
+    if any("mcc" not in item for item in statement):
+        fallback_mso = CategoryMSO.objects.count()
+        for item in statement:
+            item.setdefault("mcc", fallback_mso)
+
+    mcc_by_mso = {}
+    for mso in {int(item["mcc"]) for item in statement}:
+        mcc_by_mso[mso] = get_or_create_category_mso(mso)
+    currency_by_code = {}
+    for currency_code in {int(item["currencyCode"]) for item in statement}:
+        currency_by_code[currency_code] = get_or_create_currency(currency_code)
+    return mcc_by_mso, currency_by_code
+
+
+def build_statement_transactions(
+    model: type[models.Model], account: models.Model, statement: list[dict]
+) -> list:
+    """
+    Build unsaved `model` instances (MonoTransaction or JarTransaction) for
+    statement items. Keys without a matching model field are skipped.
+    """
+    mcc_by_mso, currency_by_code = resolve_statement_references(statement)
+    field_names = {
+        field.name for field in model._meta.concrete_fields if not field.is_relation
+    }
+    transactions = []
+    for item in statement:
+        item = decamelize(item)
+        transactions.append(
+            model(
+                account=account,
+                mcc=mcc_by_mso[int(item["mcc"])],
+                currency=currency_by_code[int(item["currency_code"])],
+                **{key: value for key, value in item.items() if key in field_names},
+            )
+        )
+    return transactions
+
+
 class MonoTransaction(models.Model):
     id = models.CharField(max_length=255, primary_key=True)
     time = models.IntegerField()
@@ -462,6 +868,18 @@ class MonoTransaction(models.Model):
     cashback_amount = models.IntegerField()
     comment = models.TextField(max_length=2048, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # account windows sorted by ("time", "id"), amount covers sums
+            models.Index(
+                fields=["account", "time", "id"],
+                include=["amount"],
+                name="monotx_account_time_id_idx",
+            ),
+            # time windows across all accounts (reports, ai tools)
+            models.Index(fields=["time", "id"], name="monotx_time_id_idx"),
+        ]
+
     @property
     def owner_name(self):
         return self.account.monoaccount.user.name
@@ -474,7 +892,7 @@ class MonoTransaction(models.Model):
         return formatted_sum(self.balance, self.currency.name if self.currency else "?")
 
     def formatted_time(self):
-        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.time))
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(self.time))
 
     @app.task(
         bind=True,
@@ -489,17 +907,9 @@ class MonoTransaction(models.Model):
         except KeyError:
             mso_number = CategoryMSO.objects.count()
             mso = mso_number
-        try:
-            mcc = CategoryMSO.objects.get(mso=mso)
-        except ObjectDoesNotExist:
-            category, _ = Category.objects.get_or_create(name="Інше")
-            mcc = CategoryMSO.objects.create(category=category, mso=mso)
+        mcc = get_or_create_category_mso(mso)
         transaction_data = decamelize(transaction_data)
-        currency_code = transaction_data.pop("currency_code")
-        try:
-            currency = Currency.objects.get(code=int(currency_code))
-        except Currency.DoesNotExist:
-            currency = Currency.create_unknown_currency(currency_code)
+        currency = get_or_create_currency(transaction_data.pop("currency_code"))
         try:
             mono_transaction = MonoTransaction.objects.get_or_create(
                 account=account,
@@ -510,6 +920,21 @@ class MonoTransaction(models.Model):
         except IntegrityError:
             pass
 
+    @app.task(
+        bind=True,
+        autoretry_for=(Exception,),
+        retry_kwargs={"max_retries": 5, "countdown": 60},
+    )
+    def create_transactions_from_statement(self, card_id, statement: list):
+        account = MonoCard.objects.get(id=card_id)
+        transactions = build_statement_transactions(MonoTransaction, account, statement)
+        MonoTransaction.objects.bulk_create(
+            transactions, batch_size=500, ignore_conflicts=True
+        )
+        if transactions:
+            MonoAccount.bump_data_version(account.monoaccount_id)
+        account.update_sync_watermark(statement)
+
 
 class JarTransaction(models.Model):
     account = models.ForeignKey(MonoJar, on_delete=models.CASCADE)
@@ -527,6 +952,18 @@ class JarTransaction(models.Model):
     hold = models.BooleanField()
     comment = models.TextField(max_length=2048, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # account windows sorted by ("time", "id"), amount covers sums
+            models.Index(
+                fields=["account", "time", "id"],
+                include=["amount"],
+                name="jartx_account_time_id_idx",
+            ),
+            # time windows across all accounts (reports, ai tools)
+            models.Index(fields=["time", "id"], name="jartx_time_id_idx"),
+        ]
+
     @property
     def owner_name(self):
         return self.account.monoaccount.user.name
@@ -545,7 +982,7 @@ class JarTransaction(models.Model):
 
     @property
     def formatted_time(self):
-        return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.time))
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(self.time))
 
     @app.task(
         bind=True,
@@ -560,17 +997,9 @@ class JarTransaction(models.Model):
         except KeyError:
             mso_number = CategoryMSO.objects.count()
             mso = mso_number
-        try:
-            mcc = CategoryMSO.objects.get(mso=mso)
-        except ObjectDoesNotExist:
-            category, _ = Category.objects.get_or_create(name="Інше")
-            mcc = CategoryMSO.objects.create(category=category, mso=mso)
+        mcc = get_or_create_category_mso(mso)
         transaction_data = decamelize(transaction_data)
-        currency_code = transaction_data.pop("currency_code")
-        try:
-            currency = Currency.objects.get(code=int(currency_code))
-        except Currency.DoesNotExist:
-            currency = Currency.create_unknown_currency(currency_code)
+        currency = get_or_create_currency(transaction_data.pop("currency_code"))
         JarTransaction.objects.get_or_create(
             account=account,
             mcc=mcc,
@@ -578,6 +1007,294 @@ class JarTransaction(models.Model):
             **transaction_data,
         )
 
+    @app.task(
+        bind=True,
+        autoretry_for=(Exception,),
+        retry_kwargs={"max_retries": 5, "countdown": 60},
+    )
+    def create_jar_transactions_from_statement(self, jar_id, statement: list):
+        account = MonoJar.objects.get(id=jar_id)
+        transactions = build_statement_transactions(JarTransaction, account, statement)
+        JarTransaction.objects.bulk_create(
+            transactions, batch_size=500, ignore_conflicts=True
+        )
+        JarMonthSummary.refresh((jar_id, item.time) for item in transactions)
+        if transactions:
+            MonoAccount.bump_data_version(account.monoaccount_id)
+        account.update_sync_watermark(statement)
+
+
+class JarMonthSummary(models.Model):
+    """
+    Per jar and UTC month rollup of jar transactions, refreshed whenever
+    transactions of the month are written. Months, days and formatted times
+    of the api are UTC everywhere, like partitions of transaction tables.
+    """
+
+    jar = models.ForeignKey(MonoJar, on_delete=models.CASCADE)
+    month = models.DateField()
+    start_balance = models.IntegerField()
+    end_balance = models.IntegerField()
+    budget = models.IntegerField()  # largest deposit of the month
+    transactions_count = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["jar", "month"], name="jar_month_summary_unique"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.jar_id} {self.month:%Y-%m}"
+
+    def as_dict(self) -> dict:
+        return {
+            "start_balance": self.start_balance,
+            "budget": self.budget,
+            "end_balance": self.end_balance,
+            "spent": self.start_balance - self.end_balance - self.budget,
+        }
+
+    @staticmethod
+    def _upsert(where: str = "", params: list | None = None) -> int:
+        """Recalculate summaries of jar months matching `where` in a single query."""
+        sql = f"""
+            INSERT INTO {JarMonthSummary._meta.db_table}
+                (jar_id, month, start_balance, end_balance, budget, transactions_count)
+            SELECT
+                account_id,
+                (date_trunc('month', to_timestamp("time") AT TIME ZONE 'UTC'))::date
+                    AS month,
+                (array_agg(balance ORDER BY "time", id))[1],
+                (array_agg(balance ORDER BY "time" DESC, id DESC))[1],
+                COALESCE(MAX(amount) FILTER (WHERE amount > 0), 0),
+                COUNT(*)
+            FROM {JarTransaction._meta.db_table}
+            {where}
+            GROUP BY account_id, month
+            ON CONFLICT (jar_id, month) DO UPDATE SET
+                start_balance = EXCLUDED.start_balance,
+                end_balance = EXCLUDED.end_balance,
+                budget = EXCLUDED.budget,
+                transactions_count = EXCLUDED.transactions_count
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params or [])
+            return cursor.rowcount
+
+    @staticmethod
+    def get_jar_months(jar_times: Iterable[tuple[str, int]]) -> set[tuple[str, date]]:
+        return {(jar_id, get_month(int(timestamp))) for jar_id, timestamp in jar_times}
+
+    @staticmethod
+    def lock_months(jar_months: list[tuple[str, date]]):
+        """
+        Take transaction level advisory locks of jar months, in the given order
+        (sorted by callers, so concurrent writers don't deadlock).
+        """
+        locks = ", ".join(["pg_advisory_xact_lock(hashtext(%s), %s)"] * len(jar_months))
+        params = []
+        for jar_id, month in jar_months:
+            params.extend([jar_id, month.toordinal()])
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {locks}", params)
+
+    @staticmethod
+    def refresh(jar_times: Iterable[tuple[str, int]]) -> int:
+        """
+        Recalculate months of the given (jar id, transaction time) pairs.
+        Refreshes of the same month are serialized, so a summary computed from
+        an older snapshot can't overwrite a newer one.
+        """
+        jar_months = sorted(JarMonthSummary.get_jar_months(jar_times))
+        if not jar_months:
+            return 0
+        conditions = []
+        params = []
+        for jar_id, month in jar_months:
+            start, end = get_month_bounds(month)
+            conditions.append('(account_id = %s AND "time" >= %s AND "time" < %s)')
+            params.extend([jar_id, start, end])
+        # locks are held until the end of the outermost transaction
+        with transaction.atomic(savepoint=False):
+            # the upsert snapshot is taken after the lock, it sees every
+            # transaction committed by the previous holder
+            JarMonthSummary.lock_months(jar_months)
+            return JarMonthSummary._upsert(f"WHERE {' OR '.join(conditions)}", params)
+
+    @staticmethod
+    def rebuild(jar_ids: list[str] | None = None) -> int:
+        """Recalculate all summaries (of the given jars), used for backfills."""
+        summaries = JarMonthSummary.objects.all()
+        jars = MonoJar.objects.all()
+        if jar_ids:
+            summaries = summaries.filter(jar_id__in=jar_ids)
+            jars = jars.filter(id__in=jar_ids)
+        with transaction.atomic():
+            summaries.delete()
+            if jar_ids:
+                count = JarMonthSummary._upsert("WHERE account_id = ANY(%s)", [jar_ids])
+            else:
+                count = JarMonthSummary._upsert()
+        MonoAccount.bump_data_version(
+            *jars.values_list("monoaccount_id", flat=True).distinct()
+        )
+        return count
+
+
+@receiver(post_save, sender=JarTransaction)
+def jar_transaction_saved_handler(sender, instance, *args, **kwargs):
+    JarMonthSummary.refresh([(instance.account_id, instance.time)])
+
+
+@receiver(post_delete, sender=JarTransaction)
+def jar_transaction_deleted_handler(sender, instance, *args, **kwargs):
+    month = get_month(int(instance.time))
+    if not JarMonthSummary.refresh([(instance.account_id, instance.time)]):
+        # last transaction of the month is gone
+        JarMonthSummary.objects.filter(jar_id=instance.account_id, month=month).delete()
+
+
+class WebhookAccount(NamedTuple):
+    id: str
+    is_jar: bool
+    monoaccount_id: int
+    mono_token: str
+
+    def as_instance(self) -> "MonoCard | MonoJar":
+        """Unsaved card/jar holding only keys, enough to reference it on insert."""
+        model = MonoJar if self.is_jar else MonoCard
+        return model(id=self.id, monoaccount_id=self.monoaccount_id)
+
+
+def get_webhook_account_cache_key(account_id: str) -> str:
+    return f"monobank:webhook_account:{account_id}"
+
+
+def get_webhook_account(
+    account_id: str, use_cache: bool = True
+) -> WebhookAccount | None:
+    """
+    Resolve card or jar of a webhook with the token of its owner in a single
+    query, the result is kept in the shared cache for a few minutes.
+    """
+    cache_key = get_webhook_account_cache_key(account_id)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return WebhookAccount(*cached)
+
+    fields = ("id", "is_jar", "monoaccount_id", "mono_token")
+    cards = (
+        MonoCard.objects.filter(id=account_id)
+        .annotate(
+            is_jar=models.Value(False), mono_token=models.F("monoaccount__mono_token")
+        )
+        .values_list(*fields)
+    )
+    jars = (
+        MonoJar.objects.filter(id=account_id)
+        .annotate(
+            is_jar=models.Value(True), mono_token=models.F("monoaccount__mono_token")
+        )
+        .values_list(*fields)
+    )
+    row = next(iter(cards.union(jars, all=True)), None)
+    if row is None:
+        return None
+    cache.set(cache_key, row, timeout=WEBHOOK_ACCOUNT_CACHE_TIMEOUT)
+    return WebhookAccount(*row)
+
+
+def insert_ignore_conflicts(instance: models.Model) -> bool:
+    """
+    Insert a transaction in one round trip, unless a row with the same id
+    and time exists. The check filters on time too, so partition pruning
+    limits it to the partition of the row, ON CONFLICT DO NOTHING covers
+    races. Returns False when the row already exists.
+    """
+    meta = instance._meta
+    fields = meta.concrete_fields
+    time_field = meta.get_field("time")
+    quote_name = connection.ops.quote_name
+    sql = (
+        "INSERT INTO {table} ({columns}) SELECT {values} "
+        "WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {pk} = %s AND {time} = %s) "
+        "ON CONFLICT DO NOTHING"
+    ).format(
+        table=quote_name(meta.db_table),
+        columns=", ".join(quote_name(field.column) for field in fields),
+        values=", ".join(f"%s::{field.db_type(connection)}" for field in fields),
+        pk=quote_name(meta.pk.column),
+        time=quote_name(time_field.column),
+    )
+    params = [
+        field.get_db_prep_save(getattr(instance, field.attname), connection)
+        for field in fields
+    ]
+    row_time = time_field.get_db_prep_save(instance.time, connection)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, instance.pk, row_time])
+        return cursor.rowcount == 1
+
+
+@receiver(post_save, sender=MonoCard)
+@receiver(post_delete, sender=MonoCard)
+@receiver(post_save, sender=MonoJar)
+@receiver(post_delete, sender=MonoJar)
+def account_data_changed_handler(sender, instance, **kwargs):
+    MonoAccount.bump_data_version(instance.monoaccount_id)
+
+
+@receiver(post_save, sender=MonoTransaction)
+@receiver(post_delete, sender=MonoTransaction)
+@receiver(post_save, sender=JarTransaction)
+@receiver(post_delete, sender=JarTransaction)
+def transaction_changed_handler(sender, instance, **kwargs):
+    # bulk writes skip signals and bump once per batch instead
+    if sender.account.is_cached(instance):
+        monoaccount_id = instance.account.monoaccount_id
+    else:
+        # card or jar is not loaded, resolve the owner from the shared cache
+        account = get_webhook_account(instance.account_id)
+        if account is None:
+            return
+        monoaccount_id = account.monoaccount_id
+    MonoAccount.bump_data_version(monoaccount_id)
+
+
+@receiver(post_save, sender=User)
+def user_changed_handler(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "name" not in update_fields:
+        return
+    # owner name is a part of serialized cards, jars and transactions
+    MonoAccount.bump_data_version(*MonoAccount.get_user_account_ids([instance.pk]))
+
+
+@receiver(post_delete, sender=MonoAccount)
+def mono_account_deleted_handler(sender, instance, **kwargs):
+    cache.delete(f"monobank:user_monoaccount:{instance.user_id}")
+    MonoAccount.bump_data_version(instance.pk)
+
+
+@receiver(post_save, sender=MonoAccount)
+def mono_account_changed_handler(
+    sender, instance, created=False, update_fields=None, **kwargs
+):
+    if created or update_fields is None:
+        cache.delete(f"monobank:user_monoaccount:{instance.user_id}")
+    if update_fields is not None and "mono_token" not in update_fields:
+        return
+    # token may be changed, cached webhook accounts keep the old one
+    account_ids = [
+        *MonoCard.objects.filter(monoaccount=instance).values_list("id", flat=True),
+        *MonoJar.objects.filter(monoaccount=instance).values_list("id", flat=True),
+    ]
+    cache.delete_many(
+        [get_webhook_account_cache_key(account_id) for account_id in account_ids]
+    )
+
 
 @receiver(pre_save)
 def pre_save_handler(sender, instance: MonoTransaction, *args, **kwargs):
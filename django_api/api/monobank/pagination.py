@@ -0,0 +1,98 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class TransactionCursorPagination(BasePagination):
+    """
+    Keyset pagination of transactions ordered by (time, id).
+
+    A page continues right after the last row of the previous one, so deep pages
+    are an index range scan as cheap as the first page. Lists are always
+    paginated, TRANSACTIONS_PAGE_SIZE rows by default and at most
+    TRANSACTIONS_MAX_PAGE_SIZE, clients follow `next` for the rest.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def get_page_size(self, request) -> int:
+        page_size = request.query_params.get(self.page_size_query_param)
+        if page_size is None:
+            return settings.TRANSACTIONS_PAGE_SIZE
+        try:
+            page_size = int(page_size)
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: "must be an integer"})
+        if page_size < 1:
+            raise ValidationError({self.page_size_query_param: "must be positive"})
+        return min(page_size, settings.TRANSACTIONS_MAX_PAGE_SIZE)
+
+    @staticmethod
+    def encode_cursor(time: int, id: str) -> str:
+        return base64.urlsafe_b64encode(f"{time}:{id}".encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> tuple[int, str]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            time, id = base64.urlsafe_b64decode(padded).decode().split(":", 1)
+            return int(time), id
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValidationError({self.cursor_query_param: "invalid cursor"})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by("time", "id")
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            time, id = self.decode_cursor(cursor)
+            # time__gte bounds the index range, the OR only resolves ties
+            queryset = queryset.filter(time__gte=time).filter(
+                Q(time__gt=time) | Q(id__gt=id)
+            )
+
+        # one extra row tells whether there is a next page
+        page = list(queryset[: page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.next_cursor = None
+        if self.has_next:
+            last = page[-1]
+            if isinstance(last, dict):  # values() rows
+                self.next_cursor = self.encode_cursor(last["time"], last["id"])
+            else:
+                self.next_cursor = self.encode_cursor(last.time, last.id)
+        return page
+
+    def get_next_link(self) -> str | None:
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor,
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {"next": self.get_next_link(), "cursor": self.next_cursor, "results": data}
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "cursor": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
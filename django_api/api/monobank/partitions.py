@@ -0,0 +1,157 @@
+"""
+Monthly range partitions of transaction tables by unix `time` (UTC months).
+
+Each table has a DEFAULT partition for rows outside of created months, rows
+already stored there are moved when a partition for their month is created.
+"""
+
+from datetime import date, datetime, timezone
+
+from django.db import connection, transaction
+from loguru import logger
+
+PARTITIONED_TABLES = ("monobank_monotransaction", "monobank_jartransaction")
+# month rollups of jar transactions, see JarMonthSummary
+JAR_MONTH_SUMMARIES = {"monobank_jartransaction": "monobank_jarmonthsummary"}
+PARTITION_MONTHS_AHEAD = 3
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def get_month(timestamp: int) -> date:
+    moment = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return date(moment.year, moment.month, 1)
+
+
+def get_month_bounds(month: date) -> tuple[int, int]:
+    """Unix time range [start, end) of the month."""
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    next_month = add_months(month, 1)
+    end = datetime(next_month.year, next_month.month, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def get_partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year}_{month.month:02d}"
+
+
+def get_default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def get_month_partitions(table: str, cursor=None) -> dict[date, str]:
+    """Attached month partitions of the table by their month."""
+    query = """
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+        JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+        WHERE parent.relname = %s
+    """
+    if cursor is None:
+        with connection.cursor() as cursor:
+            return get_month_partitions(table, cursor)
+    cursor.execute(query, [table])
+    names = [row[0] for row in cursor.fetchall()]
+
+    partitions = {}
+    prefix = f"{table}_p"
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        year, month = name[len(prefix) :].split("_")
+        partitions[date(int(year), int(month), 1)] = name
+    return partitions
+
+
+def create_month_partition(table: str, month: date, cursor) -> bool:
+    """
+    Create and attach partition for the month, rows of the month stored in
+    the default partition are moved into it. False when it already exists.
+    """
+    name = get_partition_name(table, month)
+    if month in get_month_partitions(table, cursor):
+        return False
+    start, end = get_month_bounds(month)
+    quote_name = connection.ops.quote_name
+    default = quote_name(get_default_partition_name(table))
+    cursor.execute(
+        f"CREATE TABLE {quote_name(name)} "
+        f"(LIKE {quote_name(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    # default partition can't keep rows of a new partition range
+    cursor.execute(
+        f"WITH moved AS (DELETE FROM {default} "
+        f'WHERE "time" >= %s AND "time" < %s RETURNING *) '
+        f"INSERT INTO {quote_name(name)} SELECT * FROM moved",
+        [start, end],
+    )
+    cursor.execute(
+        f"ALTER TABLE {quote_name(table)} ATTACH PARTITION {quote_name(name)} "
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [start, end],
+    )
+    logger.info(f"created partition {name}")
+    return True
+
+
+def create_partitions(
+    first_month: date | None = None,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    last_month: date | None = None,
+    tables: tuple[str, ...] = PARTITIONED_TABLES,
+) -> list[str]:
+    """
+    Make sure every month from first_month (current by default) up to
+    last_month (months_ahead of current by default) has a partition.
+    """
+    current_month = get_month(int(datetime.now(tz=timezone.utc).timestamp()))
+    if first_month is None:
+        first_month = current_month
+    if last_month is None:
+        last_month = add_months(current_month, months_ahead)
+    created = []
+    for table in tables:
+        month = first_month
+        while month <= last_month:
+            with transaction.atomic(), connection.cursor() as cursor:
+                if create_month_partition(table, month, cursor):
+                    created.append(get_partition_name(table, month))
+            month = add_months(month, 1)
+    return created
+
+
+def detach_partitions(
+    before_month: date,
+    drop: bool = False,
+    tables: tuple[str, ...] = PARTITIONED_TABLES,
+) -> list[str]:
+    """
+    Detach month partitions older than before_month. Detached tables are kept
+    as they are for archiving (pg_dump) unless drop is set. Month summaries of
+    detached jar transactions are deleted with them, the api no longer has
+    transactions of these months.
+    """
+    quote_name = connection.ops.quote_name
+    detached = []
+    for table in tables:
+        for month, name in sorted(get_month_partitions(table).items()):
+            if month >= before_month:
+                continue
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"ALTER TABLE {quote_name(table)} DETACH PARTITION {quote_name(name)}"
+                )
+                if table in JAR_MONTH_SUMMARIES:
+                    cursor.execute(
+                        f"DELETE FROM {quote_name(JAR_MONTH_SUMMARIES[table])} "
+                        "WHERE month = %s",
+                        [month],
+                    )
+                if drop:
+                    cursor.execute(f"DROP TABLE {quote_name(name)}")
+            logger.info(f"{'dropped' if drop else 'detached'} partition {name}")
+            detached.append(name)
+    return detached
@@ -3,7 +3,14 @@ from typing import Union
 
 from pydantic import BaseModel, field_validator, model_validator
 
-from .models import CategoryMSO, Currency, MonoCard, MonoDataNotFound, MonoJar
+from .models import (
+    CategoryMSO,
+    Currency,
+    MonoCard,
+    MonoDataNotFound,
+    MonoJar,
+    reference_data,
+)
 
 
 class TransactionItem(BaseModel):
@@ -28,12 +35,10 @@ class TransactionItem(BaseModel):
         if not currency_code:
             return values
         if not values.get("currency"):
-            if Currency.objects.filter(code=currency_code).exists():
-                values["currency"] = Currency.objects.get(code=currency_code)
-            else:
-                values["currency"] = (
-                    currency_code  # Note: trigger to generate or log not existed currency code
-                )
+            values["currency"] = (
+                reference_data.get_currency(currency_code)
+                or currency_code  # Note: trigger to generate or log not existed currency code
+            )
         return values
 
     @field_validator("currency", mode="before")
@@ -46,8 +51,9 @@ class TransactionItem(BaseModel):
 
     @field_validator("mcc", mode="before")
     def transform_mcc(cls, value) -> CategoryMSO:
-        if CategoryMSO.objects.filter(mso=value).exists():
-            return CategoryMSO.objects.get(mso=value)
+        category_mso = reference_data.get_category_mso(value)
+        if category_mso is not None:
+            return category_mso
         raise MonoDataNotFound(
             f"Unknown mso code: {value}"
         )  # TODO: generate new MSO on the fly instead of error
@@ -64,6 +70,8 @@ class TransactionData(BaseModel):
 
     @field_validator("account", mode="before")
     def transform_account(cls, value) -> Union[MonoCard, MonoJar]:
+        if isinstance(value, (MonoCard, MonoJar)):
+            return value
         if MonoCard.objects.filter(id=value).exists():
             return MonoCard.objects.get(id=value)
         elif MonoJar.objects.filter(id=value).exists():
@@ -0,0 +1,110 @@
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django_redis import get_redis_connection
+from loguru import logger
+from utils.errors import MonoBankRateLimitExceeded
+
+# seconds between two requests with the same token, per monobank api endpoint
+MONO_RATE_LIMIT_INTERVALS = {
+    "client-info": 60,
+    "statement": 60,
+    "webhook": 60,
+}
+
+# Token bucket holding a single token (GCRA): the key keeps the time when the
+# next request is allowed. Reservation is atomic, so every worker sharing the
+# redis instance gets its own slot.
+# KEYS[1] - bucket key; ARGV - now, interval and max wait in milliseconds.
+# Returns {is_reserved, wait_ms}.
+RESERVE_SLOT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local allowed_at = tonumber(redis.call('GET', KEYS[1]) or now)
+if allowed_at < now then
+    allowed_at = now
+end
+local wait = allowed_at - now
+if wait > tonumber(ARGV[3]) then
+    return {0, wait}
+end
+redis.call('SET', KEYS[1], allowed_at + interval, 'PX', wait + interval)
+return {1, wait}
+"""
+
+
+class MonoRateLimiter:
+    """
+    Per token rate limiter for monobank api calls shared by all workers.
+
+    Callers wait for their slot instead of failing with "too many requests".
+    Falls back to process local reservation when cache backend is not redis.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._script = None
+
+    @staticmethod
+    def get_bucket_key(token: str, endpoint: str) -> str:
+        token_hash = hashlib.sha256(token.encode()).hexdigest()[:16]
+        return f"monobank:rate_limit:{endpoint}:{token_hash}"
+
+    def reserve(self, token: str, endpoint: str, max_wait: float) -> float:
+        """
+        Reserve next request slot for the token and return seconds to wait for it.
+        Raises MonoBankRateLimitExceeded (nothing reserved) when wait exceeds max_wait.
+        """
+        key = self.get_bucket_key(token, endpoint)
+        now_ms = int(time.time() * 1000)
+        interval_ms = MONO_RATE_LIMIT_INTERVALS[endpoint] * 1000
+        max_wait_ms = int(max_wait * 1000)
+        try:
+            is_reserved, wait_ms = self._reserve_redis(
+                key, now_ms, interval_ms, max_wait_ms
+            )
+        except NotImplementedError:
+            is_reserved, wait_ms = self._reserve_local(
+                key, now_ms, interval_ms, max_wait_ms
+            )
+        if not is_reserved:
+            raise MonoBankRateLimitExceeded(wait_ms / 1000)
+        return wait_ms / 1000
+
+    def acquire(self, token: str, endpoint: str, max_wait: float | None = None):
+        """Block until the token is allowed to call endpoint."""
+        if max_wait is None:
+            max_wait = settings.MONOBANK_RATE_LIMIT_MAX_WAIT
+        wait = self.reserve(token, endpoint, max_wait)
+        if wait > 0:
+            logger.debug(f"waiting {wait:.1f}s for monobank {endpoint} slot")
+            time.sleep(wait)
+
+    def _reserve_redis(
+        self, key: str, now_ms: int, interval_ms: int, max_wait_ms: int
+    ) -> tuple[bool, int]:
+        connection = get_redis_connection("default")
+        if self._script is None:
+            self._script = connection.register_script(RESERVE_SLOT_SCRIPT)
+        is_reserved, wait_ms = self._script(
+            keys=[key], args=[now_ms, interval_ms, max_wait_ms], client=connection
+        )
+        return bool(is_reserved), int(wait_ms)
+
+    def _reserve_local(
+        self, key: str, now_ms: int, interval_ms: int, max_wait_ms: int
+    ) -> tuple[bool, int]:
+        with self._lock:
+            allowed_at = max(cache.get(key) or now_ms, now_ms)
+            wait_ms = allowed_at - now_ms
+            if wait_ms > max_wait_ms:
+                return False, wait_ms
+            timeout = (wait_ms + interval_ms) / 1000
+            cache.set(key, allowed_at + interval_ms, timeout=timeout)
+            return True, wait_ms
+
+
+mono_rate_limiter = MonoRateLimiter()
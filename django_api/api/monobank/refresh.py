@@ -0,0 +1,103 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Iterable, NamedTuple
+
+from django.conf import settings
+from django.db import connection
+from loguru import logger
+
+
+class AccountRefreshResult(NamedTuple):
+    account_id: int
+    duration: float
+    error: str | None = None
+    interval: int | None = None
+    skipped: bool = False
+
+
+def refresh_mono_account(account, schedule: bool = False) -> AccountRefreshResult:
+    """
+    Refresh cards and jars of a single account and measure how long it took.
+    With schedule, the account is claimed first (skipped when another worker
+    did it), accounts with healthy webhooks are not polled and next refresh
+    time is set from the account activity.
+    """
+    started_at = time.monotonic()
+    error = None
+    interval = None
+    skipped = False
+    try:
+        try:
+            claimed = not schedule or account.claim_refresh()
+        except Exception as err:
+            logger.error(f"failed to claim mono account {account.pk}: {err!r}")
+            return AccountRefreshResult(
+                account.pk, time.monotonic() - started_at, repr(err)
+            )
+        if not claimed:
+            logger.info(f"mono account {account.pk} is claimed by another worker")
+            return AccountRefreshResult(
+                account.pk, time.monotonic() - started_at, skipped=True
+            )
+        try:
+            if schedule and account.is_webhook_healthy():
+                skipped = True
+            else:
+                account.create_cards_jars()
+        except Exception as err:
+            logger.error(f"failed to refresh mono account {account.pk}: {err!r}")
+            error = repr(err)
+        try:
+            if schedule:
+                interval = account.schedule_next_refresh()
+        except Exception as err:
+            logger.error(f"failed to schedule mono account {account.pk}: {err!r}")
+            error = error or repr(err)
+    finally:
+        # every pool thread opens its own db connection, don't leak it
+        connection.close()
+    return AccountRefreshResult(
+        account.pk, time.monotonic() - started_at, error, interval, skipped
+    )
+
+
+def refresh_mono_accounts(
+    accounts: Iterable, concurrency: int | None = None, schedule: bool = False
+) -> list[AccountRefreshResult]:
+    """
+    Refresh accounts concurrently, at most `concurrency` at a time.
+
+    Requests are I/O bound, so total time follows the slowest account instead of
+    the sum of all of them. Per token rate limits are respected by the monobank
+    client, an account waiting for its slot only blocks its own thread.
+    """
+    accounts = list(accounts)
+    if not accounts:
+        return []
+    if concurrency is None:
+        concurrency = settings.MONOBANK_REFRESH_CONCURRENCY
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(concurrency, len(accounts))),
+        thread_name_prefix="mono-refresh",
+    ) as executor:
+        results = list(
+            executor.map(partial(refresh_mono_account, schedule=schedule), accounts)
+        )
+
+    for result in results:
+        logger.info(
+            f"{'skipped' if result.skipped else 'refreshed'} mono account "
+            f"{result.account_id} in {result.duration:.2f}s"
+            + (f" with error {result.error}" if result.error else "")
+            + (f", next in {result.interval}m" if result.interval else "")
+        )
+    failed = sum(1 for result in results if result.error)
+    skipped = sum(1 for result in results if result.skipped)
+    logger.info(
+        f"REPORT -> refreshed {len(results) - skipped} account(s), "
+        f"{skipped} skipped, {failed} failed, "
+        f"in {time.monotonic() - started_at:.2f}s"
+    )
+    return results
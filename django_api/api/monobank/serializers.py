@@ -1,6 +1,11 @@
+import time
+from operator import itemgetter
+from typing import Any, Callable, Iterable
+
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from utils.errors import MonoBankError
+from rest_framework.exceptions import Throttled
+from utils.errors import MonoBankError, MonoBankRateLimitExceeded
 
 from .models import (
     Category,
@@ -15,14 +20,61 @@ from .models import (
 User = get_user_model()
 
 
-class CategorySerializer(serializers.HyperlinkedModelSerializer):
+class SparseFieldsSerializerMixin:
+    """
+    Keeps only fields requested with `fields` kwarg (names list or comma
+    separated string).
+
+    `field_lookups` maps fields to model lookups they read, other fields read
+    the model field of the same name. Views use it to select only needed
+    columns and joins.
+    """
+
+    field_lookups: dict[str, tuple[str, ...]] = {}
+
+    def __init__(self, *args, **kwargs):
+        requested_fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if requested_fields:
+            allowed = set(parse_requested_fields(requested_fields))
+            existing = set(list(self.fields.keys()))
+            for field_name in existing - allowed:
+                self.fields.pop(field_name, None)
+
+    @classmethod
+    def get_field_lookups(cls, requested_fields: Iterable[str]) -> list[str]:
+        requested = set(requested_fields)
+        lookups: list[str] = []
+        for name in cls.Meta.fields:
+            if name in requested:
+                lookups.extend(cls.field_lookups.get(name, (name,)))
+        return lookups
+
+
+def parse_requested_fields(fields: str | Iterable[str]) -> list[str]:
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return [field.strip() for field in fields if field.strip()]
+
+
+CURRENCY_LOOKUPS = (
+    "currency__code",
+    "currency__name",
+    "currency__flag",
+    "currency__symbol",
+)
+
+
+class CategorySerializer(
+    SparseFieldsSerializerMixin, serializers.HyperlinkedModelSerializer
+):
     class Meta:
         model = Category
         fields = ["name", "symbol"]
         extra_kwargs = {"user_defined": {"write_only": True}}
 
 
-class MonoAccountSerializer(serializers.ModelSerializer):
+class MonoAccountSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = MonoAccount
         fields = ["user", "mono_token", "active"]
@@ -36,7 +88,11 @@ class MonoAccountSerializer(serializers.ModelSerializer):
         mono_token = attrs.get("mono_token")
         instance = MonoAccount(user=user, mono_token=mono_token)
         try:
-            instance.get_cards_jars()
+            # reused on save: client info can be requested once per minute,
+            # the request is answered with 429 instead of waiting for the slot
+            self._cards_jars = instance.get_cards_jars(max_wait=0)
+        except MonoBankRateLimitExceeded as error:
+            raise Throttled(wait=error.retry_after)
         except MonoBankError as error:
             raise serializers.ValidationError({"non_fields_errors": [error]})
         return attrs
@@ -49,7 +105,7 @@ class MonoAccountSerializer(serializers.ModelSerializer):
 
         mono_token = self.data.get("mono_token")
         instance = MonoAccount.objects.create(user=user, mono_token=mono_token)
-        instance.create_cards_jars()
+        instance.create_cards_jars(getattr(self, "_cards_jars", None))
         return instance
 
 
@@ -59,7 +115,7 @@ class CurrencySerializer(serializers.ModelSerializer):
         exclude = ["id"]
 
 
-class MonoCardSerializer(serializers.ModelSerializer):
+class MonoCardSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = MonoCard
         fields = [
@@ -76,9 +132,13 @@ class MonoCardSerializer(serializers.ModelSerializer):
         ]
 
     currency = CurrencySerializer()
+    field_lookups = {
+        "currency": CURRENCY_LOOKUPS,
+        "owner_name": ("monoaccount__user__name",),
+    }
 
 
-class MonoJarSerializer(serializers.ModelSerializer):
+class MonoJarSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = MonoJar
         fields = [
@@ -93,9 +153,15 @@ class MonoJarSerializer(serializers.ModelSerializer):
         ]
 
     currency = CurrencySerializer()
+    field_lookups = {
+        "currency": CURRENCY_LOOKUPS,
+        "owner_name": ("monoaccount__user__name",),
+    }
 
 
-class MonoTransactionSerializer(serializers.ModelSerializer):
+class MonoTransactionSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = MonoTransaction
         fields = [
@@ -114,6 +180,14 @@ class MonoTransactionSerializer(serializers.ModelSerializer):
     currency = CurrencySerializer()
     category = serializers.SerializerMethodField()
     category_symbol = serializers.SerializerMethodField()
+    field_lookups = {
+        "account_id": ("account",),
+        "currency": CURRENCY_LOOKUPS,
+        "category": ("mcc__category__name",),
+        "category_symbol": ("mcc__category__symbol",),
+        "owner_name": ("account__monoaccount__user__name",),
+        "formatted_time": ("time",),
+    }
 
     def get_category(self, obj: MonoTransaction):
         return obj.mcc.category.name
@@ -122,7 +196,9 @@ class MonoTransactionSerializer(serializers.ModelSerializer):
         return obj.mcc.category.symbol
 
 
-class MonoJarTransactionSerializer(serializers.ModelSerializer):
+class MonoJarTransactionSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = JarTransaction
         fields = [
@@ -141,23 +217,118 @@ class MonoJarTransactionSerializer(serializers.ModelSerializer):
     currency = CurrencySerializer()
     category = serializers.SerializerMethodField()
     category_symbol = serializers.SerializerMethodField()
-
-    def __init__(self, *args, **kwargs):
-        # Support dynamic field selection via serializer kwarg 'fields'
-        requested_fields = kwargs.pop("fields", None)
-        super().__init__(*args, **kwargs)
-        if requested_fields:
-            if isinstance(requested_fields, str):
-                requested_fields = [
-                    f.strip() for f in requested_fields.split(",") if f.strip()
-                ]
-            allowed = set(requested_fields)
-            existing = set(list(self.fields.keys()))
-            for field_name in existing - allowed:
-                self.fields.pop(field_name, None)
+    field_lookups = {
+        "account_id": ("account",),
+        "currency": CURRENCY_LOOKUPS,
+        "category": ("mcc__category__name",),
+        "category_symbol": ("mcc__category__symbol",),
+        "owner_name": ("account__monoaccount__user__name",),
+        "formatted_time": ("time",),
+    }
 
     def get_category(self, obj: JarTransaction):
         return obj.mcc.category.name
 
     def get_category_symbol(self, obj: JarTransaction):
         return obj.mcc.category.symbol
+
+
+def get_currency(row: dict) -> dict | None:
+    if row["currency_id"] is None:
+        return None
+    return {
+        "code": row["currency__code"],
+        "name": row["currency__name"],
+        "flag": row["currency__flag"],
+        "symbol": row["currency__symbol"],
+    }
+
+
+def get_formatted_time(row: dict) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(row["time"]))
+
+
+class ValuesListSerializer:
+    """
+    Read-only serializer of list responses built straight from values() rows.
+
+    Produces the same JSON as `model_serializer_class` without model instances
+    and per row DRF fields. Plain fields are mapped to lookups, others are
+    computed from the row and declare lookups they need.
+    """
+
+    model_serializer_class: type[serializers.ModelSerializer]
+    field_lookups: dict[str, str] = {}
+    computed_fields: dict[str, tuple[tuple[str, ...], Callable[[dict], Any]]] = {}
+    # selected for paginated responses, e.g. for the cursor
+    required_lookups: tuple[str, ...] = ()
+
+    def __init__(self, fields: Iterable[str] | None = None):
+        field_names = list(self.model_serializer_class.Meta.fields)
+        if fields:
+            fields = set(fields)
+            field_names = [name for name in field_names if name in fields]
+        self.field_names = field_names
+
+    def get_lookups(self, paginated: bool = False) -> list[str]:
+        lookups = dict.fromkeys(self.required_lookups if paginated else ())
+        for name in self.field_names:
+            if name in self.computed_fields:
+                lookups.update(dict.fromkeys(self.computed_fields[name][0]))
+            else:
+                lookups[self.field_lookups[name]] = None
+        # values() without lookups would select every column
+        return list(lookups) or ["pk"]
+
+    def get_rows(self, queryset, paginated: bool = False):
+        return queryset.values(*self.get_lookups(paginated))
+
+    def to_representation(self, rows: Iterable[dict]) -> list[dict]:
+        getters = [
+            (
+                name,
+                (
+                    self.computed_fields[name][1]
+                    if name in self.computed_fields
+                    else itemgetter(self.field_lookups[name])
+                ),
+            )
+            for name in self.field_names
+        ]
+        return [{name: getter(row) for name, getter in getters} for row in rows]
+
+
+class TransactionValuesListSerializer(ValuesListSerializer):
+    field_lookups = {
+        "id": "id",
+        "amount": "amount",
+        "account_id": "account_id",
+        "comment": "comment",
+        "balance": "balance",
+        "category": "mcc__category__name",
+        "category_symbol": "mcc__category__symbol",
+        "description": "description",
+        "owner_name": "account__monoaccount__user__name",
+    }
+    computed_fields = {
+        "currency": (
+            (
+                "currency_id",
+                "currency__code",
+                "currency__name",
+                "currency__flag",
+                "currency__symbol",
+            ),
+            get_currency,
+        ),
+        "formatted_time": (("time",), get_formatted_time),
+    }
+    required_lookups = ("time", "id")
+
+
+class MonoTransactionValuesListSerializer(TransactionValuesListSerializer):
+    model_serializer_class = MonoTransactionSerializer
+
+
+class MonoJarTransactionValuesListSerializer(TransactionValuesListSerializer):
+    model_serializer_class = MonoJarTransactionSerializer
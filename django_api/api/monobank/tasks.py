@@ -11,6 +11,8 @@ from loguru import logger
 from telegram.client import TelegramCustomClient
 
 from .models import MonoAccount
+from .partitions import create_partitions
+from .refresh import refresh_mono_accounts
 
 
 @shared_task
@@ -25,12 +27,32 @@ def update_every_mono_account():
             "skip update_every_mono_account as SHOULD_AUTO_FETCH_TRANSACTIONS turned off"
         )
         return
-    accounts = MonoAccount.objects.all()
-    logger.info("accounts -> ", accounts)
-    for account in accounts:
-        logger.info(account)
-        account.create_cards_jars()
-    logger.info(f"REPORT -> loaded {len(accounts)} account(s)")
+    results = refresh_mono_accounts(MonoAccount.objects.select_related("user"))
+    return [result._asdict() for result in results]
+
+
+@shared_task
+def refresh_mono_accounts_cohort(slot: int | None = None):
+    """
+    Refresh accounts due in the current minute, runs every minute.
+    Accounts are picked in their slot first, then by their activity schedule.
+    """
+    if not settings.SHOULD_AUTO_FETCH_TRANSACTIONS:
+        logger.info(
+            "skip refresh_mono_accounts_cohort as SHOULD_AUTO_FETCH_TRANSACTIONS turned off"
+        )
+        return
+    if slot is None:
+        slot = MonoAccount.get_refresh_slot()
+    accounts = MonoAccount.get_due_for_refresh(slot).select_related("user")
+    results = refresh_mono_accounts(accounts, schedule=True)
+    return [result._asdict() for result in results]
+
+
+@shared_task
+def create_transaction_partitions():
+    """Keep monthly transaction partitions created a few months ahead."""
+    return create_partitions()
 
 
 #
@@ -9,6 +9,7 @@ from .views import (
     MonoJarTransactionViewSet,
     MonoJarViewSet,
     MonoTransactionViewSet,
+    SpendAnalyticsViewSet,
     TestEndpoint,
     TransactionWebhookApiView,
 )
@@ -22,6 +23,7 @@ router.register("monotransactions", MonoTransactionViewSet, basename="monotransa
 router.register(
     "monojartransactions", MonoJarTransactionViewSet, basename="monojartransactions"
 )
+router.register("analytics/spend", SpendAnalyticsViewSet, basename="analytics-spend")
 
 urlpatterns = [
     path("", include(router.urls)),
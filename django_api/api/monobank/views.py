@@ -2,13 +2,23 @@
 # pyright: reportAttributeAccessIssue = false
 # pyright: reportUnknownVariableType = false
 
+import hashlib
 import json
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Iterable
 
 from account.models import User as CustomUser
+from account.models import get_family_version
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError
 from django.db.models import Q
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from pydantic import ValidationError
 from rest_framework.decorators import action
 from rest_framework.permissions import (
@@ -18,17 +28,39 @@ from rest_framework.permissions import (
     IsAuthenticated,
 )
 from rest_framework.views import APIView, Response
-from rest_framework.viewsets import ModelViewSet
-
+from rest_framework.viewsets import GenericViewSet, ModelViewSet
+from utils.cache import get_cache_version
+from utils.db_router import is_reading_from_replica, read_from_replica, use_primary
+
+from .analytics import (
+    SPEND_DIMENSIONS,
+    SPEND_PERIODS,
+    SPEND_SOURCES,
+    get_spend_summary,
+)
+from .export import (
+    CARD_TRANSACTION_EXPORT_FIELDS,
+    EXPORT_FORMATS,
+    JAR_TRANSACTION_EXPORT_FIELDS,
+    stream_transactions,
+)
 from .models import (
+    REFERENCE_DATA_VERSION_KEY,
     Category,
+    JarMonthSummary,
     JarTransaction,
     MonoAccount,
     MonoCard,
     MonoDataNotFound,
     MonoJar,
     MonoTransaction,
+    WebhookAccount,
+    get_balance_series,
+    get_webhook_account,
+    get_webhook_account_cache_key,
+    insert_ignore_conflicts,
 )
+from .pagination import TransactionCursorPagination
 from .pydantic import TransactionData
 from .serializers import (
     CategorySerializer,
@@ -36,8 +68,12 @@ from .serializers import (
     MonoCardSerializer,
     MonoJarSerializer,
     MonoJarTransactionSerializer,
+    MonoJarTransactionValuesListSerializer,
     MonoTransactionSerializer,
+    MonoTransactionValuesListSerializer,
+    parse_requested_fields,
 )
+from .webhook_queue import webhook_queue
 
 logger = logging.getLogger(__name__)
 User: CustomUser = get_user_model()  # type: ignore
@@ -78,8 +114,203 @@ class MonoBankAccessMixin:
 
         return list(accessible_ids)
 
+    def get_data_state(self) -> tuple[list[str] | None, list[int] | None, float]:
+        """
+        Accessible tg_ids (None for superusers), ids of their mono accounts and
+        the latest version of their data. Served from cache, once per request.
+        """
+        if getattr(self, "_data_state", None) is None:
+            if self.request.user.is_superuser:
+                self._data_state = None, None, MonoAccount.get_data_version()
+            else:
+                tg_ids = sorted(self.get_accessible_user_tg_ids())
+                account_ids = MonoAccount.get_user_account_ids(tg_ids)
+                self._data_state = (
+                    tg_ids,
+                    account_ids,
+                    MonoAccount.get_data_version(account_ids),
+                )
+        return self._data_state
+
+
+class ReplicaReadMixin:
+    """
+    GET and HEAD requests read from the replica database (see
+    utils.db_router) until they write. Data of accounts changed within
+    DB_REPLICA_LAG_SECONDS is read from the primary, so the replica lag can't
+    hide fresh writes or end up in cached responses under new versions.
+    Needs `get_data_state` (MonoBankAccessMixin), views of other data read
+    from the primary.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        with read_from_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if is_reading_from_replica():
+            _, _, version = self.get_data_state()
+            if time.time() - version < settings.DB_REPLICA_LAG_SECONDS:
+                use_primary()
+
+
+class EarlyResponse(Exception):
+    """Raised from `initial` to answer without running the handler."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class EarlyResponseMixin:
+    def handle_exception(self, exc):
+        if isinstance(exc, EarlyResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+
+class ConditionalGetMixin(EarlyResponseMixin):
+    """
+    ETag and Last-Modified of GET responses, derived from data versions of the
+    mono accounts the user can access (bumped whenever their cards, jars,
+    transactions or owner change) and the version of currencies and
+    categories. A matching If-None-Match or If-Modified-Since is
+    answered with 304 right after permission checks, before the main query.
+    """
+
+    conditional_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        self.etag = None
+        super().initial(request, *args, **kwargs)
+        if request.method != "GET" or self.action not in self.conditional_actions:
+            return
+        _, account_ids, version = self.get_data_state()
+        state = [
+            request.user.pk,
+            get_family_version(),
+            get_cache_version(REFERENCE_DATA_VERSION_KEY),
+            request.get_full_path(),
+            account_ids,
+            version,
+        ]
+        self.etag = f'"{hashlib.md5(repr(state).encode()).hexdigest()}"'
+        self.last_modified = int(version)
+        response = get_conditional_response(
+            request, etag=self.etag, last_modified=self.last_modified
+        )
+        if response is not None:
+            raise EarlyResponse(response)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "etag", None) and response.status_code in (200, 304):
+            response["ETag"] = self.etag
+            response["Last-Modified"] = http_date(self.last_modified)
+            # clients revalidate instead of reusing stale data
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class CachedResponseMixin(EarlyResponseMixin):
+    """
+    Successful GET responses of `cached_actions` kept in the shared cache.
+
+    Keys include versions bumped by every relevant write (see
+    `get_response_cache_state`), so changed data is never served and outdated
+    entries just expire. Hits are served after permission checks.
+    """
+
+    cached_actions = ("list", "retrieve")
+
+    def get_response_cache_state(self) -> list:
+        tg_ids, account_ids, version = self.get_data_state()
+        return [
+            tg_ids,
+            get_family_version(),
+            get_cache_version(REFERENCE_DATA_VERSION_KEY),
+            account_ids,
+            version,
+        ]
+
+    def initial(self, request, *args, **kwargs):
+        self.response_cache_key = None
+        super().initial(request, *args, **kwargs)
+        if request.method != "GET" or self.action not in self.cached_actions:
+            return
+        state = [request.get_full_path(), *self.get_response_cache_state()]
+        self.response_cache_key = (
+            f"monobank:response:{hashlib.md5(repr(state).encode()).hexdigest()}"
+        )
+        data = cache.get(self.response_cache_key)
+        if data is not None:
+            self.response_cache_key = None
+            raise EarlyResponse(Response(data))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "response_cache_key", None) and response.status_code == 200:
+            cache.set(
+                self.response_cache_key,
+                response.data,
+                settings.RESPONSE_CACHE_TIMEOUT,
+            )
+        return response
+
+
+def only_lookups(queryset, lookups: Iterable[str]):
+    """Select only columns read by lookups, joining just relations they traverse."""
+    only = {queryset.model._meta.pk.name}
+    related = set()
+    for lookup in lookups:
+        parts = lookup.split("__")
+        # relation fields of every hop keep their foreign key columns
+        only.update("__".join(parts[:index]) for index in range(1, len(parts) + 1))
+        if len(parts) > 1:
+            related.add("__".join(parts[:-1]))
+    queryset = queryset.select_related(None)
+    if related:
+        # select_related() without arguments would follow every foreign key
+        queryset = queryset.select_related(*related)
+    return queryset.only(*only)
+
+
+class SparseFieldsMixin:
+    """
+    `fields` query param (comma separated) limits serialized fields of list and
+    retrieve actions, and columns and joins selected for them.
+    """
 
-class CategoryViewSet(ModelViewSet):
+    sparse_fields_actions = ("list", "retrieve")
+    # lookups object permission checks read, kept for retrieve
+    sparse_fields_required: tuple[str, ...] = ()
+
+    def get_requested_fields(self) -> list[str] | None:
+        if self.action not in self.sparse_fields_actions:
+            return None
+        fields = self.request.query_params.get("fields")
+        return parse_requested_fields(fields) if fields else None
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields:
+            kwargs["fields"] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_requested_fields()
+        if not fields:
+            return queryset
+        lookups = self.get_serializer_class().get_field_lookups(fields)
+        if self.action == "retrieve":
+            lookups.extend(self.sparse_fields_required)
+        return only_lookups(queryset, lookups)
+
+
+class CategoryViewSet(CachedResponseMixin, SparseFieldsMixin, ModelViewSet):
     serializer_class = CategorySerializer
     queryset = Category.objects.all()
     http_method_names = ["get"]
@@ -88,8 +319,11 @@ class CategoryViewSet(ModelViewSet):
         permission = IsAuthenticated()
         return [permission]
 
+    def get_response_cache_state(self) -> list:
+        return [get_cache_version(REFERENCE_DATA_VERSION_KEY)]
+
 
-class MonoAccountViewSet(ModelViewSet):
+class MonoAccountViewSet(SparseFieldsMixin, ModelViewSet):
     serializer_class = MonoAccountSerializer
     queryset = MonoAccount.objects.all()
     http_method_names = ["get", "post"]
@@ -228,13 +462,21 @@ class DailyReportSchedulerApiView(APIView):
             return Response({"message": "disabled", "task": task_name}, status=200)
 
 
-class MonoCardViewSet(MonoBankAccessMixin, ModelViewSet):
+class MonoCardViewSet(
+    ReplicaReadMixin,
+    MonoBankAccessMixin,
+    ConditionalGetMixin,
+    SparseFieldsMixin,
+    ModelViewSet,
+):
     serializer_class = MonoCardSerializer
+    conditional_actions = ("list", "retrieve", "available_months")
+    sparse_fields_required = ("monoaccount__user__tg_id",)
     http_method_names = ["get"]
 
     def get_permissions(self):
         permission = IsAdminUser()
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "available_months"):
             permission = IsOwnerOrFamilyOrAdminPermission()
         return [permission]
 
@@ -256,9 +498,32 @@ class MonoCardViewSet(MonoBankAccessMixin, ModelViewSet):
 
         return queryset
 
+    @action(detail=True, methods=["get"], url_path="available-months")
+    def available_months(self, request, pk=None):
+        """Return list of available months for the specified card as ISO dates 'YYYY-MM-01'."""
+        card = self.get_object()
+        months = card.get_available_months()
+        return Response([d.isoformat() for d in months])
 
-class MonoJarViewSet(MonoBankAccessMixin, ModelViewSet):
+
+class MonoJarViewSet(
+    ReplicaReadMixin,
+    MonoBankAccessMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    SparseFieldsMixin,
+    ModelViewSet,
+):
     serializer_class = MonoJarSerializer
+    conditional_actions = (
+        "list",
+        "retrieve",
+        "available_months",
+        "month_summary",
+        "balance_series",
+    )
+    cached_actions = conditional_actions
+    sparse_fields_required = ("monoaccount__user__tg_id",)
     http_method_names = ["get", "patch"]  # Added patch to support the new action
 
     def get_permissions(self):
@@ -269,6 +534,7 @@ class MonoJarViewSet(MonoBankAccessMixin, ModelViewSet):
             "set_budget_status",
             "available_months",
             "month_summary",
+            "balance_series",
         ):
             permission = IsOwnerOrFamilyOrAdminPermission()
         return [permission]
@@ -362,17 +628,112 @@ class MonoJarViewSet(MonoBankAccessMixin, ModelViewSet):
         summary = jar.get_month_summary(parsed)
         return Response(summary)
 
+    @action(detail=True, methods=["get"], url_path="balance-series")
+    def balance_series(self, request, pk=None):
+        """Return jar balance over time for charts, downsampled to `points`.
+
+        Query params:
+        - points: max points count, 4..BALANCE_SERIES_MAX_POINTS
+        - time_from, time_to: as for transactions
+        Items are {"time": unix time, "balance": balance in minor units}.
+        """
+        jar = self.get_object()
+        try:
+            points = int(
+                request.query_params.get("points") or settings.BALANCE_SERIES_POINTS
+            )
+        except ValueError:
+            points = 0
+        if not 4 <= points <= settings.BALANCE_SERIES_MAX_POINTS:
+            return Response(
+                {
+                    "error": "points should be a number from 4 to "
+                    f"{settings.BALANCE_SERIES_MAX_POINTS}"
+                },
+                status=400,
+            )
+        queryset = filter_by_time_range(
+            JarTransaction.objects.filter(account=jar), request.query_params
+        )
+        return Response(get_balance_series(queryset, points))
+
 
 # Removed duplicate permission class - using IsOwnerOrFamilyOrAdminPermission instead
 
 
-class MonoJarTransactionViewSet(MonoBankAccessMixin, ModelViewSet):
+def filter_by_time_range(queryset, query_params):
+    """
+    Filter transactions by `time_from` and `time_to` UTC days (YYYY-MM-DD),
+    both inclusive. Values which can't be parsed are ignored.
+    """
+    time_from = query_params.get("time_from")
+    time_to = query_params.get("time_to")
+    try:
+        if time_from:
+            dt = datetime.strptime(time_from, "%Y-%m-%d")
+            dt = dt.replace(tzinfo=dt_timezone.utc)
+            queryset = queryset.filter(time__gte=int(dt.timestamp()))
+    except ValueError:
+        pass
+    try:
+        if time_to:
+            dt = datetime.strptime(time_to, "%Y-%m-%d") + timedelta(days=1)
+            dt = dt.replace(tzinfo=dt_timezone.utc)
+            queryset = queryset.filter(time__lt=int(dt.timestamp()))
+    except ValueError:
+        pass
+    return queryset
+
+
+class ValuesListMixin:
+    """Serve the list action from values() rows, see ValuesListSerializer."""
+
+    values_list_serializer_class = None
+
+    def get_values_list_serializer(self):
+        return self.values_list_serializer_class(self.get_requested_fields())
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_values_list_serializer()
+        paginated = self.paginator is not None
+        rows = serializer.get_rows(
+            self.filter_queryset(self.get_queryset()), paginated=paginated
+        )
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(rows))
+
+
+def export_transactions_response(request, queryset, fields, filename):
+    export_format = request.query_params.get("export_format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {"error": f"export_format should be one of {', '.join(EXPORT_FORMATS)}"},
+            status=400,
+        )
+    # rows are streamed after the view returns, keep the database chosen now
+    queryset = queryset.using(queryset.db)
+    return stream_transactions(queryset, fields, export_format, filename)
+
+
+class MonoJarTransactionViewSet(
+    ReplicaReadMixin,
+    MonoBankAccessMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SparseFieldsMixin,
+    ModelViewSet,
+):
     serializer_class = MonoJarTransactionSerializer
+    sparse_fields_required = ("account__monoaccount__user__tg_id",)
+    values_list_serializer_class = MonoJarTransactionValuesListSerializer
+    pagination_class = TransactionCursorPagination
     http_method_names = ["get"]
 
     def get_permissions(self):
         permission = IsAdminUser()
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "export"):
             permission = IsOwnerOrFamilyOrAdminPermission()
         return [permission]
 
@@ -380,7 +741,6 @@ class MonoJarTransactionViewSet(MonoBankAccessMixin, ModelViewSet):
 
         users = self.request.query_params.get("users")
         jar_ids = self.request.query_params.get("jars")
-        time_from = self.request.query_params.get("time_from")
 
         # all jar transactions from all users with optimized joins
         queryset = JarTransaction.objects.select_related(
@@ -391,15 +751,7 @@ class MonoJarTransactionViewSet(MonoBankAccessMixin, ModelViewSet):
         if jar_ids:
             queryset = queryset.filter(account_id__in=jar_ids.split(","))
 
-        # filter by time_from (inclusive), expects YYYY-MM-DD
-        if time_from and isinstance(time_from, str):
-            try:
-                dt = datetime.strptime(time_from, "%Y-%m-%d")
-                epoch_from = int(dt.timestamp())
-                queryset = queryset.filter(time__gte=epoch_from)
-            except Exception:
-                # if parsing fails, leave queryset unchanged (optionally could return 400)
-                pass
+        queryset = filter_by_time_range(queryset, self.request.query_params)
 
         # Use mixin method for access control
         accessible_tg_ids = self.get_accessible_user_tg_ids(users)
@@ -410,25 +762,34 @@ class MonoJarTransactionViewSet(MonoBankAccessMixin, ModelViewSet):
 
         return queryset
 
-    def get_serializer(self, *args, **kwargs):
-        # Allow shrinking the response fields via `fields` query parameter
-        fields = None
-        try:
-            fields = self.request.query_params.get("fields")
-        except Exception:
-            pass
-        if fields:
-            kwargs["fields"] = fields
-        return super().get_serializer(*args, **kwargs)
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """Stream filtered jar transactions, `export_format` is ndjson or csv."""
+        return export_transactions_response(
+            request,
+            self.get_queryset(),
+            JAR_TRANSACTION_EXPORT_FIELDS,
+            "jar-transactions",
+        )
 
 
-class MonoTransactionViewSet(MonoBankAccessMixin, ModelViewSet):
+class MonoTransactionViewSet(
+    ReplicaReadMixin,
+    MonoBankAccessMixin,
+    ConditionalGetMixin,
+    ValuesListMixin,
+    SparseFieldsMixin,
+    ModelViewSet,
+):
     serializer_class = MonoTransactionSerializer
+    sparse_fields_required = ("account__monoaccount__user__tg_id",)
+    values_list_serializer_class = MonoTransactionValuesListSerializer
+    pagination_class = TransactionCursorPagination
     http_method_names = ["get"]
 
     def get_permissions(self):
         permission = IsAdminUser()
-        if self.action in ("list", "retrieve"):
+        if self.action in ("list", "retrieve", "export"):
             permission = IsOwnerOrFamilyOrAdminPermission()
         return [permission]
 
@@ -445,6 +806,8 @@ class MonoTransactionViewSet(MonoBankAccessMixin, ModelViewSet):
         if card_ids:
             queryset = queryset.filter(account_id__in=card_ids.split(","))
 
+        queryset = filter_by_time_range(queryset, self.request.query_params)
+
         # Use mixin method for access control
         accessible_tg_ids = self.get_accessible_user_tg_ids(users)
         if accessible_tg_ids is not None:
@@ -454,6 +817,94 @@ class MonoTransactionViewSet(MonoBankAccessMixin, ModelViewSet):
 
         return queryset
 
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """Stream filtered card transactions, `export_format` is ndjson or csv."""
+        return export_transactions_response(
+            request,
+            self.get_queryset(),
+            CARD_TRANSACTION_EXPORT_FIELDS,
+            "card-transactions",
+        )
+
+
+def parse_choices(query_params, name: str, choices, default: list[str]) -> list[str]:
+    """Comma separated values of a query param, ValueError on unknown ones."""
+    value = query_params.get(name)
+    if not value:
+        return default
+    values = [item.strip() for item in value.split(",") if item.strip()]
+    if any(item not in choices for item in values):
+        raise ValueError(f"{name} should be one of {', '.join(choices)}")
+    return list(dict.fromkeys(values))
+
+
+class SpendAnalyticsViewSet(
+    ReplicaReadMixin,
+    MonoBankAccessMixin,
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    GenericViewSet,
+):
+    """
+    Spend totals grouped in SQL (see monobank.analytics).
+
+    Query params:
+    - group_by: comma separated source, category, owner, currency (default: category),
+      totals are always grouped by currency of the card or jar
+    - period: day, week or month
+    - sources: comma separated cards, jars (default: both)
+    - users, with_family, time_from, time_to: as for transactions
+    """
+
+    permission_classes = [IsAuthenticated]
+    http_method_names = ["get"]
+
+    def get_source_querysets(self, sources: list[str]) -> dict:
+        query_params = self.request.query_params
+        with_family = str(query_params.get("with_family")).lower() in (
+            "1",
+            "true",
+            "yes",
+        )
+        accessible_tg_ids = self.get_accessible_user_tg_ids(
+            query_params.get("users"), with_family
+        )
+        source_models = {"cards": MonoTransaction, "jars": JarTransaction}
+        querysets = {}
+        for source in sources:
+            queryset = filter_by_time_range(
+                source_models[source].objects.all(), query_params
+            )
+            if accessible_tg_ids is not None:
+                queryset = queryset.filter(
+                    account__monoaccount__user__tg_id__in=accessible_tg_ids
+                )
+            querysets[source] = queryset
+        return querysets
+
+    def list(self, request):
+        query_params = request.query_params
+        try:
+            group_by = parse_choices(
+                query_params, "group_by", SPEND_DIMENSIONS, ["category"]
+            )
+            sources = parse_choices(
+                query_params, "sources", SPEND_SOURCES, list(SPEND_SOURCES)
+            )
+        except ValueError as err:
+            return Response({"error": str(err)}, status=400)
+        period = query_params.get("period")
+        if period is not None and period not in SPEND_PERIODS:
+            return Response(
+                {"error": f"period should be one of {', '.join(SPEND_PERIODS)}"},
+                status=400,
+            )
+        summary = get_spend_summary(
+            self.get_source_querysets(sources), group_by, period
+        )
+        return Response(summary)
+
 
 class TransactionWebhookApiView(APIView):
     permission_classes = [AllowAny]
@@ -462,7 +913,7 @@ class TransactionWebhookApiView(APIView):
     def get(self, request):
         return Response(status=200)
 
-    def _process_card_transaction(self, transaction_data: TransactionData):
+    def _process_card_transaction(self, transaction_data: TransactionData) -> bool:
         statement_item = transaction_data.statement_item
         transaction = MonoTransaction(
             account=transaction_data.account,
@@ -481,9 +932,9 @@ class TransactionWebhookApiView(APIView):
             cashback_amount=statement_item.cashback_amount,
             comment=statement_item.comment,
         )
-        transaction.save()
+        return insert_ignore_conflicts(transaction)
 
-    def _process_jar_transaction(self, transaction_data: TransactionData):
+    def _process_jar_transaction(self, transaction_data: TransactionData) -> bool:
         statement_item = transaction_data.statement_item
         transaction = JarTransaction(
             account=transaction_data.account,
@@ -500,7 +951,25 @@ class TransactionWebhookApiView(APIView):
             hold=statement_item.hold,
             cashback_amount=statement_item.cashback_amount,
         )
-        transaction.save()
+        is_created = insert_ignore_conflicts(transaction)
+        if is_created:
+            JarMonthSummary.refresh([(transaction.account_id, transaction.time)])
+        return is_created
+
+    def _resolve_account(self, data, user_key: str) -> WebhookAccount | None:
+        """
+        Card or jar of the webhook with its owner token, from cache or one query.
+        A cached entry with another token is re-read in case the token changed.
+        """
+        account_id = data.get("account") if isinstance(data, dict) else None
+        if not isinstance(account_id, str):
+            return None  # let TransactionData report wrong structure
+        account = get_webhook_account(account_id)
+        if account is not None and account.mono_token != user_key:
+            account = get_webhook_account(account_id, use_cache=False)
+        if account is None:
+            raise MonoDataNotFound(f"Invalid account ID: {account_id}")
+        return account
 
     def post(self, request):
         user_key = request.query_params.get("token")
@@ -508,31 +977,41 @@ class TransactionWebhookApiView(APIView):
             logger.warning("token query param is not specified")
             return Response({"error": "token query param is not specified"}, status=403)
 
+        account = None
         try:
-            parsed_data = TransactionData.parse_obj(request.data)
-            if parsed_data.account.monoaccount.mono_token != user_key:
+            account = self._resolve_account(request.data, user_key)
+            if account is not None and account.mono_token != user_key:
                 logger.error(
-                    f"invalid token or account missmatch: {user_key} for account {parsed_data.account}"
+                    f"invalid token or account missmatch: {user_key} for account {account.id}"
                 )
 
                 return Response(
                     {"error": "invalid token or account missmatch"}, status=403
                 )
 
+            # written later in micro-batches by process_webhook_queue, right
+            # away when the queue is unavailable
+            if (
+                account is not None
+                and settings.WEBHOOK_ASYNC_INGESTION
+                and webhook_queue.push(request.data)
+            ):
+                return Response(status=200)
+
+            parsed_data = TransactionData.parse_obj(
+                {**request.data, "account": account.as_instance()}
+                if account is not None
+                else request.data
+            )
             if isinstance(parsed_data.account, MonoCard):
-                if MonoTransaction.objects.filter(
-                    id=parsed_data.statement_item.id
-                ).exists():
-                    return Response(status=200)
-                self._process_card_transaction(parsed_data)
-            elif isinstance(parsed_data.account, MonoJar):
-                if JarTransaction.objects.filter(
-                    id=parsed_data.statement_item.id
-                ).exists():
-                    return Response(status=200)
-                self._process_jar_transaction(parsed_data)
-
-            return Response(status=201)
+                is_created = self._process_card_transaction(parsed_data)
+            else:
+                is_created = self._process_jar_transaction(parsed_data)
+            if is_created:
+                MonoAccount.bump_data_version(parsed_data.account.monoaccount_id)
+            MonoAccount.mark_webhook_received(parsed_data.account.monoaccount_id)
+
+            return Response(status=201 if is_created else 200)
         except ValidationError as err:
             logger.critical(err)
             return Response({"error": f"Wrong request structure"}, status=422)
@@ -541,6 +1020,13 @@ class TransactionWebhookApiView(APIView):
             logger.error(err)
             return Response({"error": f"Some data not found: {err}"}, status=404)
 
+        except IntegrityError as err:
+            # card or jar removed while kept in cache
+            logger.error(err)
+            if account is not None:
+                cache.delete(get_webhook_account_cache_key(account.id))
+            return Response({"error": f"Some data not found: {err}"}, status=404)
+
 
 class TestEndpoint(APIView):
     permission_classes = [AllowAny]
@@ -0,0 +1,242 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import (
+    InterfaceError,
+    OperationalError,
+    close_old_connections,
+    transaction,
+)
+from django_redis import get_redis_connection
+from loguru import logger
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+
+from .models import (
+    JarMonthSummary,
+    JarTransaction,
+    MonoAccount,
+    MonoCard,
+    MonoDataNotFound,
+    MonoTransaction,
+    get_webhook_account,
+    get_webhook_account_cache_key,
+)
+from .pydantic import TransactionData
+
+WEBHOOK_QUEUE_KEY = "monobank:webhook_queue"
+WEBHOOK_DEAD_LETTER_KEY = "monobank:webhook_queue:failed"
+# moves up to ARGV[1] payloads from the head of KEYS[1] to KEYS[2] at once
+CLAIM_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+end
+return items
+"""
+
+
+class WebhookQueueUnavailable(Exception):
+    pass
+
+
+class WebhookQueue:
+    """
+    Redis FIFO of raw webhook payloads shared by the api and writer processes.
+
+    A writer claims payloads by moving them to its own processing list and
+    acknowledges them after they are committed, so payloads of a writer
+    killed in between are written again by its next run.
+    """
+
+    def __init__(self, key: str = WEBHOOK_QUEUE_KEY, worker: str = "default"):
+        self.key = key
+        self.processing_key = f"{key}:processing:{worker}"
+        self.attempts_key = f"{self.processing_key}:attempts"
+        self._script = None
+
+    def _get_redis(self):
+        try:
+            return get_redis_connection("default")
+        except NotImplementedError:
+            raise WebhookQueueUnavailable("cache backend is not redis")
+
+    def push(self, payload: dict) -> bool:
+        """Queue a payload, False when redis is unavailable."""
+        try:
+            self._get_redis().rpush(self.key, json.dumps(payload))
+        except (WebhookQueueUnavailable, RedisError) as err:
+            logger.error(f"webhook queue: push failed: {err!r}")
+            return False
+        return True
+
+    def get_claimed(self) -> list[dict]:
+        """Payloads claimed before and not acknowledged yet."""
+        items = self._get_redis().lrange(self.processing_key, 0, -1)
+        return [json.loads(item) for item in items]
+
+    def claim(self, size: int) -> list[dict]:
+        """
+        Move up to `size` payloads from the head of the queue to the
+        processing list in one round trip, return only the moved ones.
+        """
+        if size <= 0:
+            return []
+        redis = self._get_redis()
+        if self._script is None:
+            self._script = redis.register_script(CLAIM_SCRIPT)
+        items = self._script(
+            keys=[self.key, self.processing_key], args=[size], client=redis
+        )
+        return [json.loads(item) for item in items]
+
+    def record_failure(self) -> int:
+        """Count a failed write of the claimed payloads, returns failures so far."""
+        return self._get_redis().incr(self.attempts_key)
+
+    def ack(self):
+        """Drop claimed payloads, call once they are committed."""
+        self._get_redis().delete(self.processing_key, self.attempts_key)
+
+    def __len__(self) -> int:
+        return self._get_redis().llen(self.key)
+
+
+webhook_queue = WebhookQueue()
+webhook_dead_letter_queue = WebhookQueue(WEBHOOK_DEAD_LETTER_KEY)
+
+
+def parse_webhook_payload(payload: dict) -> TransactionData:
+    account = get_webhook_account(payload["account"])
+    if account is None:
+        raise MonoDataNotFound(f"Invalid account ID: {payload['account']}")
+    return TransactionData.parse_obj({**payload, "account": account.as_instance()})
+
+
+def write_webhook_batch(payloads: list[dict]) -> int:
+    """
+    Bulk insert queued webhook transactions, already stored ones are skipped.
+    Payloads which can't be parsed go to the dead letter queue.
+    Returns count of written payloads.
+    """
+    card_transactions = []
+    jar_transactions = []
+    failed = []
+    monoaccount_ids = set()
+    for payload in payloads:
+        try:
+            parsed_data = parse_webhook_payload(payload)
+        except (ValidationError, MonoDataNotFound, KeyError, TypeError) as err:
+            logger.error(f"skip webhook payload {payload}: {err}")
+            failed.append(payload)
+            continue
+        account = parsed_data.account
+        monoaccount_ids.add(account.monoaccount_id)
+        fields = dict(parsed_data.statement_item)
+        if isinstance(account, MonoCard):
+            card_transactions.append(MonoTransaction(account=account, **fields))
+        else:
+            fields.pop("receipt_id", None)
+            fields.pop("comment", None)
+            jar_transactions.append(JarTransaction(account=account, **fields))
+
+    with transaction.atomic():
+        MonoTransaction.objects.bulk_create(card_transactions, ignore_conflicts=True)
+        JarTransaction.objects.bulk_create(jar_transactions, ignore_conflicts=True)
+        JarMonthSummary.refresh(
+            (item.account_id, item.time) for item in jar_transactions
+        )
+    MonoAccount.bump_data_version(*monoaccount_ids)
+    for monoaccount_id in monoaccount_ids:
+        MonoAccount.mark_webhook_received(monoaccount_id)
+    for payload in failed:
+        webhook_dead_letter_queue.push(payload)
+    return len(card_transactions) + len(jar_transactions)
+
+
+def write_webhook_payloads(payloads: list[dict]) -> int:
+    """
+    Write payloads one by one, the ones failing on their own go to the dead
+    letter queue. Database outages are raised, payloads are kept for later.
+    """
+    written = 0
+    for payload in payloads:
+        try:
+            written += write_webhook_batch([payload])
+        except (OperationalError, InterfaceError):
+            raise
+        except Exception as err:
+            logger.error(f"webhook writer: skip payload {payload}: {err!r}")
+            if isinstance(payload, dict) and "account" in payload:
+                # e.g. card or jar removed while kept in cache
+                cache.delete(get_webhook_account_cache_key(payload["account"]))
+            webhook_dead_letter_queue.push(payload)
+    return written
+
+
+def run_webhook_writer(
+    batch_size: int | None = None,
+    max_wait_ms: int | None = None,
+    queue: WebhookQueue = webhook_queue,
+    iterations: int | None = None,
+):
+    """
+    Drain the queue in micro-batches: a batch is written once it has
+    `batch_size` payloads or the oldest payload waited `max_wait_ms`.
+    Payloads claimed by a previous run of the writer are written first.
+    A batch failed WEBHOOK_WRITER_MAX_ATTEMPTS times is written payload by
+    payload, so a single bad payload can't block the queue.
+    """
+    if batch_size is None:
+        batch_size = settings.WEBHOOK_WRITER_BATCH_SIZE
+    if max_wait_ms is None:
+        max_wait_ms = settings.WEBHOOK_WRITER_MAX_WAIT_MS
+    poll_interval = min(max_wait_ms, 50) / 1000
+    while iterations is None or iterations > 0:
+        if iterations is not None:
+            iterations -= 1
+        # drop connections broken or outlived CONN_MAX_AGE since the last batch
+        close_old_connections()
+        batch = []
+        try:
+            batch = queue.get_claimed()
+            batch.extend(queue.claim(batch_size - len(batch)))
+            if not batch:
+                time.sleep(poll_interval)
+                continue
+            deadline = time.monotonic() + max_wait_ms / 1000
+            while len(batch) < batch_size and time.monotonic() < deadline:
+                time.sleep(poll_interval)
+                batch.extend(queue.claim(batch_size - len(batch)))
+            written = write_webhook_batch(batch)
+            queue.ack()
+        except Exception as err:
+            # claimed payloads stay in the processing list for the next attempt,
+            # e.g. when db or redis is unavailable
+            logger.error(f"webhook writer: failed to write batch: {err!r}")
+            close_old_connections()
+            if batch and not _write_failed_batch(queue, batch):
+                time.sleep(1)
+            continue
+        logger.info(f"webhook writer: {written}/{len(batch)} payload(s) written")
+
+
+def _write_failed_batch(queue: WebhookQueue, batch: list[dict]) -> bool:
+    """
+    Count the failure of the claimed batch, once it failed too many times
+    write it payload by payload. True when the batch is done with.
+    """
+    try:
+        if queue.record_failure() < settings.WEBHOOK_WRITER_MAX_ATTEMPTS:
+            return False
+        written = write_webhook_payloads(batch)
+        queue.ack()
+    except Exception as err:
+        logger.error(f"webhook writer: failed to write payloads: {err!r}")
+        close_old_connections()
+        return False
+    logger.info(f"webhook writer: {written}/{len(batch)} payload(s) written one by one")
+    return True
@@ -1,11 +1,14 @@
 import json
-from typing import Callable, List, NamedTuple
+from typing import Any, Callable, List, NamedTuple
+from unittest.mock import MagicMock
 from urllib.parse import urlencode
 
 import pytest
 from account.models import UserManager as cusrom_user
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
+from monobank.client import mono_client
 from monobank.models import (
     Category,
     CategoryMSO,
@@ -15,6 +18,7 @@ from monobank.models import (
     MonoCard,
     MonoJar,
     MonoTransaction,
+    reference_data,
 )
 from rest_framework.exceptions import ErrorDetail
 from rest_framework.test import APIRequestFactory, force_authenticate
@@ -47,6 +51,34 @@ class Variant(NamedTuple):
     query_params: dict | None = None
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Do not leak cached objects between tests (database is rolled back)."""
+    cache.clear()
+    reference_data.clear()
+
+
+def warm_access_cache(tg_id: str):
+    """Cache family and accounts used by access checks, as on a warm api."""
+    tg_ids = User.objects.get(tg_id=tg_id).get_related_tg_ids()
+    MonoAccount.get_user_account_ids(tg_ids)
+
+
+def make_mono_api_response(data: Any, status_code: int = 200) -> MagicMock:
+    content = json.dumps(data).encode() if data is not None else b""
+    response = MagicMock(status_code=status_code, content=content, reason="")
+    response.json.return_value = data
+    return response
+
+
+@pytest.fixture
+def mono_api(monkeypatch) -> MagicMock:
+    """Replace http requests of monobank api client, returns the request mock."""
+    request = MagicMock(return_value=make_mono_api_response({}))
+    monkeypatch.setattr(mono_client.session, "request", request)
+    return request
+
+
 @pytest.fixture
 def api_request():
     def get_view_by_name(
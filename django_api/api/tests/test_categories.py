@@ -1,3 +1,5 @@
+import pytest
+from monobank.models import Category
 from monobank.views import CategoryViewSet
 from rest_framework.exceptions import ErrorDetail
 
@@ -96,3 +98,20 @@ categories_list_variants = [
         ),
     ),
 ]
+
+
+@pytest.mark.django_db
+def test_categories_list_cached_until_categories_change(
+    api_request, django_assert_num_queries, pre_created_categories_mso
+):
+    view = CategoryViewSet.as_view({"get": "list"})
+    request = api_request("categories-list", tg_id="custom_name")
+    assert len(view(request).data) == 2
+
+    request = api_request("categories-list", tg_id="custom_name", create_new_user=False)
+    with django_assert_num_queries(0):
+        assert len(view(request).data) == 2
+
+    Category.objects.create(name="new_category")
+    request = api_request("categories-list", tg_id="custom_name", create_new_user=False)
+    assert len(view(request).data) == 3
@@ -0,0 +1,96 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from monobank.models import MonoJar
+from monobank.views import CategoryViewSet, MonoJarViewSet
+from rest_framework.test import APIRequestFactory, force_authenticate
+from utils.db_router import (
+    ReplicaRouter,
+    is_reading_from_replica,
+    read_from_replica,
+)
+
+User = get_user_model()
+
+
+def test_replica_router_reads_own_writes(settings):
+    settings.DB_REPLICA_ALIAS = "replica"
+    router = ReplicaRouter()
+
+    assert router.db_for_read(MonoJar) is None
+    with read_from_replica():
+        assert router.db_for_read(MonoJar) == "replica"
+        with read_from_replica():
+            assert router.db_for_write(MonoJar) == "default"
+        # write in a nested block pins the outer one too
+        assert router.db_for_read(MonoJar) is None
+    # writes outside of a block don't leak into the next one
+    assert router.db_for_write(MonoJar) == "default"
+    with read_from_replica():
+        assert router.db_for_read(MonoJar) == "replica"
+
+
+def test_replica_router_without_replica(settings):
+    settings.DB_REPLICA_ALIAS = None
+    with read_from_replica():
+        assert ReplicaRouter().db_for_read(MonoJar) is None
+        assert not is_reading_from_replica()
+
+
+class RecordingJarViewSet(MonoJarViewSet):
+    replica_reads: list[bool] = []
+
+    def list(self, request, *args, **kwargs):
+        self.replica_reads.append(is_reading_from_replica())
+        return super().list(request, *args, **kwargs)
+
+
+@pytest.mark.django_db
+def test_get_requests_read_from_replica_after_lag(settings, pre_created_mono_jar):
+    # the mirror of the default database stands for the replica
+    settings.DB_REPLICA_ALIAS = "default"
+    owner = User.objects.get(tg_id="precreated_user_tg_id")
+    view = RecordingJarViewSet.as_view({"get": "list"})
+    RecordingJarViewSet.replica_reads = []
+
+    def get_jars():
+        request = APIRequestFactory().get(reverse("monojars-list"))
+        force_authenticate(request, user=owner)
+        response = view(request)
+        assert response.status_code == 200
+        assert len(response.data) == 2
+        cache.clear()
+
+    # jars were just written, replica may not have them yet
+    get_jars()
+    settings.DB_REPLICA_LAG_SECONDS = 0
+    get_jars()
+
+    assert RecordingJarViewSet.replica_reads == [False, True]
+    assert not is_reading_from_replica()
+
+
+class RecordingCategoryViewSet(CategoryViewSet):
+    replica_reads: list[bool] = []
+
+    def list(self, request, *args, **kwargs):
+        self.replica_reads.append(is_reading_from_replica())
+        return super().list(request, *args, **kwargs)
+
+
+@pytest.mark.django_db
+def test_categories_read_from_primary(settings, pre_created_categories_mso):
+    # versions of reference data don't tell when it was changed, a lagging
+    # replica could put stale categories into the cache under a new version
+    settings.DB_REPLICA_ALIAS = "default"
+    settings.DB_REPLICA_LAG_SECONDS = 0
+    user = User.objects.create_user("reader", "PassW0rd")
+    request = APIRequestFactory().get(reverse("categories-list"))
+    force_authenticate(request, user=user)
+    RecordingCategoryViewSet.replica_reads = []
+
+    response = RecordingCategoryViewSet.as_view({"get": "list"})(request)
+
+    assert response.status_code == 200
+    assert RecordingCategoryViewSet.replica_reads == [False]
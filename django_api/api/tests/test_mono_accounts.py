@@ -1,9 +1,19 @@
-from unittest.mock import patch
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
 
 import pytest
-from monobank.models import MonoAccount, MonoCard
+from account.models import User
+from django.utils import timezone
+from monobank import tasks
+from monobank.client import mono_client
+from monobank.models import MonoAccount, MonoCard, MonoTransaction
+from monobank.rate_limit import mono_rate_limiter
+from monobank.refresh import refresh_mono_accounts
 from monobank.views import MonoAccountViewSet
 from rest_framework.exceptions import ErrorDetail
+from utils.errors import MonoBankForbidden
 
 from .conftest import NO_PERMISSION_ERROR, Variant
 
@@ -138,7 +148,7 @@ monoaccounts_list_variants = [
 def test_monousers(
     api_request, test_name, variant, monkeypatch, pre_created_mono_account
 ):
-    monkeypatch.setattr(MonoAccount, "get_cards_jars", lambda x: {})
+    monkeypatch.setattr(MonoAccount, "get_cards_jars", lambda x, max_wait=None: {})
     view = variant.view
 
     # Use the actual created MonoAccount primary key instead of assuming pk=1
@@ -162,3 +172,228 @@ def test_monousers(
     )
     assert response.status_code == variant.status_code
     assert response.data == variant.expected
+
+
+@pytest.mark.django_db
+def test_monoaccount_create_does_not_wait_for_rate_limit(
+    api_request, monkeypatch, pre_created_user
+):
+    session_request = MagicMock()
+    monkeypatch.setattr(mono_client.session, "request", session_request)
+    # client info of the token was just requested
+    mono_rate_limiter.acquire("throttled_token", "client-info")
+
+    started_at = time.monotonic()
+    response = MonoAccountViewSet.as_view({"post": "create"})(
+        api_request(
+            "monoaccounts-list",
+            tg_id="admin_name",
+            method_name="post",
+            is_admin=True,
+            data={"user": "admin_name", "mono_token": "throttled_token"},
+            need_json_dumps=True,
+        )
+    )
+
+    assert time.monotonic() - started_at < 1
+    assert response.status_code == 429
+    assert int(response["Retry-After"]) > 0
+    session_request.assert_not_called()
+    assert not MonoAccount.objects.filter(mono_token="throttled_token").exists()
+
+
+def test_refresh_mono_accounts_runs_concurrently(monkeypatch, pre_created_user):
+    accounts = [
+        MonoAccount.objects.create(
+            user=User.objects.create_user(tg_id=f"refresh_{i}", password="pass"),
+            mono_token=f"refresh_token_{i}",
+        )
+        for i in range(4)
+    ]
+    threads = set()
+
+    def create_cards_jars(account, data=None):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.2)
+        if account.mono_token == "refresh_token_3":
+            raise MonoBankForbidden("Unknown 'X-Token'", 403)
+
+    monkeypatch.setattr(MonoAccount, "create_cards_jars", create_cards_jars)
+
+    started_at = time.monotonic()
+    results = refresh_mono_accounts(accounts, concurrency=4)
+
+    assert time.monotonic() - started_at < 0.6
+    assert len(threads) == 4
+    assert [result.account_id for result in results] == [a.pk for a in accounts]
+    assert all(result.duration >= 0.2 for result in results)
+    assert [bool(result.error) for result in results] == [False, False, False, True]
+
+
+def test_refresh_mono_accounts_concurrency_cap(monkeypatch, pre_created_mono_account):
+    running = []
+    max_running = []
+
+    def create_cards_jars(account, data=None):
+        running.append(account.pk)
+        max_running.append(len(running))
+        time.sleep(0.05)
+        running.remove(account.pk)
+
+    monkeypatch.setattr(MonoAccount, "create_cards_jars", create_cards_jars)
+
+    results = refresh_mono_accounts([pre_created_mono_account] * 3, concurrency=1)
+
+    assert len(results) == 3
+    assert max(max_running) == 1
+
+
+def test_refresh_cohorts_cover_every_account_once(settings, pre_created_mono_account):
+    settings.ACCOUNT_REFRESH_SLOTS = 4
+    accounts = [pre_created_mono_account] + [
+        MonoAccount.objects.create(
+            user=User.objects.create_user(tg_id=f"cohort_{i}", password="pass"),
+            mono_token=f"cohort_token_{i}",
+        )
+        for i in range(7)
+    ]
+
+    cohorts = [
+        set(MonoAccount.get_refresh_cohort(slot).values_list("id", flat=True))
+        for slot in range(settings.ACCOUNT_REFRESH_SLOTS)
+    ]
+
+    assert sorted(len(cohort) for cohort in cohorts) == [2, 2, 2, 2]
+    assert set().union(*cohorts) == {account.pk for account in accounts}
+    assert MonoAccount.get_refresh_slot(at=60 * 4 + 59) == 0
+    assert MonoAccount.get_refresh_slot(at=60 * 5) == 1
+
+
+def test_refresh_mono_accounts_cohort_task(
+    monkeypatch, settings, pre_created_mono_account
+):
+    settings.SHOULD_AUTO_FETCH_TRANSACTIONS = True
+    refreshed = []
+    monkeypatch.setattr(
+        tasks,
+        "refresh_mono_accounts",
+        lambda accounts, schedule: refreshed.extend(accounts) or [],
+    )
+    slot = pre_created_mono_account.pk % settings.ACCOUNT_REFRESH_SLOTS
+
+    tasks.refresh_mono_accounts_cohort(slot + 1)
+    assert refreshed == []
+
+    tasks.refresh_mono_accounts_cohort(slot)
+    assert refreshed == [pre_created_mono_account]
+
+
+@pytest.mark.parametrize(
+    "test_name, transactions_count, expected_interval",
+    [
+        ("busy account", 50, 30),
+        ("regular account", 5, 60),
+        ("rare account", 1, 360),
+        ("dormant account", 0, 1440),
+    ],
+)
+def test_refresh_interval_follows_activity(
+    pre_created_mono_card,
+    pre_created_categories_mso,
+    test_name,
+    transactions_count,
+    expected_interval,
+):
+    card = pre_created_mono_card[0]
+    now = timezone.now()
+    MonoTransaction.objects.bulk_create(
+        MonoTransaction(
+            id=f"activity_{i}",
+            account=card,
+            time=int(now.timestamp()) - i * 60,
+            description="",
+            mcc=pre_created_categories_mso[0],
+            original_mcc=1234,
+            amount=-100,
+            operation_amount=-100,
+            currency=card.currency,
+            commission_rate=0,
+            cashback_amount=0,
+            balance=0,
+            hold=False,
+        )
+        for i in range(transactions_count)
+    )
+    account = card.monoaccount
+
+    assert account.schedule_next_refresh(now) == expected_interval
+    account.refresh_from_db()
+    assert account.next_refresh_at == now.replace(second=0, microsecond=0) + timedelta(
+        minutes=expected_interval
+    )
+
+
+def test_due_for_refresh(settings, pre_created_mono_account):
+    now = timezone.now()
+    slot = pre_created_mono_account.pk % settings.ACCOUNT_REFRESH_SLOTS
+    other_slot = (slot + 1) % settings.ACCOUNT_REFRESH_SLOTS
+
+    assert list(MonoAccount.get_due_for_refresh(slot, now)) == [
+        pre_created_mono_account
+    ]
+    assert not MonoAccount.get_due_for_refresh(other_slot, now).exists()
+
+    pre_created_mono_account.next_refresh_at = now + timedelta(minutes=30)
+    pre_created_mono_account.save()
+    assert not MonoAccount.get_due_for_refresh(slot, now).exists()
+    assert MonoAccount.get_due_for_refresh(
+        other_slot, now + timedelta(minutes=30)
+    ).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_refresh_claims_account_once(monkeypatch, pre_created_mono_account):
+    polled = []
+    monkeypatch.setattr(
+        MonoAccount,
+        "create_cards_jars",
+        lambda account: polled.append(account.pk) or time.sleep(0.2),
+    )
+    # overlapping cohort runs picked the same due account
+    copies = [MonoAccount.objects.get(pk=pre_created_mono_account.pk) for _ in range(3)]
+
+    results = refresh_mono_accounts(copies, concurrency=3, schedule=True)
+
+    assert polled == [pre_created_mono_account.pk]
+    assert sorted(result.skipped for result in results) == [False, True, True]
+    assert not MonoAccount.get_due_for_refresh(
+        MonoAccount.get_refresh_slot(), timezone.now()
+    ).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_refresh_skips_polling_with_healthy_webhook(
+    monkeypatch, pre_created_mono_account
+):
+    polled = []
+    monkeypatch.setattr(
+        MonoAccount, "create_cards_jars", lambda account: polled.append(account)
+    )
+    MonoAccount.mark_webhook_received(pre_created_mono_account.pk)
+    pre_created_mono_account.refresh_from_db()
+
+    results = refresh_mono_accounts([pre_created_mono_account], schedule=True)
+
+    assert polled == []
+    assert results[0].skipped
+    assert results[0].interval == 1440
+
+    pre_created_mono_account.last_webhook_at = timezone.now() - timedelta(days=2)
+    # due again
+    MonoAccount.objects.filter(pk=pre_created_mono_account.pk).update(
+        next_refresh_at=timezone.now()
+    )
+    results = refresh_mono_accounts([pre_created_mono_account], schedule=True)
+
+    assert polled == [pre_created_mono_account]
+    assert not results[0].skipped
@@ -0,0 +1,115 @@
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from monobank.client import MonoBankClient
+from utils.errors import (
+    MonoBankForbidden,
+    MonoBankRequestError,
+    MonoBankTooManyRequests,
+    MonoBankUnavailable,
+)
+
+from .conftest import make_mono_api_response
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = MonoBankClient(connect_timeout=1, read_timeout=2)
+    monkeypatch.setattr(client.session, "request", MagicMock())
+    return client
+
+
+def test_client_reuses_session_with_timeouts_and_gzip(client):
+    client.session.request.return_value = make_mono_api_response([{"id": "tx"}])
+
+    assert client.get_statement("token", "card", 1, 2) == [{"id": "tx"}]
+    assert client.get_statement("other_token", "card", 1, 2) == [{"id": "tx"}]
+
+    method, url = client.session.request.call_args.args
+    assert (method, url) == (
+        "GET",
+        "https://api.monobank.ua/personal/statement/card/1/2",
+    )
+    assert client.session.request.call_args.kwargs["timeout"] == (1, 2)
+    assert client.session.request.call_args.kwargs["headers"] == {
+        "X-Token": "other_token"
+    }
+    assert client.session.headers["Accept-Encoding"] == "gzip"
+    adapter = client.session.get_adapter("https://api.monobank.ua")
+    assert adapter._pool_maxsize == 10
+
+
+def test_client_sets_webhook(client):
+    client.session.request.return_value = make_mono_api_response(None)
+
+    client.set_webhook("token", "https://host/webhook/?token=token")
+
+    assert client.session.request.call_args.kwargs["json"] == {
+        "webHookUrl": "https://host/webhook/?token=token"
+    }
+
+
+monobank_client_error_variants = [
+    (
+        "rate limited",
+        429,
+        {"errorDescription": "Too many requests"},
+        MonoBankTooManyRequests,
+    ),
+    (
+        "invalid token",
+        403,
+        {"errorDescription": "Unknown 'X-Token'"},
+        MonoBankForbidden,
+    ),
+    ("server error", 502, None, MonoBankUnavailable),
+    (
+        "bad request",
+        400,
+        {"errorDescription": "Period must be no more than 31 days"},
+        MonoBankRequestError,
+    ),
+    (
+        "error description on success",
+        200,
+        {"errorDescription": "error"},
+        MonoBankRequestError,
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "test_name, status_code, data, error", monobank_client_error_variants
+)
+def test_client_typed_errors(client, test_name, status_code, data, error):
+    client.session.request.return_value = make_mono_api_response(data, status_code)
+
+    with pytest.raises(error) as err:
+        client.get_client_info("token")
+    assert err.value.status_code == status_code
+    if data:
+        assert str(err.value) == data["errorDescription"]
+
+
+def test_client_timeout_is_unavailable_error_and_reported(client):
+    hook = MagicMock()
+    client.add_metrics_hook(hook)
+    client.session.request.side_effect = requests.ReadTimeout("read timed out")
+
+    with pytest.raises(MonoBankUnavailable):
+        client.get_client_info("token")
+    endpoint, status_code, duration, size = hook.call_args.args
+    assert (endpoint, status_code, size) == ("client-info", None, 0)
+    assert duration >= 0
+
+
+def test_client_metrics_hook(client):
+    hook = MagicMock()
+    client.add_metrics_hook(hook)
+    client.session.request.return_value = make_mono_api_response({"accounts": []})
+
+    client.get_client_info("token")
+
+    endpoint, status_code, _, size = hook.call_args.args
+    assert (endpoint, status_code, size) == ("client-info", 200, 16)
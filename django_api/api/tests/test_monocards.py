@@ -1,10 +1,13 @@
+from unittest.mock import MagicMock
+
 import pytest
 from django.contrib.auth import get_user_model
-from monobank.models import MonoAccount, MonoCard
+from monobank import models as monobank_models
+from monobank.models import MonoAccount, MonoCard, MonoTransaction
 from monobank.views import MonoCardViewSet
 from rest_framework.exceptions import ErrorDetail
 
-from .conftest import Variant
+from .conftest import Variant, make_mono_api_response, warm_access_cache
 
 User = get_user_model()
 
@@ -284,3 +287,186 @@ def test_monocards_list(
     )
     assert response.status_code == variant.status_code
     assert response.data == variant.expected
+
+
+monocards_available_months_variants = [
+    (
+        "monocards available months admin",
+        Variant(
+            view=MonoCardViewSet.as_view({"get": "available_months"}),
+            name="monocards-available-months",
+            is_admin=True,
+            tg_id="admin_name",
+            url_kwargs={"pk": "pre_created_card_id"},
+            expected=["1970-01-01"],
+        ),
+    ),
+    (
+        "monocards available months owner",
+        Variant(
+            view=MonoCardViewSet.as_view({"get": "available_months"}),
+            name="monocards-available-months",
+            is_admin=False,
+            tg_id="precreated_user_tg_id",
+            url_kwargs={"pk": "pre_created_card_id"},
+            expected=["1970-01-01"],
+            create_new_user=False,
+        ),
+    ),
+    (
+        "monocards available months not owner",
+        Variant(
+            view=MonoCardViewSet.as_view({"get": "available_months"}),
+            name="monocards-available-months",
+            is_admin=False,
+            tg_id="some_user",
+            url_kwargs={"pk": "pre_created_card_id"},
+            status_code=404,
+            expected={"detail": ErrorDetail(string="Not found.", code="not_found")},
+        ),
+    ),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("api_request")
+@pytest.mark.parametrize("test_name, variant", monocards_available_months_variants)
+@pytest.mark.usefixtures("pre_created_mono_transaction")
+def test_monocards_available_months(api_request, test_name, variant):
+    view = variant.view
+
+    response = view(
+        api_request(
+            variant.name,
+            tg_id=variant.tg_id,
+            method_name=variant.method_name,
+            is_admin=variant.is_admin,
+            url_kwargs=variant.url_kwargs,
+            data=variant.request_data,
+            create_new_user=variant.create_new_user,
+        ),
+        **variant.url_kwargs,
+    )
+    assert response.status_code == variant.status_code
+    assert response.data == variant.expected
+
+
+@pytest.mark.django_db
+def test_monocard_available_months_grouped_by_utc_month(pre_created_mono_transaction):
+    card = MonoCard.objects.get(id="pre_created_card_id")
+    transaction = MonoTransaction.objects.filter(account=card).first()
+    for index, time in enumerate((1_706_745_599, 1_706_745_600, 1_709_251_199)):
+        transaction.pk = f"month_tx_{index}"
+        transaction.time = time
+        transaction.save()
+
+    assert [month.isoformat() for month in card.get_available_months()] == [
+        "1970-01-01",
+        "2024-01-01",
+        "2024-02-01",
+    ]
+
+
+monocard_statement_sync_variants = [
+    (
+        "first sync requests full statement period",
+        None,
+        [{"id": "tx1", "time": 1_700_000_000}, {"id": "tx2", "time": 1_700_000_500}],
+        1_700_003_600 - monobank_models.STATEMENT_PERIOD_SECONDS,
+    ),
+    (
+        "next sync requests only window since watermark",
+        1_700_000_000,
+        [{"id": "tx3", "time": 1_700_002_000}],
+        1_700_000_000 - monobank_models.STATEMENT_SYNC_OVERLAP_SECONDS,
+    ),
+    (
+        "empty statement is not sent for ingestion",
+        1_700_000_000,
+        [],
+        1_700_000_000 - monobank_models.STATEMENT_SYNC_OVERLAP_SECONDS,
+    ),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "test_name, watermark, statement, expected_from",
+    monocard_statement_sync_variants,
+)
+def test_monocard_get_transactions_uses_sync_watermark(
+    monkeypatch,
+    mono_api,
+    pre_created_mono_card,
+    test_name,
+    watermark,
+    statement,
+    expected_from,
+):
+    card = pre_created_mono_card[0]
+    card.sync_watermark = watermark
+    card.save()
+
+    mono_api.return_value = make_mono_api_response(statement)
+    mock_apply_async = MagicMock()
+    monkeypatch.setattr(
+        MonoTransaction.create_transactions_from_statement,
+        "apply_async",
+        mock_apply_async,
+    )
+
+    card.get_transactions(to_unix=1_700_003_600)
+
+    requested_url = mono_api.call_args.args[1]
+    assert requested_url.endswith(f"/{card.id}/{expected_from}/1700003600")
+    if statement:
+        mock_apply_async.assert_called_once()
+        assert mock_apply_async.call_args.kwargs["args"] == (card.id, statement)
+    else:
+        mock_apply_async.assert_not_called()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "action, url_kwargs, fields, expected",
+    [
+        (
+            "list",
+            {},
+            "id,balance",
+            [
+                {"id": "pre_created_card_id", "balance": 100},
+                {"id": "pre_created_card_id2", "balance": 100},
+            ],
+        ),
+        (
+            "retrieve",
+            {"pk": "pre_created_card_id"},
+            "owner_name,unknown",
+            {"owner_name": "User-precreated_user_tg_id"},
+        ),
+    ],
+)
+def test_monocards_sparse_fields(
+    api_request,
+    django_assert_num_queries,
+    action,
+    url_kwargs,
+    fields,
+    expected,
+    pre_created_mono_card,
+):
+    warm_access_cache("precreated_user_tg_id")
+    request = api_request(
+        f"monocards-{'detail' if url_kwargs else 'list'}",
+        tg_id="precreated_user_tg_id",
+        create_new_user=False,
+        url_kwargs=url_kwargs,
+        query_params={"fields": fields},
+    )
+    with django_assert_num_queries(1) as queries:
+        response = MonoCardViewSet.as_view({"get": action})(request, **url_kwargs)
+
+    assert response.status_code == 200
+    assert response.data == expected
+    assert 'JOIN "monobank_currency"' not in queries.captured_queries[0]["sql"]
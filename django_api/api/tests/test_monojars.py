@@ -1,10 +1,15 @@
+from unittest.mock import MagicMock
+
 import pytest
 from django.contrib.auth import get_user_model
-from monobank.models import MonoAccount, MonoJar
+from django.urls import reverse
+from monobank import models as monobank_models
+from monobank.models import JarTransaction, MonoAccount, MonoJar
 from monobank.views import MonoJarViewSet
 from rest_framework.exceptions import ErrorDetail
+from rest_framework.test import APIRequestFactory, force_authenticate
 
-from .conftest import Variant
+from .conftest import Variant, make_mono_api_response
 
 User = get_user_model()
 
@@ -714,3 +719,247 @@ def test_monojars_month_summary(api_request, test_name, variant, pre_created_mon
     )
     assert response.status_code == variant.status_code
     assert response.data == variant.expected
+
+
+@pytest.mark.django_db
+def test_monojar_get_transactions_uses_sync_watermark(
+    monkeypatch, mono_api, pre_created_mono_jar
+):
+    jar = pre_created_mono_jar[0]
+    jar.sync_watermark = 1_700_000_000
+    jar.save()
+
+    statement = [{"id": "jar_tx", "time": 1_700_001_000}]
+    mono_api.return_value = make_mono_api_response(statement)
+    mock_apply_async = MagicMock()
+    monkeypatch.setattr(
+        JarTransaction.create_jar_transactions_from_statement,
+        "apply_async",
+        mock_apply_async,
+    )
+
+    jar.get_transactions(to_unix=1_700_003_600)
+
+    expected_from = 1_700_000_000 - monobank_models.STATEMENT_SYNC_OVERLAP_SECONDS
+    assert mono_api.call_args.args[1].endswith(f"/{jar.id}/{expected_from}/1700003600")
+    assert mock_apply_async.call_args.kwargs["args"] == (jar.id, statement)
+
+
+def make_conditional_request(url: str, user, **headers):
+    request = APIRequestFactory().get(url, **headers)
+    force_authenticate(request, user=user)
+    return request
+
+
+@pytest.mark.django_db
+def test_monojars_conditional_get(
+    django_assert_num_queries,
+    pre_created_mono_jar,
+    pre_created_currency,
+    pre_created_categories_mso,
+):
+    owner = User.objects.get(tg_id="precreated_user_tg_id")
+    stranger = User.objects.create_user("stranger", "PassW0rd")
+    view = MonoJarViewSet.as_view({"get": "retrieve"})
+    url = reverse("monojars-detail", kwargs={"pk": "pre_created_jar_id"})
+
+    response = view(make_conditional_request(url, owner), pk="pre_created_jar_id")
+    assert response.status_code == 200
+    etag = response["ETag"]
+    assert response["Last-Modified"]
+    assert "no-cache" in response["Cache-Control"]
+
+    # unchanged data is answered without touching the database
+    with django_assert_num_queries(0):
+        response = view(
+            make_conditional_request(url, owner, HTTP_IF_NONE_MATCH=etag),
+            pk="pre_created_jar_id",
+        )
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+    # etag of another user doesn't match
+    response = view(
+        make_conditional_request(url, stranger, HTTP_IF_NONE_MATCH=etag),
+        pk="pre_created_jar_id",
+    )
+    assert response.status_code == 404
+
+    # new transaction of the account changes the version
+    JarTransaction.objects.bulk_create(
+        [
+            JarTransaction(
+                id="new_jar_tx",
+                time=1_700_000_000,
+                mcc=pre_created_categories_mso[0],
+                amount=100,
+                currency=pre_created_currency,
+                balance=1100,
+                hold=False,
+                account=pre_created_mono_jar[0],
+                cashback_amount=0,
+            )
+        ]
+    )
+    MonoAccount.bump_data_version(pre_created_mono_jar[0].monoaccount_id)
+    response = view(
+        make_conditional_request(url, owner, HTTP_IF_NONE_MATCH=etag),
+        pk="pre_created_jar_id",
+    )
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_monojars_data_version_bumped_on_ingest(pre_created_mono_jar):
+    monoaccount_id = pre_created_mono_jar[0].monoaccount_id
+    version = MonoAccount.get_data_version([monoaccount_id])
+    other_version = MonoAccount.get_data_version([0])
+
+    jar = pre_created_mono_jar[1]
+    jar.balance += 1
+    jar.save()
+
+    assert MonoAccount.get_data_version([monoaccount_id]) > version
+    assert MonoAccount.get_data_version([0]) == other_version
+    assert MonoAccount.get_data_version() >= MonoAccount.get_data_version(
+        [monoaccount_id]
+    )
+
+
+@pytest.mark.django_db
+def test_monojars_month_summary_cached_until_jar_transaction_written(
+    django_assert_num_queries,
+    pre_created_mono_jar_transaction,
+    pre_created_currency,
+    pre_created_categories_mso,
+):
+    owner = User.objects.get(tg_id="precreated_user_tg_id")
+    view = MonoJarViewSet.as_view({"get": "month_summary"})
+    url = reverse("monojars-month-summary", kwargs={"pk": "pre_created_jar_id"})
+    url = f"{url}?month=1970-01-01"
+
+    first = view(make_conditional_request(url, owner), pk="pre_created_jar_id")
+    assert first.data["end_balance"] == 10000
+    # hot path: family, accounts, versions and the response come from cache
+    with django_assert_num_queries(0):
+        cached = view(make_conditional_request(url, owner), pk="pre_created_jar_id")
+    assert cached.status_code == 200
+    assert cached.data == first.data
+
+    JarTransaction.objects.create(
+        id="new_jar_tx",
+        time=12346,
+        mcc=pre_created_categories_mso[0],
+        amount=500,
+        currency=pre_created_currency,
+        balance=10500,
+        hold=False,
+        account_id="pre_created_jar_id",
+        cashback_amount=0,
+    )
+    response = view(make_conditional_request(url, owner), pk="pre_created_jar_id")
+    assert response.data["end_balance"] == 10500
+
+
+@pytest.mark.django_db
+def test_monojars_list_cache_follows_family_changes(
+    pre_created_mono_jar, pre_created_family_for_precreated_user
+):
+    member = pre_created_family_for_precreated_user
+    view = MonoJarViewSet.as_view({"get": "list"})
+    url = reverse("monojars-list")
+
+    def jar_ids():
+        response = view(make_conditional_request(url, member))
+        return sorted(jar["id"] for jar in response.data)
+
+    assert jar_ids() == ["family_jar_id", "pre_created_jar_id", "pre_created_jar_id2"]
+    member.family_members.clear()
+    assert jar_ids() == ["family_jar_id"]
+
+
+@pytest.mark.django_db
+def test_monojars_balance_series_downsampled(
+    django_assert_num_queries,
+    pre_created_mono_jar,
+    pre_created_currency,
+    pre_created_categories_mso,
+):
+    owner = User.objects.get(tg_id="precreated_user_tg_id")
+    balances = [1000 + index * 10 for index in range(100)]
+    balances[37] = 50_000
+    balances[61] = -500
+    JarTransaction.objects.bulk_create(
+        JarTransaction(
+            id=f"series_tx_{index}",
+            time=1_700_000_000 + index * 3600,
+            mcc=pre_created_categories_mso[0],
+            amount=10,
+            currency=pre_created_currency,
+            balance=balance,
+            hold=False,
+            account_id="pre_created_jar_id",
+            cashback_amount=0,
+        )
+        for index, balance in enumerate(balances)
+    )
+    view = MonoJarViewSet.as_view({"get": "balance_series"})
+    url = reverse("monojars-balance-series", kwargs={"pk": "pre_created_jar_id"})
+
+    response = view(
+        make_conditional_request(f"{url}?points=10", owner), pk="pre_created_jar_id"
+    )
+    assert response.status_code == 200
+    series = response.data
+    assert len(series) <= 10
+    times = [point["time"] for point in series]
+    assert times == sorted(times)
+    # ends and extremes of the series are kept
+    assert series[0] == {"time": 1_700_000_000, "balance": 1000}
+    assert series[-1] == {"time": 1_700_000_000 + 99 * 3600, "balance": 1990}
+    assert {50_000, -500} <= {point["balance"] for point in series}
+
+    # short series are returned as is
+    request = make_conditional_request(f"{url}?points=200&time_from=2023-11-15", owner)
+    # the jar and the series
+    with django_assert_num_queries(2):
+        response = view(request, pk="pre_created_jar_id")
+    assert [point["balance"] for point in response.data] == [
+        balance
+        for index, balance in enumerate(balances)
+        if 1_700_000_000 + index * 3600 >= 1_700_006_400
+    ]
+
+    response = view(
+        make_conditional_request(f"{url}?points=3", owner), pk="pre_created_jar_id"
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_monojars_cache_follows_owner_and_reference_data_changes(
+    pre_created_mono_jar, pre_created_currency
+):
+    owner = User.objects.get(tg_id="precreated_user_tg_id")
+    view = MonoJarViewSet.as_view({"get": "retrieve"})
+    url = reverse("monojars-detail", kwargs={"pk": "pre_created_jar_id"})
+
+    def get_jar(**headers):
+        return view(
+            make_conditional_request(url, owner, **headers), pk="pre_created_jar_id"
+        )
+
+    etag = get_jar()["ETag"]
+    owner.name = "Renamed owner"
+    owner.save()
+    response = get_jar(HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["owner_name"] == "Renamed owner"
+
+    etag = response["ETag"]
+    pre_created_currency.symbol = "$"
+    pre_created_currency.save()
+    response = get_jar(HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response.data["currency"]["symbol"] == "$"
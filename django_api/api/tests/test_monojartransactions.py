@@ -1,13 +1,18 @@
+import json
 import time as _time
+from datetime import date, datetime, timezone
 
 import pytest
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
-from monobank.models import JarTransaction, MonoAccount, MonoJar
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from monobank.models import JarMonthSummary, JarTransaction, MonoAccount, MonoJar
 from monobank.views import MonoJarTransactionViewSet
 from rest_framework.exceptions import ErrorDetail
 
-from .conftest import Variant
+from .conftest import Variant, warm_access_cache
 
 User = get_user_model()
 
@@ -49,6 +54,45 @@ def test_create_jar_transaction_from_webhook(pre_created_mono_jar):
         pytest.fail("Transaction was not created")
 
 
+@pytest.mark.django_db
+def test_create_jar_transactions_from_statement(
+    django_assert_max_num_queries, pre_created_mono_jar, pre_created_categories_mso
+):
+    mono_jar = pre_created_mono_jar[0]
+    statement = [
+        {
+            "id": f"jar_statement_tx_{index}",
+            "time": 1_700_000_000 + index,
+            "description": "Поповнення",
+            "mcc": 1234,
+            "originalMcc": 1234,
+            "amount": 1000,
+            "operationAmount": 1000,
+            "currencyCode": 980,
+            "commissionRate": 0,
+            "cashbackAmount": 0,
+            "balance": 1000 * (index + 1),
+            "hold": False,
+        }
+        for index in range(300)
+    ]
+
+    # the last one locks months of the refreshed summaries
+    with django_assert_max_num_queries(7):
+        JarTransaction.create_jar_transactions_from_statement(  # type: ignore
+            mono_jar.id, statement
+        )
+    # repeated statement does not create duplicates
+    JarTransaction.create_jar_transactions_from_statement(  # type: ignore
+        mono_jar.id, statement
+    )
+
+    assert JarTransaction.objects.filter(account=mono_jar).count() == 300
+    assert JarTransaction.objects.get(id="jar_statement_tx_299").balance == 300000
+    mono_jar.refresh_from_db()
+    assert mono_jar.sync_watermark == 1_700_000_299
+
+
 monojartransactions_variants = [
     (
         "monojartransactions retrieve admin",
@@ -397,7 +441,12 @@ def test_monojartransactions(
         **variant.url_kwargs,
     )
     # assert response.status_code == variant.status_code
-    assert response.data == variant.expected
+    data = response.data
+    if isinstance(variant.expected, list):
+        # lists are paginated
+        assert data["next"] is None
+        data = data["results"]
+    assert data == variant.expected
 
 
 @pytest.mark.django_db
@@ -454,7 +503,9 @@ def test_monojartransactions_fields_selection(
     )
 
     expected_time = _time.strftime("%Y-%m-%d %H:%M:%S", _time.localtime(jt.time))
-    assert response.data == [{"balance": 5555, "formatted_time": expected_time}]
+    assert response.data["results"] == [
+        {"balance": 5555, "formatted_time": expected_time}
+    ]
 
 
 @pytest.mark.django_db
@@ -535,4 +586,216 @@ def test_monojartransactions_time_from_and_fields(
     )
 
     expected_time = _time.strftime("%Y-%m-%d %H:%M:%S", _time.localtime(new_tr.time))
-    assert response.data == [{"balance": 2222, "formatted_time": expected_time}]
+    assert response.data["results"] == [
+        {"balance": 2222, "formatted_time": expected_time}
+    ]
+
+
+@pytest.mark.django_db
+def test_jar_month_summary_follows_transaction_writes(
+    pre_created_mono_jar, pre_created_currency, pre_created_categories_mso
+):
+    jar = pre_created_mono_jar[0]
+    march = int(datetime(2024, 3, 1, tzinfo=timezone.utc).timestamp())
+
+    def make_transaction(id, time, amount, balance):
+        return JarTransaction(
+            id=id,
+            account=jar,
+            time=time,
+            mcc=pre_created_categories_mso[0],
+            amount=amount,
+            currency=pre_created_currency,
+            balance=balance,
+            hold=False,
+            cashback_amount=0,
+        )
+
+    make_transaction("m1", march + 100, 5000, 15000).save()
+    JarTransaction.create_jar_transactions_from_statement(
+        jar.id,
+        [
+            {
+                "id": "m2",
+                "time": march + 200,
+                "mcc": 1234,
+                "currencyCode": pre_created_currency.code,
+                "amount": -3000,
+                "balance": 12000,
+                "hold": False,
+                "cashbackAmount": 0,
+                "description": "",
+            },
+            {
+                "id": "m3",
+                "time": march + 50,
+                "mcc": 1234,
+                "currencyCode": pre_created_currency.code,
+                "amount": 10000,
+                "balance": 10000,
+                "hold": False,
+                "cashbackAmount": 0,
+                "description": "",
+            },
+        ],
+    )
+
+    summary = JarMonthSummary.objects.get(jar=jar, month=date(2024, 3, 1))
+    assert summary.transactions_count == 3
+    assert jar.get_month_summary("2024-03-01") == {
+        "start_balance": 10000,
+        "budget": 10000,
+        "end_balance": 12000,
+        "spent": -12000,
+    }
+
+    JarTransaction.objects.filter(id__in=["m1", "m2", "m3"]).delete()
+    make_transaction("m4", march + 300, -100, 100).save()
+    assert jar.get_month_summary("2024-03-01")["end_balance"] == 100
+    JarTransaction.objects.filter(id="m4").delete()
+    assert not JarMonthSummary.objects.filter(jar=jar).exists()
+
+
+@pytest.mark.django_db
+def test_jar_month_summary_refresh_waits_for_concurrent_refresh(
+    pre_created_mono_jar_transaction,
+):
+    # a month not refreshed by this test's own transaction yet
+    march = int(datetime(2024, 3, 1, tzinfo=timezone.utc).timestamp())
+    JarTransaction.objects.filter(id="pre_created_id").update(time=march)
+    # another writer refreshing the same jar month
+    other = connection.get_new_connection(connection.get_connection_params())
+    try:
+        with other.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_try_advisory_xact_lock(hashtext(%s), %s)",
+                ["pre_created_jar_id", date(2024, 3, 1).toordinal()],
+            )
+            assert cursor.fetchone() == (True,)
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = '100ms'")
+        with pytest.raises(OperationalError), transaction.atomic():
+            JarMonthSummary.refresh([("pre_created_jar_id", march)])
+        # other months are not blocked
+        assert JarMonthSummary.refresh([("pre_created_jar_id2", 12345)]) == 1
+    finally:
+        other.rollback()
+        other.close()
+
+    assert JarMonthSummary.refresh([("pre_created_jar_id", march)]) == 1
+
+
+@pytest.mark.django_db
+def test_jar_months_and_time_filters_are_utc(
+    monkeypatch, api_request, pre_created_mono_jar_transaction
+):
+    # 1970-01-31 23:30 UTC is already February in Kyiv
+    JarTransaction.objects.filter(id="pre_created_id").update(time=2_676_600)
+    JarMonthSummary.rebuild()
+    monkeypatch.setenv("TZ", "Europe/Kyiv")
+    _time.tzset()
+    try:
+        response = MonoJarTransactionViewSet.as_view({"get": "list"})(
+            api_request(
+                "monojartransactions-list",
+                tg_id="admin_name",
+                is_admin=True,
+                query_params={"time_from": "1970-01-31", "time_to": "1970-01-31"},
+            )
+        )
+    finally:
+        monkeypatch.undo()
+        _time.tzset()
+
+    (item,) = response.data["results"]
+    assert item["id"] == "pre_created_id"
+    assert item["formatted_time"] == "1970-01-31 23:30:00"
+    jar = MonoJar.objects.get(id="pre_created_jar_id")
+    assert jar.get_available_months() == [date(1970, 1, 1)]
+
+
+@pytest.mark.django_db
+def test_rebuild_jar_month_summaries(pre_created_mono_jar_transaction):
+    JarMonthSummary.objects.all().delete()
+
+    call_command("rebuild_jar_month_summaries")
+
+    assert JarMonthSummary.objects.get(jar_id="pre_created_jar_id").as_dict() == {
+        "start_balance": 10000,
+        "budget": 0,
+        "end_balance": 10000,
+        "spent": 0,
+    }
+
+
+@pytest.mark.django_db
+def test_monojartransactions_export_owner(
+    api_request, pre_created_mono_jar_transaction
+):
+    response = MonoJarTransactionViewSet.as_view({"get": "export"})(
+        api_request(
+            "monojartransactions-export",
+            tg_id="precreated_user_tg_id",
+            create_new_user=False,
+            query_params={"jars": "pre_created_jar_id"},
+        )
+    )
+    assert response.status_code == 200
+    rows = [
+        json.loads(line)
+        for line in b"".join(response.streaming_content).decode().splitlines()
+    ]
+    assert [row["id"] for row in rows] == ["pre_created_id"]
+    assert rows[0]["amount"] == -5000
+    assert "receipt_id" not in rows[0]
+
+
+@pytest.mark.django_db
+def test_monojartransactions_sparse_fields_read_only_needed_columns(
+    api_request, pre_created_mono_jar_transaction
+):
+    # chart of the bot
+    request = api_request(
+        "monojartransactions-list",
+        tg_id="precreated_user_tg_id",
+        create_new_user=False,
+        query_params={"jars": "pre_created_jar_id", "fields": "balance,formatted_time"},
+    )
+    warm_access_cache("precreated_user_tg_id")
+    with CaptureQueriesContext(connection) as queries:
+        response = MonoJarTransactionViewSet.as_view({"get": "list"})(request)
+
+    assert response.data["results"] == [
+        {"balance": 10000, "formatted_time": "1970-01-01 03:25:45"}
+    ]
+    (query,) = queries.captured_queries
+    select = query["sql"].split(" FROM ")[0]
+    # time and id are read for the cursor of the next page
+    assert select == (
+        'SELECT "monobank_jartransaction"."time", "monobank_jartransaction"."id", '
+        '"monobank_jartransaction"."balance"'
+    )
+    # only joins of the access filter remain
+    for table in ("monobank_currency", "monobank_category", "account_user"):
+        assert f'JOIN "{table}"' not in query["sql"]
+
+
+@pytest.mark.django_db
+def test_monojartransactions_sparse_fields_retrieve(
+    api_request, django_assert_num_queries, pre_created_mono_jar_transaction
+):
+    request = api_request(
+        "monojartransactions-detail",
+        tg_id="precreated_user_tg_id",
+        create_new_user=False,
+        url_kwargs={"pk": "pre_created_id"},
+        query_params={"fields": "id,category"},
+    )
+    warm_access_cache("precreated_user_tg_id")
+    # object permission check reads the owner from the same query
+    with django_assert_num_queries(1):
+        response = MonoJarTransactionViewSet.as_view({"get": "retrieve"})(
+            request, pk="pre_created_id"
+        )
+    assert response.status_code == 200
+    assert set(response.data) == {"id", "category"}
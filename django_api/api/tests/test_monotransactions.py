@@ -1,7 +1,19 @@
+import csv
+import io
+import json
+
 import pytest
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
-from monobank.models import MonoAccount, MonoCard, MonoTransaction
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from monobank.models import JarTransaction, MonoAccount, MonoCard, MonoTransaction
+from monobank.serializers import (
+    MonoJarTransactionSerializer,
+    MonoJarTransactionValuesListSerializer,
+    MonoTransactionSerializer,
+    MonoTransactionValuesListSerializer,
+)
 from monobank.views import MonoTransactionViewSet
 from rest_framework.exceptions import ErrorDetail
 
@@ -48,6 +60,69 @@ def test_create_transaction_from_webhook(pre_created_mono_card):
         pytest.fail("Transaction was not created")
 
 
+def _statement_item(transaction_id: str, time: int, mcc: int = 1234) -> dict:
+    return {
+        "id": transaction_id,
+        "time": time,
+        "description": "Укрпошта",
+        "mcc": mcc,
+        "originalMcc": mcc,
+        "amount": -18200,
+        "operationAmount": -18200,
+        "currencyCode": 980,
+        "commissionRate": 0,
+        "cashbackAmount": 0,
+        "balance": 6961482,
+        "hold": True,
+        "receiptId": "T6X3-2ET0-CKT0-EBP1",
+        "counterIban": "UA000000000000000000000000000",
+    }
+
+
+@pytest.mark.django_db
+def test_create_transactions_from_statement(
+    django_assert_max_num_queries,
+    pre_created_mono_card,
+    pre_created_mono_transaction,
+    pre_created_categories_mso,
+):
+    monocard = pre_created_mono_card[0]
+    statement = [
+        _statement_item(f"statement_tx_{index}", 1_700_000_000 + index)
+        for index in range(500)
+    ]
+    # already stored transaction is skipped instead of failing the whole batch
+    statement.append(_statement_item("pre_created_id", 12345))
+
+    with django_assert_max_num_queries(6):
+        MonoTransaction.create_transactions_from_statement(  # type: ignore
+            monocard.id, statement
+        )
+
+    assert MonoTransaction.objects.filter(account=monocard).count() == 501
+    created = MonoTransaction.objects.get(id="statement_tx_499")
+    assert created.time == 1_700_000_499
+    assert created.receipt_id == "T6X3-2ET0-CKT0-EBP1"
+    assert created.mcc == pre_created_categories_mso[0]
+    assert created.currency.code == 980
+    assert MonoTransaction.objects.get(id="pre_created_id").time == 12345
+    monocard.refresh_from_db()
+    assert monocard.sync_watermark == 1_700_000_499
+
+
+@pytest.mark.django_db
+def test_create_transactions_from_statement_unknown_mso(pre_created_mono_card):
+    monocard = pre_created_mono_card[0]
+
+    MonoTransaction.create_transactions_from_statement(  # type: ignore
+        monocard.id, [_statement_item("unknown_mso_tx", 1_700_000_000, mcc=4321)]
+    )
+
+    transaction = MonoTransaction.objects.get(id="unknown_mso_tx")
+    assert transaction.mcc.mso == 4321
+    assert transaction.mcc.category.name == "Інше"
+
+
 monotransactions_variants = [
     (
         "monotransactions retrieve admin",
@@ -401,4 +476,331 @@ def test_monotransactions(
         **variant.url_kwargs,
     )
     assert response.status_code == variant.status_code
-    assert response.data == variant.expected
+    data = response.data
+    if isinstance(variant.expected, list):
+        # lists are paginated
+        assert data["next"] is None
+        data = data["results"]
+    assert data == variant.expected
+
+
+def create_card_transactions(card, currency, mso, times):
+    MonoTransaction.objects.bulk_create(
+        MonoTransaction(
+            id=f"page_tx_{index}",
+            time=time,
+            description="",
+            mcc=mso,
+            amount=-100,
+            commission_rate=0,
+            currency=currency,
+            balance=10000,
+            hold=True,
+            receipt_id="",
+            account=card,
+            cashback_amount=0,
+            comment="",
+        )
+        for index, time in enumerate(times)
+    )
+
+
+@pytest.mark.django_db
+def test_monotransactions_cursor_pagination(
+    api_request,
+    django_assert_num_queries,
+    pre_created_mono_card,
+    pre_created_currency,
+    pre_created_categories_mso,
+):
+    # ties on time are ordered by id
+    times = [1_700_000_000, 1_700_000_000, 1_700_000_000, 1_700_000_100, 1_700_000_200]
+    create_card_transactions(
+        pre_created_mono_card[0],
+        pre_created_currency,
+        pre_created_categories_mso[0],
+        times,
+    )
+    view = MonoTransactionViewSet.as_view({"get": "list"})
+    User.objects.create_user("admin_name", "PassW0rd", is_staff=True, is_admin=True)
+
+    ids = []
+    cursor = None
+    pages = 0
+    while True:
+        query_params = {"page_size": 2, "time_from": "2023-11-14"}
+        if cursor:
+            query_params["cursor"] = cursor
+        request = api_request(
+            "monotransactions-list",
+            tg_id="admin_name",
+            is_admin=True,
+            create_new_user=False,
+            query_params=query_params,
+        )
+        # every page is a single bounded query, deep pages included
+        with django_assert_num_queries(1):
+            response = view(request)
+        assert response.status_code == 200
+        assert len(response.data["results"]) <= 2
+        ids.extend(item["id"] for item in response.data["results"])
+        pages += 1
+        cursor = response.data["cursor"]
+        if cursor is None:
+            assert response.data["next"] is None
+            break
+        assert f"cursor={cursor}" in response.data["next"]
+
+    assert pages == 3
+    assert ids == [f"page_tx_{index}" for index in range(len(times))]
+
+
+@pytest.mark.django_db
+def test_monotransactions_paginated_by_default(
+    api_request,
+    settings,
+    pre_created_mono_card,
+    pre_created_currency,
+    pre_created_categories_mso,
+):
+    settings.TRANSACTIONS_PAGE_SIZE = 2
+    settings.TRANSACTIONS_MAX_PAGE_SIZE = 3
+    create_card_transactions(
+        pre_created_mono_card[0],
+        pre_created_currency,
+        pre_created_categories_mso[0],
+        [1_700_000_000 + index for index in range(5)],
+    )
+    view = MonoTransactionViewSet.as_view({"get": "list"})
+
+    response = view(
+        api_request("monotransactions-list", tg_id="admin_name", is_admin=True)
+    )
+    assert response.status_code == 200
+    assert len(response.data["results"]) == 2
+    assert response.data["next"] is not None
+
+    response = view(
+        api_request(
+            "monotransactions-list",
+            tg_id="admin_name",
+            create_new_user=False,
+            query_params={"page_size": 1000},
+        )
+    )
+    assert len(response.data["results"]) == 3
+
+
+monotransactions_time_range_variants = [
+    ("from only", {"time_from": "2023-11-15"}, ["page_tx_1", "page_tx_2"]),
+    ("to only", {"time_to": "2023-11-15"}, ["page_tx_0", "page_tx_1"]),
+    (
+        "from and to",
+        {"time_from": "2023-11-15", "time_to": "2023-11-15"},
+        ["page_tx_1"],
+    ),
+    (
+        "invalid bound ignored",
+        {"time_to": "15.11.2023"},
+        ["page_tx_0", "page_tx_1", "page_tx_2"],
+    ),
+]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "test_name, query_params, expected_ids", monotransactions_time_range_variants
+)
+def test_monotransactions_time_range(
+    api_request,
+    test_name,
+    query_params,
+    expected_ids,
+    pre_created_mono_card,
+    pre_created_currency,
+    pre_created_categories_mso,
+):
+    # 2023-11-14 23:59:59, 2023-11-15 00:00:00, 2023-11-16 00:00:00 (UTC)
+    create_card_transactions(
+        pre_created_mono_card[0],
+        pre_created_currency,
+        pre_created_categories_mso[0],
+        [1_700_006_399, 1_700_006_400, 1_700_092_800],
+    )
+    response = MonoTransactionViewSet.as_view({"get": "list"})(
+        api_request(
+            "monotransactions-list",
+            tg_id="admin_name",
+            is_admin=True,
+            query_params=query_params,
+        )
+    )
+    assert response.status_code == 200
+    assert [item["id"] for item in response.data["results"]] == expected_ids
+
+
+@pytest.mark.django_db
+def test_monotransactions_invalid_cursor(api_request):
+    response = MonoTransactionViewSet.as_view({"get": "list"})(
+        api_request(
+            "monotransactions-list",
+            tg_id="admin_name",
+            is_admin=True,
+            query_params={"cursor": "not a cursor"},
+        )
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "tg_id, is_admin, expected_ids",
+    [
+        ("admin_name", True, ["page_tx_0", "page_tx_1"]),
+        ("some_user", False, []),
+    ],
+)
+def test_monotransactions_export_ndjson(
+    api_request,
+    tg_id,
+    is_admin,
+    expected_ids,
+    pre_created_mono_card,
+    pre_created_currency,
+    pre_created_categories_mso,
+):
+    create_card_transactions(
+        pre_created_mono_card[0],
+        pre_created_currency,
+        pre_created_categories_mso[0],
+        [1_700_000_100, 1_700_000_000, 1_600_000_000],
+    )
+    response = MonoTransactionViewSet.as_view({"get": "export"})(
+        api_request(
+            "monotransactions-export",
+            tg_id=tg_id,
+            is_admin=is_admin,
+            query_params={"time_from": "2023-11-14"},
+        )
+    )
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "application/x-ndjson"
+    rows = [
+        json.loads(line)
+        for line in b"".join(response.streaming_content).decode().splitlines()
+    ]
+    # ordered by time, filtered by access and time bounds
+    assert [row["id"] for row in rows] == expected_ids[::-1]
+    if rows:
+        assert rows[0]["time"] == 1_700_000_000
+        assert rows[0]["account_id"] == "pre_created_card_id"
+        assert rows[0]["currency"] == pre_created_currency.code
+        assert rows[0]["category"] == pre_created_categories_mso[0].category.name
+
+
+@pytest.mark.django_db
+def test_monotransactions_export_csv(
+    api_request,
+    pre_created_mono_card,
+    pre_created_currency,
+    pre_created_categories_mso,
+):
+    create_card_transactions(
+        pre_created_mono_card[0],
+        pre_created_currency,
+        pre_created_categories_mso[0],
+        [1_700_000_000, 1_700_000_100],
+    )
+    response = MonoTransactionViewSet.as_view({"get": "export"})(
+        api_request(
+            "monotransactions-export",
+            tg_id="admin_name",
+            is_admin=True,
+            query_params={"export_format": "csv"},
+        )
+    )
+    assert response.status_code == 200
+    assert response["Content-Disposition"] == (
+        'attachment; filename="card-transactions.csv"'
+    )
+    content = b"".join(response.streaming_content).decode()
+    rows = list(csv.DictReader(io.StringIO(content)))
+    assert [row["id"] for row in rows] == ["page_tx_0", "page_tx_1"]
+    assert rows[1]["amount"] == "-100"
+
+
+@pytest.mark.django_db
+def test_monotransactions_export_unknown_format(api_request):
+    response = MonoTransactionViewSet.as_view({"get": "export"})(
+        api_request(
+            "monotransactions-export",
+            tg_id="admin_name",
+            is_admin=True,
+            query_params={"export_format": "xlsx"},
+        )
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "model, serializer_class, values_serializer_class",
+    [
+        (
+            MonoTransaction,
+            MonoTransactionSerializer,
+            MonoTransactionValuesListSerializer,
+        ),
+        (
+            JarTransaction,
+            MonoJarTransactionSerializer,
+            MonoJarTransactionValuesListSerializer,
+        ),
+    ],
+)
+def test_values_list_serializer_matches_model_serializer(
+    model,
+    serializer_class,
+    values_serializer_class,
+    pre_created_mono_transaction,
+    pre_created_mono_jar_transaction,
+):
+    # currency is nullable
+    model.objects.filter(id="pre_created_id2").update(currency=None)
+    queryset = model.objects.select_related(
+        "mcc__category", "account__monoaccount__user", "currency"
+    ).order_by("time", "id")
+    values_serializer = values_serializer_class()
+
+    expected = serializer_class(queryset, many=True).data
+    assert values_serializer.to_representation(
+        values_serializer.get_rows(queryset)
+    ) == [dict(item) for item in expected]
+
+
+@pytest.mark.django_db
+def test_monotransactions_list_single_query(
+    api_request, django_assert_num_queries, pre_created_mono_transaction
+):
+    request = api_request("monotransactions-list", tg_id="admin_name", is_admin=True)
+    with django_assert_num_queries(1):
+        response = MonoTransactionViewSet.as_view({"get": "list"})(request)
+    assert len(response.data["results"]) == 2
+
+
+@pytest.mark.django_db
+def test_transaction_save_bumps_version_without_loading_card(
+    pre_created_mono_transaction,
+):
+    transaction = MonoTransaction.objects.get(id="pre_created_id")
+    monoaccount_id = MonoCard.objects.get(id=transaction.account_id).monoaccount_id
+    transaction.save()  # warms the cached owner of the card
+    version = MonoAccount.get_data_version([monoaccount_id])
+
+    transaction = MonoTransaction.objects.get(id="pre_created_id")
+    with CaptureQueriesContext(connection) as queries:
+        transaction.save()
+
+    assert not any("monobank_monocard" in query["sql"] for query in queries)
+    assert MonoAccount.get_data_version([monoaccount_id]) > version
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from monobank.models import JarMonthSummary, MonoTransaction
+from monobank.partitions import (
+    add_months,
+    create_partitions,
+    get_month,
+    get_month_bounds,
+    get_month_partitions,
+)
+
+
+def get_partition_of(transaction_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT tableoid::regclass::text FROM monobank_monotransaction WHERE id = %s",
+            [transaction_id],
+        )
+        return cursor.fetchone()[0]
+
+
+def test_month_bounds():
+    start, end = get_month_bounds(date(2024, 12, 1))
+
+    assert start == int(datetime(2024, 12, 1, tzinfo=timezone.utc).timestamp())
+    assert end == int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+    assert get_month(end - 1) == date(2024, 12, 1)
+    assert add_months(date(2024, 12, 1), 1) == date(2025, 1, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+
+
+def test_future_partitions_created_by_migration(db):
+    current_month = get_month(int(datetime.now(tz=timezone.utc).timestamp()))
+
+    for table in ("monobank_monotransaction", "monobank_jartransaction"):
+        partitions = get_month_partitions(table)
+        for months in range(4):
+            assert add_months(current_month, months) in partitions
+
+
+def test_create_partition_moves_rows_from_default(pre_created_mono_transaction):
+    # fixture transactions are from 1970, stored in the default partition
+    assert get_partition_of("pre_created_id") == "monobank_monotransaction_default"
+
+    created = create_partitions(date(1970, 1, 1), last_month=date(1970, 1, 1))
+
+    assert "monobank_monotransaction_p1970_01" in created
+    assert "monobank_jartransaction_p1970_01" in created
+    assert create_partitions(date(1970, 1, 1), last_month=date(1970, 1, 1)) == []
+    assert get_partition_of("pre_created_id") == "monobank_monotransaction_p1970_01"
+    assert MonoTransaction.objects.filter(time__lt=3600 * 24).count() == 2
+
+
+def test_detach_old_partitions(
+    pre_created_mono_transaction, pre_created_mono_jar_transaction
+):
+    create_partitions(date(1970, 1, 1), last_month=date(1970, 1, 1))
+    assert JarMonthSummary.objects.filter(month=date(1970, 1, 1)).exists()
+
+    call_command("detach_transaction_partitions", keep_months=12)
+
+    assert date(1970, 1, 1) not in get_month_partitions("monobank_monotransaction")
+    assert not MonoTransaction.objects.filter(id="pre_created_id").exists()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM monobank_monotransaction_p1970_01")
+        assert cursor.fetchone()[0] == 2
+    # summaries of detached jar months are gone with their transactions
+    assert not JarMonthSummary.objects.filter(month=date(1970, 1, 1)).exists()
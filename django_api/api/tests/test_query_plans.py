@@ -0,0 +1,150 @@
+import re
+from datetime import date, datetime
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from monobank.models import (
+    JarMonthSummary,
+    JarTransaction,
+    MonoCard,
+    MonoJar,
+    MonoTransaction,
+    insert_ignore_conflicts,
+)
+from monobank.partitions import create_partitions, get_month, get_partition_name
+
+SEED_ACCOUNTS = 10
+SEED_TRANSACTIONS_PER_ACCOUNT = 1000
+SEED_START = int(datetime(2024, 1, 1).timestamp())
+SEED_STEP = 365 * 24 * 3600 // SEED_TRANSACTIONS_PER_ACCOUNT
+
+
+@pytest.fixture
+def seeded_transactions(
+    pre_created_mono_account, pre_created_currency, pre_created_categories_mso
+):
+    """Year of history for many cards and jars, with fresh planner statistics."""
+    create_partitions(date(2024, 1, 1), last_month=date(2024, 12, 1))
+    cards = MonoCard.objects.bulk_create(
+        MonoCard(
+            monoaccount=pre_created_mono_account,
+            id=f"seed_card_{i}",
+            send_id=f"seed_card_{i}",
+            currency=pre_created_currency,
+            cashback_type="None",
+            balance=0,
+            credit_limit=0,
+            masked_pan=[],
+            type="black",
+            iban="",
+        )
+        for i in range(SEED_ACCOUNTS)
+    )
+    jars = MonoJar.objects.bulk_create(
+        MonoJar(
+            monoaccount=pre_created_mono_account,
+            id=f"seed_jar_{i}",
+            send_id=f"seed_jar_{i}",
+            title=f"seed_jar_{i}",
+            currency=pre_created_currency,
+            balance=0,
+        )
+        for i in range(SEED_ACCOUNTS)
+    )
+    for model, accounts in ((MonoTransaction, cards), (JarTransaction, jars)):
+        model.objects.bulk_create(
+            (
+                model(
+                    account=account,
+                    id=f"{account.id}_{i}",
+                    time=SEED_START + i * SEED_STEP,
+                    description="seed",
+                    mcc=pre_created_categories_mso[0],
+                    amount=-100 * (i % 7 + 1),
+                    currency=pre_created_currency,
+                    balance=100000 - i * 100,
+                    hold=False,
+                    cashback_amount=0,
+                )
+                for account in accounts
+                for i in range(SEED_TRANSACTIONS_PER_ACCOUNT)
+            ),
+            batch_size=5000,
+        )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE monobank_monotransaction")
+        cursor.execute("ANALYZE monobank_jartransaction")
+    return cards, jars
+
+
+def assert_no_seq_scan(queryset):
+    """Sequential scans are fine only for empty (future) partitions."""
+    plan = queryset.explain()
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname FROM pg_class WHERE relname LIKE %s AND reltuples > 0",
+            [f"{table}%"],
+        )
+        tables_with_rows = {row[0] for row in cursor.fetchall()}
+    seq_scanned = set(re.findall(r"Seq Scan on (\w+)", plan))
+    assert not seq_scanned & tables_with_rows, plan
+
+
+def assert_single_partition(queryset, month: date):
+    plan = queryset.explain()
+    table = queryset.model._meta.db_table
+    scanned = set(re.findall(rf" on ({table}_(?:p\d{{4}}_\d{{2}}|default))\b", plan))
+    assert scanned == {get_partition_name(table, month)}, plan
+
+
+def test_transaction_windows_use_indexes(seeded_transactions):
+    cards, jars = seeded_transactions
+    month_start = int(datetime(2024, 3, 1).timestamp())
+    month_end = int(datetime(2024, 4, 1).timestamp())
+    day_start = int(datetime(2024, 6, 1).timestamp())
+
+    # JarMonthSummary.refresh
+    assert_no_seq_scan(
+        JarTransaction.objects.filter(
+            account=jars[0], time__gte=month_start, time__lt=month_end
+        ).order_by("time", "id")
+    )
+    JarMonthSummary.rebuild()
+    assert jars[0].get_month_summary(date(2024, 3, 1))["start_balance"] > 0
+
+    for model, accounts in ((MonoTransaction, cards), (JarTransaction, jars)):
+        # viewsets list filtered by accounts and time_from
+        assert_no_seq_scan(
+            model.objects.select_related("mcc__category", "currency")
+            .filter(
+                account_id__in=[accounts[0].id, accounts[1].id],
+                time__gte=int(datetime(2024, 12, 1).timestamp()),
+            )
+            .order_by("time", "id")
+        )
+        # ai tools and daily reports, all accounts for a day
+        assert_single_partition(
+            model.objects.filter(
+                time__gte=day_start, time__lte=day_start + 24 * 3600
+            ).select_related("mcc__category"),
+            date(2024, 6, 1),
+        )
+
+
+def test_webhook_insert_checks_single_partition(seeded_transactions):
+    cards, _ = seeded_transactions
+    existing = MonoTransaction.objects.get(id=f"{cards[0].id}_500")
+    existing.pk = "webhook_insert"
+
+    with CaptureQueriesContext(connection) as queries:
+        assert insert_ignore_conflicts(existing)
+    assert not insert_ignore_conflicts(existing)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN {queries[0]['sql']}")
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+    table = MonoTransaction._meta.db_table
+    scanned = set(re.findall(rf" on ({table}_(?:p\d{{4}}_\d{{2}}|default))\b", plan))
+    assert scanned == {get_partition_name(table, get_month(existing.time))}, plan
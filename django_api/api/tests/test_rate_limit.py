@@ -0,0 +1,61 @@
+from unittest.mock import MagicMock
+
+import pytest
+from monobank import rate_limit
+from monobank.rate_limit import MonoRateLimiter
+from utils.errors import MonoBankRateLimitExceeded
+
+from .conftest import make_mono_api_response
+
+
+@pytest.fixture
+def frozen_time(monkeypatch):
+    clock = MagicMock()
+    clock.time.return_value = 1_700_000_000.0
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def test_rate_limiter_waits_for_token_slot(frozen_time):
+    limiter = MonoRateLimiter()
+
+    limiter.acquire("token", "statement", max_wait=120)
+    frozen_time.sleep.assert_not_called()
+
+    limiter.acquire("token", "statement", max_wait=120)
+    frozen_time.sleep.assert_called_once_with(60.0)
+
+    # other tokens and endpoints have their own buckets
+    limiter.acquire("other_token", "statement", max_wait=120)
+    limiter.acquire("token", "client-info", max_wait=120)
+    assert frozen_time.sleep.call_count == 1
+
+    frozen_time.time.return_value += 30
+    limiter.acquire("token", "statement", max_wait=120)
+    frozen_time.sleep.assert_called_with(90.0)
+
+
+def test_rate_limiter_rejects_long_wait_without_reserving(frozen_time):
+    limiter = MonoRateLimiter()
+    limiter.acquire("token", "statement", max_wait=0)
+
+    with pytest.raises(MonoBankRateLimitExceeded) as err:
+        limiter.acquire("token", "statement", max_wait=10)
+    assert err.value.retry_after == 60
+
+    frozen_time.time.return_value += 60
+    limiter.acquire("token", "statement", max_wait=0)
+    frozen_time.sleep.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_get_transactions_waits_for_statement_slot(
+    mono_api, frozen_time, pre_created_mono_card
+):
+    mono_api.return_value = make_mono_api_response([])
+
+    # both cards belong to the same token
+    for card in pre_created_mono_card:
+        card.get_transactions()
+
+    frozen_time.sleep.assert_called_once_with(60.0)
@@ -0,0 +1,57 @@
+import pytest
+from django.core.cache import cache
+from monobank.models import (
+    REFERENCE_DATA_VERSION_KEY,
+    Category,
+    Currency,
+    reference_data,
+)
+from utils.cache import bump_cache_version
+
+
+@pytest.mark.django_db
+def test_reference_data_lookups_are_cached(
+    django_assert_num_queries, pre_created_currency, pre_created_categories_mso
+):
+    with django_assert_num_queries(2):
+        for _ in range(10):
+            assert reference_data.get_currency(980) == pre_created_currency
+            category_mso = reference_data.get_category_mso("1234")
+            assert category_mso == pre_created_categories_mso[0]
+            assert category_mso.category.name == "precreated_category_name1"
+
+
+@pytest.mark.django_db
+def test_reference_data_unknown_code(django_assert_num_queries, pre_created_currency):
+    reference_data.get_currency(980)
+
+    with django_assert_num_queries(1):
+        assert reference_data.get_currency(1) is None
+
+
+@pytest.mark.django_db
+def test_reference_data_invalidated_on_new_rows(pre_created_currency):
+    assert reference_data.get_currency(980).name == "UAH"
+    version = cache.get(REFERENCE_DATA_VERSION_KEY)
+
+    Currency.create_unknown_currency(999)
+    Category.create_custom_category("custom_category")
+
+    assert cache.get(REFERENCE_DATA_VERSION_KEY) > version
+    assert reference_data.get_currency(999).name == "XXX"
+    custom_category_mso = Category.objects.get(name="custom_category").categorymso_set
+    assert reference_data.get_category_mso(custom_category_mso.get().mso)
+
+
+@pytest.mark.django_db
+def test_reference_data_reloaded_after_version_bump_by_other_process(
+    pre_created_currency,
+):
+    reference_data.get_currency(980)
+    Currency.objects.filter(code=980).update(name="UAH2")  # no signals
+
+    assert reference_data.get_currency(980).name == "UAH"
+    bump_cache_version(REFERENCE_DATA_VERSION_KEY)
+    reference_data._checked_at = 0.0  # skip version check interval
+
+    assert reference_data.get_currency(980).name == "UAH2"
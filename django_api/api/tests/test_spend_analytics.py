@@ -0,0 +1,169 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from monobank.models import Currency, MonoAccount, MonoCard, MonoTransaction
+from monobank.views import SpendAnalyticsViewSet
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+User = get_user_model()
+
+
+def get_spend(user, **query_params):
+    request = APIRequestFactory().get(reverse("analytics-spend-list"), query_params)
+    force_authenticate(request, user=user)
+    return SpendAnalyticsViewSet.as_view({"get": "list"})(request)
+
+
+@pytest.fixture
+def spend_transactions(pre_created_mono_transaction, pre_created_mono_jar_transaction):
+    return User.objects.get(tg_id="precreated_user_tg_id")
+
+
+@pytest.mark.django_db
+def test_spend_by_category(spend_transactions):
+    response = get_spend(spend_transactions)
+
+    assert response.status_code == 200
+    assert response.data == [
+        {
+            "category": "precreated_category_name1",
+            "currency": "UAH",
+            "spent": 10000,
+            "income": 0,
+            "count": 2,
+        },
+        {
+            "category": "precreated_category_name2",
+            "currency": "UAH",
+            "spent": 30000,
+            "income": 0,
+            "count": 2,
+        },
+    ]
+
+
+@pytest.mark.django_db
+def test_spend_by_source_owner_currency_and_month(
+    spend_transactions, pre_created_mono_card
+):
+    MonoTransaction.objects.filter(id="pre_created_id").update(amount=2500)
+
+    response = get_spend(
+        spend_transactions,
+        group_by="source,owner,currency",
+        period="month",
+        sources="cards",
+    )
+
+    assert response.status_code == 200
+    assert response.data == [
+        {
+            "owner": "precreated_user_tg_id",
+            "owner_name": "User-precreated_user_tg_id",
+            "currency": "UAH",
+            "period": "1970-01-01",
+            "source": "cards",
+            "spent": 15000,
+            "income": 2500,
+            "count": 2,
+        },
+    ]
+
+
+@pytest.mark.django_db
+def test_spend_grouped_by_card_currency(spend_transactions, pre_created_mono_card):
+    card = pre_created_mono_card[0]
+    usd_card = MonoCard.objects.create(
+        monoaccount=card.monoaccount,
+        id="usd_card_id",
+        send_id="usd_card",
+        currency=Currency.objects.create(code=840, name="USD"),
+        balance=0,
+        credit_limit=0,
+        masked_pan=[],
+        type="black",
+    )
+    eur = Currency.objects.create(code=978, name="EUR")
+    # paid in EUR from the USD card, amount is in USD cents
+    transaction = MonoTransaction.objects.get(id="pre_created_id")
+    transaction.pk = "usd_card_tx"
+    transaction.account = usd_card
+    transaction.currency = eur
+    transaction.amount = -700
+    transaction.save(force_insert=True)
+
+    response = get_spend(spend_transactions, sources="cards")
+
+    assert response.status_code == 200
+    assert [
+        (item["category"], item["currency"], item["spent"]) for item in response.data
+    ] == [
+        ("precreated_category_name1", "UAH", 5000),
+        ("precreated_category_name1", "USD", 700),
+        ("precreated_category_name2", "UAH", 15000),
+    ]
+    by_currency = get_spend(spend_transactions, group_by="currency", sources="cards")
+    assert [(item["currency"], item["spent"]) for item in by_currency.data] == [
+        ("UAH", 20000),
+        ("USD", 700),
+    ]
+
+
+@pytest.mark.django_db
+def test_spend_scoped_to_accessible_users(spend_transactions):
+    stranger = User.objects.create_user("stranger", "PassW0rd")
+    assert get_spend(stranger).data == []
+
+    admin = User.objects.create_superuser("admin", "PassW0rd")
+    assert len(get_spend(admin, group_by="owner").data) == 1
+    assert get_spend(admin, users="stranger").data == []
+
+
+@pytest.mark.django_db
+def test_spend_invalid_params(spend_transactions):
+    response = get_spend(spend_transactions, group_by="category,mcc")
+    assert response.status_code == 400
+    assert response.data == {
+        "error": "group_by should be one of source, category, owner, currency"
+    }
+
+    assert get_spend(spend_transactions, period="year").status_code == 400
+
+
+@pytest.mark.django_db
+def test_spend_queries_do_not_depend_on_transactions_count(
+    spend_transactions, pre_created_mono_card
+):
+    def count_queries():
+        with CaptureQueriesContext(connection) as queries:
+            assert get_spend(spend_transactions, period="day").status_code == 200
+        return len(queries)
+
+    # warm access caches, then miss the response cache
+    get_spend(spend_transactions, period="day")
+    transaction = MonoTransaction.objects.get(id="pre_created_id")
+    MonoAccount.bump_data_version(transaction.account.monoaccount_id)
+    queries_count = count_queries()
+
+    MonoTransaction.objects.bulk_create(
+        MonoTransaction(
+            **{
+                **{
+                    field.attname: getattr(transaction, field.attname)
+                    for field in MonoTransaction._meta.concrete_fields
+                },
+                "id": f"spend_tx_{index}",
+                "time": transaction.time + index * 86400,
+            }
+        )
+        for index in range(1, 50)
+    )
+    MonoAccount.bump_data_version(transaction.account.monoaccount_id)
+
+    assert count_queries() == queries_count
+    response = get_spend(
+        spend_transactions, group_by="source", period="day", sources="cards"
+    )
+    assert len(response.data) == 50
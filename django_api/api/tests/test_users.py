@@ -1,8 +1,14 @@
+from types import SimpleNamespace
+
 import pytest
 from account.views import UserViewSet
+from django.contrib.auth import get_user_model
+from monobank.views import IsOwnerOrFamilyOrAdminPermission
 
 from .conftest import NO_PERMISSION_ERROR, Variant
 
+User = get_user_model()
+
 users_list_variants = [
     (
         "admin list",
@@ -238,3 +244,81 @@ def test_users(api_request, test_name, variant, pre_created_user):
 #     assert response.data == {'data': 'user exists', 'status': 'fail'}
 #
 #
+
+
+@pytest.mark.django_db
+def test_related_tg_ids_cached_until_family_changes(django_assert_num_queries):
+    first, second, third = (
+        User.objects.create_user(tg_id, "PassW0rd")
+        for tg_id in ("first", "second", "third")
+    )
+    first.family_members.add(second)
+
+    with django_assert_num_queries(1):
+        assert sorted(first.get_related_tg_ids()) == ["first", "second"]
+    with django_assert_num_queries(0):
+        assert sorted(first.get_related_tg_ids()) == ["first", "second"]
+        assert first.get_related_tg_ids(include_self=False) == ["second"]
+
+    # symmetrical relation changed from the other side
+    third.family_members.add(first)
+    assert sorted(first.get_related_tg_ids()) == ["first", "second", "third"]
+    assert sorted(second.get_related_tg_ids(recursive=True)) == [
+        "first",
+        "second",
+        "third",
+    ]
+
+    second.family_members.remove(first)
+    assert sorted(first.get_related_tg_ids()) == ["first", "third"]
+    assert second.get_related_tg_ids(recursive=True) == ["second"]
+
+    third.family_members.clear()
+    assert first.get_related_tg_ids() == ["first"]
+
+
+@pytest.mark.django_db
+def test_family_permission_check_without_queries(django_assert_num_queries):
+    owner = User.objects.create_user("owner", "PassW0rd")
+    member = User.objects.create_user("member", "PassW0rd")
+    stranger = User.objects.create_user("stranger", "PassW0rd")
+    owner.family_members.add(member)
+    obj = SimpleNamespace(monoaccount=SimpleNamespace(user=owner))
+    permission = IsOwnerOrFamilyOrAdminPermission()
+
+    member.get_related_tg_ids()
+    stranger.get_related_tg_ids()
+    with django_assert_num_queries(0):
+        for _ in range(3):
+            assert permission.has_object_permission(
+                SimpleNamespace(user=member), None, obj
+            )
+            assert not permission.has_object_permission(
+                SimpleNamespace(user=stranger), None, obj
+            )
+
+
+@pytest.mark.django_db
+def test_expand_tg_ids_with_family_single_query(django_assert_num_queries):
+    # chain family_0 - family_1 - ... - family_5 with a cycle back to family_2
+    users = [User.objects.create_user(f"family_{i}", "PassW0rd") for i in range(6)]
+    for left, right in zip(users, users[1:]):
+        left.family_members.add(right)
+    users[5].family_members.add(users[2])
+    User.objects.create_user("outsider", "PassW0rd")
+    component = [f"family_{i}" for i in range(6)]
+
+    with django_assert_num_queries(1):
+        assert (
+            sorted(User.expand_tg_ids_with_family(["family_0"], recursive=True))
+            == component
+        )
+    with django_assert_num_queries(1):
+        assert sorted(
+            User.expand_tg_ids_with_family(["family_0", "outsider", "unknown"])
+        ) == ["family_0", "family_1", "outsider"]
+    with django_assert_num_queries(1):
+        assert sorted(
+            User.expand_tg_ids_with_family(["family_3", "outsider"], recursive=True)
+        ) == component + ["outsider"]
+    assert User.expand_tg_ids_with_family([], recursive=True) == []
@@ -1,7 +1,15 @@
+import os
+from unittest.mock import MagicMock
+
 import pytest
+import redis
 from django.contrib.auth import get_user_model
-from monobank.models import JarTransaction, MonoTransaction
+from django.db import IntegrityError, OperationalError
+from monobank import views, webhook_queue
+from monobank.models import JarTransaction, MonoAccount, MonoTransaction
 from monobank.views import TransactionWebhookApiView
+from monobank.webhook_queue import WebhookQueue, run_webhook_writer
+from redis.exceptions import RedisError
 from rest_framework.views import Response
 
 from .conftest import Variant
@@ -90,7 +98,7 @@ webhook_post_variants = [
                     "originalMcc": 4829,
                     "receipt_id": "aaa",
                     "comment": "abc",
-                    "time": 12341234,
+                    "time": 12345,  # redelivered with the time of the stored one
                 },
                 "type": "StatementItem",
             },
@@ -148,7 +156,7 @@ webhook_post_variants = [
                     "mcc": 1234,
                     "operationAmount": 19700,
                     "originalMcc": 4829,
-                    "time": 12341234,
+                    "time": 12345,  # redelivered with the time of the stored one
                 },
                 "type": "StatementItem",
             },
@@ -262,3 +270,281 @@ def test_webhook_post(
                 id=variant.request_data.get("statementItem", {}).get("id", "")
             ).exists()
         )
+        pre_created_mono_account.refresh_from_db()
+        assert pre_created_mono_account.last_webhook_at is not None
+
+
+def make_webhook_request(api_request, account_id, item_id, token="abc"):
+    return api_request(
+        "webhook",
+        method_name="post",
+        data={
+            "account": account_id,
+            "statementItem": {
+                "amount": -1234,
+                "balance": 12341234,
+                "cashbackAmount": 0,
+                "commissionRate": 0,
+                "currencyCode": 980,
+                "description": "Сільпо",
+                "hold": True,
+                "id": item_id,
+                "mcc": 1234,
+                "operationAmount": -1234,
+                "originalMcc": 1234,
+                "time": 12341234,
+            },
+            "type": "StatementItem",
+        },
+        query_params={"token": token},
+        need_json_dumps=True,
+    )
+
+
+@pytest.mark.django_db
+def test_webhook_post_fast_path_queries(
+    api_request,
+    django_assert_num_queries,
+    pre_created_categories_mso,
+    pre_created_mono_card,
+    pre_created_mono_jar,
+):
+    view = TransactionWebhookApiView.as_view()
+    # warm up reference data and account caches
+    assert (
+        view(make_webhook_request(api_request, "pre_created_card_id", "fast_1"))
+    ).status_code == 201
+
+    # insert only, last webhook time was stored a moment ago
+    request = make_webhook_request(api_request, "pre_created_card_id", "fast_2")
+    with django_assert_num_queries(1):
+        response = view(request)
+    assert response.status_code == 201
+
+    request = make_webhook_request(api_request, "pre_created_card_id", "fast_2")
+    with django_assert_num_queries(1):
+        response = view(request)
+    assert response.status_code == 200
+
+    # account resolved with a single query, then insert, jar month lock and rollup
+    request = make_webhook_request(api_request, "pre_created_jar_id", "fast_3")
+    with django_assert_num_queries(4):
+        response = view(request)
+    assert response.status_code == 201
+    assert MonoTransaction.objects.filter(id__in=["fast_1", "fast_2"]).count() == 2
+    assert JarTransaction.objects.filter(id="fast_3").exists()
+
+
+@pytest.mark.django_db
+def test_webhook_post_token_changed_or_unknown_account(
+    api_request, pre_created_categories_mso, pre_created_mono_card
+):
+    view = TransactionWebhookApiView.as_view()
+    assert (
+        view(make_webhook_request(api_request, "pre_created_card_id", "token_1"))
+    ).status_code == 201
+
+    pre_created_mono_card[0].monoaccount.mono_token = "new_token"
+    pre_created_mono_card[0].monoaccount.save()
+
+    response = view(make_webhook_request(api_request, "pre_created_card_id", "token_2"))
+    assert response.status_code == 403
+    response = view(
+        make_webhook_request(
+            api_request, "pre_created_card_id", "token_2", token="new_token"
+        )
+    )
+    assert response.status_code == 201
+
+    response = view(make_webhook_request(api_request, "unknown_card_id", "token_3"))
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def redis_client():
+    client = redis.Redis.from_url(
+        os.getenv("TEST_REDIS_URL", "redis://localhost:6379/15")
+    )
+    try:
+        client.ping()
+    except RedisError:
+        pytest.skip("webhook queue needs redis")
+    client.flushdb()
+    yield client
+    client.flushdb()
+
+
+def make_queue(monkeypatch, redis_client, key, worker="default"):
+    queue = WebhookQueue(key, worker)
+    monkeypatch.setattr(queue, "_get_redis", lambda: redis_client)
+    return queue
+
+
+@pytest.fixture
+def queues(monkeypatch, redis_client):
+    queue = make_queue(monkeypatch, redis_client, "test_queue")
+    dead_letter_queue = make_queue(monkeypatch, redis_client, "test_failed")
+    monkeypatch.setattr(views, "webhook_queue", queue)
+    monkeypatch.setattr(webhook_queue, "webhook_dead_letter_queue", dead_letter_queue)
+    # tests run inside a transaction, closing its connection would break it
+    close_old_connections = MagicMock()
+    monkeypatch.setattr(webhook_queue, "close_old_connections", close_old_connections)
+    monkeypatch.setattr(webhook_queue.time, "sleep", lambda seconds: None)
+    return queue, dead_letter_queue, close_old_connections
+
+
+@pytest.mark.django_db
+def test_webhook_post_async_ingestion(
+    api_request,
+    settings,
+    queues,
+    pre_created_categories_mso,
+    pre_created_mono_card,
+    pre_created_mono_jar,
+):
+    settings.WEBHOOK_ASYNC_INGESTION = True
+    queue, dead_letter_queue, _ = queues
+    view = TransactionWebhookApiView.as_view()
+
+    for account_id, item_id in [
+        ("pre_created_card_id", "queued_1"),
+        ("pre_created_card_id", "queued_1"),
+        ("pre_created_jar_id", "queued_2"),
+    ]:
+        response = view(make_webhook_request(api_request, account_id, item_id))
+        assert response.status_code == 200
+    response = view(
+        make_webhook_request(api_request, "pre_created_card_id", "queued_3", "bad")
+    )
+    assert response.status_code == 403
+    assert len(queue) == 3
+    assert not MonoTransaction.objects.filter(id="queued_1").exists()
+
+    bad_payload = {"account": "pre_created_card_id", "statement_item": {"id": "x"}}
+    queue.push(bad_payload)
+    run_webhook_writer(batch_size=10, max_wait_ms=10, queue=queue, iterations=1)
+
+    assert len(queue) == 0
+    assert queue.get_claimed() == []
+    assert MonoTransaction.objects.filter(id="queued_1").count() == 1
+    assert JarTransaction.objects.filter(id="queued_2").exists()
+    assert dead_letter_queue.claim(10) == [bad_payload]
+
+
+@pytest.mark.django_db
+def test_webhook_post_async_ingestion_without_redis(
+    api_request, settings, pre_created_categories_mso, pre_created_mono_card
+):
+    # cache backend of tests is not redis, payloads are written right away
+    settings.WEBHOOK_ASYNC_INGESTION = True
+    view = TransactionWebhookApiView.as_view()
+
+    response = view(
+        make_webhook_request(api_request, "pre_created_card_id", "not_queued")
+    )
+
+    assert response.status_code == 201
+    assert MonoTransaction.objects.filter(id="not_queued").exists()
+
+
+@pytest.mark.django_db
+def test_webhook_writer_keeps_batch_until_written(
+    monkeypatch, queues, pre_created_categories_mso, pre_created_mono_card
+):
+    queue, _, close_old_connections = queues
+    payload = {
+        "account": "pre_created_card_id",
+        "statementItem": {
+            "id": "retried",
+            "time": 12341234,
+            "description": "",
+            "mcc": 1234,
+            "originalMcc": 1234,
+            "amount": -1,
+            "operationAmount": -1,
+            "currencyCode": 980,
+            "commissionRate": 0,
+            "cashbackAmount": 0,
+            "balance": 1,
+            "hold": True,
+        },
+    }
+    queue.push(payload)
+    write_batch = MagicMock(side_effect=[OperationalError("connection lost"), 1])
+    monkeypatch.setattr(webhook_queue, "write_webhook_batch", write_batch)
+
+    run_webhook_writer(batch_size=10, max_wait_ms=10, queue=queue, iterations=2)
+
+    assert write_batch.call_args_list[0] == write_batch.call_args_list[1]
+    # once per iteration and after the failure
+    assert close_old_connections.call_count == 3
+    assert queue.get_claimed() == []
+
+
+def test_webhook_queue_claimed_batch_survives_restart(monkeypatch, redis_client):
+    queue = make_queue(monkeypatch, redis_client, "test_order")
+    other_worker = make_queue(monkeypatch, redis_client, "test_order", "other")
+    for i in range(5):
+        queue.push({"i": i})
+
+    assert queue.claim(3) == [{"i": 0}, {"i": 1}, {"i": 2}]
+    # writer killed before ack, the next run gets the same batch first
+    restarted = make_queue(monkeypatch, redis_client, "test_order")
+    assert restarted.get_claimed() == [{"i": 0}, {"i": 1}, {"i": 2}]
+    assert restarted.claim(1) == [{"i": 3}]
+    assert other_worker.claim(10) == [{"i": 4}]
+    assert other_worker.claim(10) == []
+
+    restarted.ack()
+    assert restarted.get_claimed() == []
+    assert len(restarted) == 0
+
+
+@pytest.mark.django_db
+def test_webhook_writer_skips_payload_failing_every_write(
+    monkeypatch, settings, queues, pre_created_categories_mso, pre_created_mono_card
+):
+    settings.WEBHOOK_WRITER_MAX_ATTEMPTS = 2
+    queue, dead_letter_queue, _ = queues
+    payloads = [
+        {
+            "account": "pre_created_card_id",
+            "statement_item": {
+                "id": item_id,
+                "time": 12341234,
+                "description": "",
+                "mcc": 1234,
+                "original_mcc": 1234,
+                "amount": -1,
+                "operation_amount": -1,
+                "currency_code": 980,
+                "commission_rate": 0,
+                "cashback_amount": 0,
+                "balance": 1,
+                "hold": True,
+            },
+        }
+        for item_id in ("poisoned", "next_1", "next_2")
+    ]
+    for payload in payloads:
+        queue.push(payload)
+    write_batch = webhook_queue.write_webhook_batch
+
+    def write_poisoned_batch(batch):
+        if any(payload["statement_item"]["id"] == "poisoned" for payload in batch):
+            # e.g. card deleted while cached for webhooks
+            raise IntegrityError("violates foreign key constraint")
+        return write_batch(batch)
+
+    monkeypatch.setattr(webhook_queue, "write_webhook_batch", write_poisoned_batch)
+
+    run_webhook_writer(batch_size=10, max_wait_ms=10, queue=queue, iterations=2)
+
+    assert queue.get_claimed() == []
+    assert dead_letter_queue.claim(10) == [payloads[0]]
+    assert sorted(
+        MonoTransaction.objects.filter(id__startswith="next_").values_list(
+            "id", flat=True
+        )
+    ) == ["next_1", "next_2"]
+    assert not MonoTransaction.objects.filter(id="poisoned").exists()
@@ -0,0 +1,17 @@
+from django.core.cache import cache
+
+
+def get_cache_version(key: str) -> int:
+    """Return current value of a version counter stored in the shared cache."""
+    return cache.get(key) or 0
+
+
+def bump_cache_version(key: str) -> int:
+    """Increment a version counter stored in the shared cache (never expires)."""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # counter does not exist yet (or was evicted)
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
@@ -0,0 +1,71 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+_primary_pinned: ContextVar[bool] = ContextVar("primary_pinned", default=False)
+
+
+def get_replica_alias() -> str | None:
+    """Alias of the read replica database, None when it is not configured."""
+    return settings.DB_REPLICA_ALIAS
+
+
+@contextmanager
+def read_from_replica():
+    """
+    Send reads inside the block (or decorated function) to the replica until
+    the first write, everything after it reads from the primary, so the code
+    sees its own writes. Nested blocks share the state of the outer one.
+    """
+    if _replica_reads.get():
+        yield
+        return
+    reads_token = _replica_reads.set(True)
+    pinned_token = _primary_pinned.set(False)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(pinned_token)
+        _replica_reads.reset(reads_token)
+
+
+def use_primary():
+    """Read from the primary for the rest of the current replica block."""
+    if _replica_reads.get():
+        _primary_pinned.set(True)
+
+
+def is_reading_from_replica() -> bool:
+    return (
+        _replica_reads.get()
+        and not _primary_pinned.get()
+        and get_replica_alias() is not None
+    )
+
+
+class ReplicaRouter:
+    """
+    Reads go to the replica only inside `read_from_replica`, writes always go
+    to the primary (also for instances loaded from the replica).
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_reading_from_replica():
+            return get_replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        use_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both databases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == get_replica_alias():
+            return False
+        return None
@@ -1,2 +1,30 @@
 class MonoBankError(Exception):
     """Raised monobank api returns error"""
+
+
+class MonoBankRateLimitExceeded(MonoBankError):
+    """Raised when monobank api request slot is not available soon enough"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"too many requests, retry after {retry_after:.0f}s")
+
+
+class MonoBankRequestError(MonoBankError):
+    """Raised when monobank api request fails"""
+
+    def __init__(self, description: str, status_code: int | None = None):
+        self.status_code = status_code
+        super().__init__(description)
+
+
+class MonoBankTooManyRequests(MonoBankRequestError):
+    """Raised when monobank api rejects request by its rate limit (429)"""
+
+
+class MonoBankForbidden(MonoBankRequestError):
+    """Raised when monobank api rejects the token (401/403)"""
+
+
+class MonoBankUnavailable(MonoBankRequestError):
+    """Raised on monobank api timeouts, connection and server (5xx) errors"""
@@ -40,14 +40,22 @@ const getJarTransactions = async function ({request, params}) {
     const endpoint = `${BACKEND_URL}/monobank/monojartransactions?jars=${jarId}`
     const token = await checkAuthLoader()
     try {
-        const response = await fetch(endpoint, {
-            method: 'GET',
-            headers: {
-                'Content-Type': 'application/json',
-                Authorization: `Bearer ${token}`
-            }
-        })
-        return await response.json();
+        // transactions are paginated, follow `next` until the last page
+        const transactions = []
+        let url = endpoint
+        while (url) {
+            const response = await fetch(url, {
+                method: 'GET',
+                headers: {
+                    'Content-Type': 'application/json',
+                    Authorization: `Bearer ${token}`
+                }
+            })
+            const page = await response.json()
+            transactions.push(...page.results)
+            url = page.next
+        }
+        return transactions
     } catch (error) {
         setTimeout(() => {
             PopUpManager.addPopUp(